@@ -6,60 +6,151 @@ et aux objets dans le système. Ces fonctions utilisent la couche d'accès aux d
 dans les modules 'models', 'schemas', et 'utils.pokeapi'.
 
 Fonctions :
-    - get_trainer(database: Session, trainer_id: int) -> models.Trainer:
+    - get_trainer(database: Session, trainer_id: int, expand: bool = True) -> models.Trainer:
         Trouve un dresseur par son identifiant.
 
     - get_trainer_by_name(database: Session, name: str) -> List[models.Trainer]:
         Trouve des dresseurs par leur nom.
 
-    - get_trainers(database: Session, skip: int = 0, limit: int = 100) -> List[models.Trainer]:
+    - get_trainers(database: Session, skip: int = 0, limit: int = 100,
+    expand: bool = True, after_id: int = None) -> List[models.Trainer]:
         Récupère tous les dresseurs, avec une option pour paginer les résultats.
 
     - create_trainer(database: Session, trainer: schemas.TrainerCreate) -> models.Trainer:
         Crée un nouveau dresseur.
 
     - add_trainer_pokemon(database: Session,
-    pokemon: schemas.PokemonCreate, trainer_id: int) -> models.Pokemon:
+    pokemon: schemas.PokemonCreate, trainer_id: int, defer_name: bool = False) -> models.Pokemon:
         Crée un nouveau pokémon et le lie à un dresseur.
 
     - add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: int) -> models.Item:
         Crée un nouvel objet et le lie à un dresseur.
 
-    - get_items(database: Session, skip: int = 0, limit: int = 100) -> List[models.Item]:
+    - create_trainers(database: Session, trainers: List[schemas.TrainerCreate]) -> List[int]:
+        Crée plusieurs dresseurs en une transaction.
+
+    - add_trainer_items(database: Session, items: List[schemas.ItemCreate],
+    trainer_id: int) -> List[int]:
+        Crée plusieurs objets liés à un dresseur en une transaction.
+
+    - add_trainer_pokemons(database: Session, pokemons: List[schemas.PokemonCreate],
+    trainer_id: int, defer_name: bool = False) -> List[int]:
+        Crée plusieurs pokémons liés à un dresseur en une transaction, les noms étant
+        résolus en une seule recherche (ValueError si un api_id est inconnu).
+
+    - get_items(database: Session, skip: int = 0, limit: int = 100,
+    after_id: int = None) -> List[models.Item]:
         Récupère tous les objets, avec une option pour paginer les résultats.
 
     - get_pokemon(database: Session, pokemon_id: int) -> models.Pokemon:
         Trouve un pokémon par son identifiant.
 
-    - get_pokemons(database: Session, skip: int = 0, limit: int = 100) -> List[models.Pokemon]:
+    - get_pokemons(database: Session, skip: int = 0, limit: int = 100,
+    after_id: int = None) -> List[models.Pokemon]:
         Récupère tous les pokémons, avec une option pour paginer les résultats.
+
+    - get_rows(database: Session, model, fields: Tuple[str], skip: int = 0, limit: int = 100,
+    after_id: int = None) -> List[tuple]:
+        Récupère une page de lignes réduites aux colonnes demandées, sans objets ORM.
+
+    - get_rows_by_trainer(database: Session, model, fields: Tuple[str],
+    trainer_ids: List[int]) -> List[tuple]:
+        Récupère les colonnes demandées des objets ou pokémons de plusieurs dresseurs.
+
+    - get_top_trainers(database: Session, limit: int = 10, by: str = "pokemons")
+    -> List[tuple]:
+        Classe les dresseurs par nombre de pokémons ou d'objets.
+
+    - get_species_popularity(database: Session, limit: int = 10) -> List[tuple]:
+        Classe les espèces par nombre de pokémons possédés.
+
+    - get_trainer_counts(database: Session, trainer_id: int) -> tuple:
+        Compte les pokémons et les objets d'un dresseur.
+
+    - recount(database: Session) -> int:
+        Recalcule les compteurs pokemon_count et item_count des dresseurs.
+
+    - search(database: Session, query: str, limit: int = 20) -> List[dict]:
+        Cherche des dresseurs, pokémons et objets dont un mot commence par chaque mot
+        de query : les dresseurs, puis les pokémons, puis les objets, chaque groupe du
+        plus pertinent au moins pertinent (bm25).
+
+    - iter_all(database: Session, model, batch_size: int = 1000) -> Iterator[Base]:
+        Parcourt toutes les lignes d'une table par lots, sans les charger toutes en mémoire.
+
+    - get_all_species(database: Session) -> List[models.Species]:
+        Récupère toutes les espèces du Pokédex local.
+
+    - replace_species(database: Session, records: Iterable[dict]) -> int:
+        Remplace le Pokédex local par les espèces données, en une transaction.
+
+Notes :
+    - Avec expand=True, l'inventaire et les pokémons des dresseurs sont chargés par
+    une requête "SELECT ... WHERE trainer_id IN (...)" par collection (selectinload),
+    quel que soit le nombre de dresseurs. Avec expand=False, ils ne sont pas chargés
+    (chargement différé, jamais déclenché par les résumés des routes).
+    - Les listes sont triées par identifiant. after_id permet une pagination par curseur
+    ("WHERE id > after_id ORDER BY id LIMIT limit"), dont le coût ne dépend pas de la
+    profondeur de la page contrairement à skip (OFFSET).
+    - Les fonctions d'ajout en masse insèrent toutes les lignes dans une seule
+    transaction (un INSERT par ligne, une seule requête préparée) et retournent les
+    identifiants attribués par SQLite à chaque ligne : ils ne sont pas supposés
+    consécutifs. SQLAlchemy 1.4 ne prend pas en charge RETURNING avec SQLite.
+    - Avec defer_name=True, les pokémons sont insérés sans nom (name_status "pending")
+    et leur nom est résolu en arrière-plan par 'app.utils.name_resolver', après le commit.
+    - Les compteurs pokemon_count et item_count des dresseurs sont incrémentés dans la
+    transaction qui ajoute les pokémons ou les objets : les classements sont lus dans
+    leurs index, sans agréger les tables "pokemons" et "items".
+    - Après chaque commit, les fonctions d'écriture invalident les réponses mises en cache
+    qui en dépendent (voir 'app.utils.response_cache').
+    - Les requêtes des statistiques, de recount et de la recherche sont construites par
+    des fonctions "*_statement" partagées avec 'app.actions_async'.
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, text, update
+from sqlalchemy.orm import Session, lazyload, selectinload
 from . import models, schemas
-from .utils.pokeapi import get_pokemon_name
+from .search import match_expression
+from .utils.fast_json import columns
+from .utils.name_resolver import name_resolver
+from .utils.response_cache import response_cache
+from .utils.pokeapi import get_pokemon_name, get_pokemon_names
 
 
-def get_trainer(database: Session, trainer_id: int):
+def trainer_loading(expand: bool = True):
+    """
+        Loader options of the trainer collections
+        Eagerly loaded with one query per collection, or left unloaded (lazy) for the
+        summaries, which never read them
+    """
+    strategy = selectinload if expand else lazyload
+    return [strategy(models.Trainer.inventory), strategy(models.Trainer.pokemons)]
+
+
+def get_trainer(database: Session, trainer_id: int, expand: bool = True):
     """
         Find a user by his id
     """
-    return database.query(models.Trainer).filter(models.Trainer.id == trainer_id).first()
+    return (database.query(models.Trainer).options(*trainer_loading(expand))
+            .filter(models.Trainer.id == trainer_id).first())
 
 
 def get_trainer_by_name(database: Session, name: str):
     """
         Find a user by his name
     """
-    return database.query(models.Trainer).filter(models.Trainer.name == name).all()
+    return (database.query(models.Trainer).options(*trainer_loading())
+            .filter(models.Trainer.name == name).all())
 
 
-def get_trainers(database: Session, skip: int = 0, limit: int = 100):
+def get_trainers(database: Session, skip: int = 0, limit: int = 100, expand: bool = True,
+                 after_id: int = None):
     """
         Find all users
         Default limit is 100
     """
-    return database.query(models.Trainer).offset(skip).limit(limit).all()
+    query = database.query(models.Trainer).options(*trainer_loading(expand))
+    return paginate(query, models.Trainer, skip, limit, after_id)
 
 
 def create_trainer(database: Session, trainer: schemas.TrainerCreate):
@@ -69,19 +160,30 @@ def create_trainer(database: Session, trainer: schemas.TrainerCreate):
     db_trainer = models.Trainer(name=trainer.name, birthdate=trainer.birthdate)
     database.add(db_trainer)
     database.commit()
+    response_cache.invalidate("trainers")
     database.refresh(db_trainer)
     return db_trainer
 
 
-def add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int):
+def add_trainer_pokemon(database: Session, pokemon: schemas.PokemonCreate, trainer_id: int,
+                        defer_name: bool = False):
     """
         Create a pokemon and link it to a trainer
+        With defer_name the name is resolved in background after the commit
     """
-    db_item = models.Pokemon(
-        **pokemon.dict(), name=get_pokemon_name(pokemon.api_id), trainer_id=trainer_id)
+    if defer_name:
+        db_item = models.Pokemon(**pokemon.dict(), name=None, name_status=models.NAME_PENDING,
+                                 trainer_id=trainer_id)
+    else:
+        db_item = models.Pokemon(
+            **pokemon.dict(), name=get_pokemon_name(pokemon.api_id), trainer_id=trainer_id)
     database.add(db_item)
+    database.execute(counter_update(trainer_id, models.Trainer.pokemon_count))
     database.commit()
+    response_cache.invalidate_trainer(trainer_id, "pokemons")
     database.refresh(db_item)
+    if defer_name:
+        name_resolver.submit(db_item.id, db_item.api_id)
     return db_item
 
 
@@ -91,17 +193,86 @@ def add_trainer_item(database: Session, item: schemas.ItemCreate, trainer_id: in
     """
     db_item = models.Item(**item.dict(), trainer_id=trainer_id)
     database.add(db_item)
+    database.execute(counter_update(trainer_id, models.Trainer.item_count))
     database.commit()
+    response_cache.invalidate_trainer(trainer_id, "items")
     database.refresh(db_item)
     return db_item
 
 
-def get_items(database: Session, skip: int = 0, limit: int = 100):
+def create_trainers(database: Session, trainers):
+    """
+        Create several trainers in one transaction
+        Return their ids
+    """
+    ids = bulk_insert(database, models.Trainer,
+                      [{"name": trainer.name, "birthdate": trainer.birthdate}
+                       for trainer in trainers])
+    response_cache.invalidate("trainers")
+    return ids
+
+
+def add_trainer_items(database: Session, items, trainer_id: int):
+    """
+        Create several items linked to a trainer in one transaction
+        Return their ids
+    """
+    ids = bulk_insert(database, models.Item,
+                      [{**item.dict(), "trainer_id": trainer_id} for item in items],
+                      counter=(trainer_id, models.Trainer.item_count))
+    response_cache.invalidate_trainer(trainer_id, "items")
+    return ids
+
+
+def add_trainer_pokemons(database: Session, pokemons, trainer_id: int, defer_name: bool = False):
+    """
+        Create several pokemons linked to a trainer in one transaction
+        Names are resolved with one lookup per distinct api_id, in background with defer_name
+        Return their ids
+    """
+    if defer_name:
+        ids = bulk_insert(database, models.Pokemon,
+                          [{**pokemon.dict(), "name": None, "name_status": models.NAME_PENDING,
+                            "trainer_id": trainer_id} for pokemon in pokemons],
+                          counter=(trainer_id, models.Trainer.pokemon_count))
+        response_cache.invalidate_trainer(trainer_id, "pokemons")
+        for pokemon_id, pokemon in zip(ids, pokemons):
+            name_resolver.submit(pokemon_id, pokemon.api_id)
+        return ids
+    names = get_pokemon_names(pokemon.api_id for pokemon in pokemons)
+    unknown = [api_id for api_id, name in names.items() if name is None]
+    if unknown:
+        raise ValueError(f"Unknown pokemon api_id: {unknown}")
+    ids = bulk_insert(database, models.Pokemon,
+                      [{**pokemon.dict(), "name": names[pokemon.api_id],
+                        "trainer_id": trainer_id} for pokemon in pokemons],
+                      counter=(trainer_id, models.Trainer.pokemon_count))
+    response_cache.invalidate_trainer(trainer_id, "pokemons")
+    return ids
+
+
+def bulk_insert(database: Session, model, mappings, counter=None):
+    """
+        Insert all mappings in one transaction and commit
+        counter (trainer_id, column) is increased by the number of rows in the same transaction
+        Return the ids of the new rows, read from each insert
+    """
+    if not mappings:
+        return []
+    statement = insert(model)
+    ids = [database.execute(statement, mapping).inserted_primary_key[0] for mapping in mappings]
+    if counter is not None:
+        database.execute(counter_update(*counter, amount=len(mappings)))
+    database.commit()
+    return ids
+
+
+def get_items(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):
     """
         Find all items
         Default limit is 100
     """
-    return database.query(models.Item).offset(skip).limit(limit).all()
+    return paginate(database.query(models.Item), models.Item, skip, limit, after_id)
 
 
 def get_pokemon(database: Session, pokemon_id: int):
@@ -111,9 +282,191 @@ def get_pokemon(database: Session, pokemon_id: int):
     return database.query(models.Pokemon).filter(models.Pokemon.id == pokemon_id).first()
 
 
-def get_pokemons(database: Session, skip: int = 0, limit: int = 100):
+def get_pokemons(database: Session, skip: int = 0, limit: int = 100, after_id: int = None):
     """
         Find all pokemons
         Default limit is 100
     """
-    return database.query(models.Pokemon).offset(skip).limit(limit).all()
+    return paginate(database.query(models.Pokemon), models.Pokemon, skip, limit, after_id)
+
+
+def paginate(query, model, skip: int, limit: int, after_id: int = None):
+    """
+        Order query by id and return the requested page
+        after_id keeps only the rows after this id (keyset pagination)
+    """
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    return query.order_by(model.id).offset(skip).limit(limit).all()
+
+
+def get_rows(database: Session, model, fields, skip: int = 0, limit: int = 100,
+             after_id: int = None):
+    """
+        Find a page of rows as tuples of the given columns
+    """
+    query = database.query(*columns(model, fields))
+    return paginate(query, model, skip, limit, after_id)
+
+
+def get_rows_by_trainer(database: Session, model, fields, trainer_ids):
+    """
+        Find the rows of model owned by the given trainers as tuples of the given columns
+    """
+    return (database.query(*columns(model, fields))
+            .filter(model.trainer_id.in_(trainer_ids)).order_by(model.id).all())
+
+
+COUNTERS = {"pokemons": models.Trainer.pokemon_count, "items": models.Trainer.item_count}
+
+
+def counter_update(trainer_id: int, column, amount: int = 1):
+    """
+        Statement increasing the counter column of a trainer
+    """
+    return (update(models.Trainer).where(models.Trainer.id == trainer_id)
+            .values({column.key: column + amount}))
+
+
+def top_trainers_statement(limit: int, by: str):
+    """
+        Statement of get_top_trainers, shared with 'app.actions_async'
+    """
+    count = COUNTERS[by]
+    return (select(models.Trainer.id, models.Trainer.name, count.label("count"))
+            .order_by(count.desc(), models.Trainer.id).limit(limit))
+
+
+def get_top_trainers(database: Session, limit: int = 10, by: str = "pokemons"):
+    """
+        Trainers with the most pokemons (or items), as (id, name, count) rows
+        Read from the indexed counters
+    """
+    return database.execute(top_trainers_statement(limit, by)).all()
+
+
+def species_popularity_statement(limit: int):
+    """
+        Statement of get_species_popularity, shared with 'app.actions_async'
+    """
+    count = func.count(models.Pokemon.id).label("count")
+    return (select(models.Pokemon.api_id, func.max(models.Pokemon.name).label("name"), count,
+                   func.count(models.Pokemon.trainer_id.distinct()).label("trainers"))
+            .group_by(models.Pokemon.api_id)
+            .order_by(count.desc(), models.Pokemon.api_id).limit(limit))
+
+
+def get_species_popularity(database: Session, limit: int = 10):
+    """
+        Most owned species, as (api_id, name, count, trainers) rows
+    """
+    return database.execute(species_popularity_statement(limit)).all()
+
+
+def trainer_counts_statement(trainer_id: int):
+    """
+        Statement of get_trainer_counts, shared with 'app.actions_async'
+    """
+    return (select(models.Trainer.id, models.Trainer.pokemon_count.label("pokemons"),
+                   models.Trainer.item_count.label("items"))
+            .where(models.Trainer.id == trainer_id))
+
+
+def get_trainer_counts(database: Session, trainer_id: int):
+    """
+        Number of pokemons and items of a trainer, as an (id, pokemons, items) row
+        None if the trainer does not exist
+    """
+    return database.execute(trainer_counts_statement(trainer_id)).first()
+
+
+def recount_statement():
+    """
+        Statement of recount, shared with 'app.actions_async'
+    """
+    def counted(model):
+        return (select(func.count(model.id)).where(model.trainer_id == models.Trainer.id)
+                .scalar_subquery())
+    return (update(models.Trainer)
+            .where((models.Trainer.pokemon_count != counted(models.Pokemon))
+                   | (models.Trainer.item_count != counted(models.Item)))
+            .values(pokemon_count=counted(models.Pokemon), item_count=counted(models.Item))
+            .execution_options(synchronize_session=False))
+
+
+def recount(database: Session):
+    """
+        Recompute the pokemon_count and item_count of every trainer
+        Return the number of trainers whose counters were wrong
+    """
+    result = database.execute(recount_statement())
+    database.commit()
+    return result.rowcount
+
+
+SEARCHES = {
+    "trainer": ("trainers_fts", "SELECT t.id, NULL AS trainer_id, t.name, NULL AS detail, "
+                                "bm25(trainers_fts) AS rank FROM trainers_fts "
+                                "JOIN trainers t ON t.id = trainers_fts.rowid"),
+    "pokemon": ("pokemons_fts", "SELECT p.id, p.trainer_id, p.name, p.custom_name AS detail, "
+                                "bm25(pokemons_fts) AS rank FROM pokemons_fts "
+                                "JOIN pokemons p ON p.id = pokemons_fts.rowid"),
+    "item": ("items_fts", "SELECT i.id, i.trainer_id, i.name, i.description AS detail, "
+                          "bm25(items_fts) AS rank FROM items_fts "
+                          "JOIN items i ON i.id = items_fts.rowid"),
+}
+
+
+def search(database: Session, query: str, limit: int = 20):
+    """
+        Full-text search of trainers, pokemons and items
+        Every word of query is matched as a prefix
+        bm25 scores of different tables are not comparable: the results are grouped by
+        type in the order of SEARCHES, best matches first within each type
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    results = []
+    for kind, statement in search_statements():
+        if len(results) >= limit:
+            break
+        rows = database.execute(statement, {"match": expression, "limit": limit - len(results)})
+        results.extend({"type": kind, **row._mapping} for row in rows)
+    return results
+
+
+def search_statements():
+    """
+        (type, statement) of each full-text search table, in the order of the results
+        Shared with 'app.actions_async'
+    """
+    return [(kind, text(f"{statement} WHERE {fts} MATCH :match ORDER BY rank LIMIT :limit"))
+            for kind, (fts, statement) in SEARCHES.items()]
+
+
+def iter_all(database: Session, model, batch_size: int = 1000):
+    """
+        Iterate over all rows of model ordered by id
+        Rows are fetched batch_size at a time
+    """
+    return database.query(model).order_by(model.id).yield_per(batch_size)
+
+
+def get_all_species(database: Session):
+    """
+        Find all species of the local pokedex
+    """
+    return database.query(models.Species).order_by(models.Species.id).all()
+
+
+def replace_species(database: Session, records):
+    """
+        Replace the local pokedex with the given records in one transaction
+        Return the number of species inserted
+    """
+    mappings = [models.Species.mapping(record) for record in records]
+    database.query(models.Species).delete()
+    database.bulk_insert_mappings(models.Species, mappings)
+    database.commit()
+    return len(mappings)
@@ -0,0 +1,354 @@
+"""
+Module contenant les versions asynchrones des fonctions d'action de l'application.
+
+Chaque fonction a la même signature et le même comportement que son équivalent de
+'app.actions', mais prend une AsyncSession (voir 'app.sqlite_async') et doit être
+attendue avec await. Les noms des pokémons sont résolus avec 'app.utils.pokeapi_async'.
+
+Fonctions :
+    - get_trainer(database: AsyncSession, trainer_id: int, expand: bool = True)
+    -> models.Trainer
+    - get_trainer_by_name(database: AsyncSession, name: str) -> List[models.Trainer]
+    - get_trainers(database: AsyncSession, skip: int = 0, limit: int = 100,
+    expand: bool = True, after_id: int = None) -> List[models.Trainer]
+    - create_trainer(database: AsyncSession, trainer: schemas.TrainerCreate) -> models.Trainer
+    - add_trainer_pokemon(database: AsyncSession,
+    pokemon: schemas.PokemonCreate, trainer_id: int, defer_name: bool = False) -> models.Pokemon
+    - add_trainer_item(database: AsyncSession, item: schemas.ItemCreate,
+    trainer_id: int) -> models.Item
+    - create_trainers(database: AsyncSession, trainers: List[schemas.TrainerCreate]) -> List[int]
+    - add_trainer_items(database: AsyncSession, items: List[schemas.ItemCreate],
+    trainer_id: int) -> List[int]
+    - add_trainer_pokemons(database: AsyncSession, pokemons: List[schemas.PokemonCreate],
+    trainer_id: int, defer_name: bool = False) -> List[int]
+    - get_items(database: AsyncSession, skip: int = 0, limit: int = 100,
+    after_id: int = None) -> List[models.Item]
+    - get_pokemon(database: AsyncSession, pokemon_id: int) -> models.Pokemon
+    - get_pokemons(database: AsyncSession, skip: int = 0, limit: int = 100,
+    after_id: int = None) -> List[models.Pokemon]
+    - get_rows(database: AsyncSession, model, fields: Tuple[str], skip: int = 0,
+    limit: int = 100, after_id: int = None) -> List[tuple]
+    - get_rows_by_trainer(database: AsyncSession, model, fields: Tuple[str],
+    trainer_ids: List[int]) -> List[tuple]
+    - get_top_trainers(database: AsyncSession, limit: int = 10, by: str = "pokemons")
+    -> List[tuple]
+    - get_species_popularity(database: AsyncSession, limit: int = 10) -> List[tuple]
+    - get_trainer_counts(database: AsyncSession, trainer_id: int) -> tuple
+    - recount(database: AsyncSession) -> int
+    - search(database: AsyncSession, query: str, limit: int = 20) -> List[dict]
+    - iter_all(database: AsyncSession, model, batch_size: int = 1000)
+    -> AsyncIterator[Base] : Générateur asynchrone (async for), lu par lots.
+    - get_all_species(database: AsyncSession) -> List[models.Species]
+    - replace_species(database: AsyncSession, records: Iterable[dict]) -> int
+
+Notes :
+    - Les objets créés n'ont pas besoin d'être rafraîchis après le commit
+    (expire_on_commit=False) ; leurs collections sont initialisées vides pour que leur
+    sérialisation ne déclenche pas de chargement implicite.
+    - Comme dans 'app.actions', les compteurs des dresseurs sont mis à jour dans la
+    transaction de l'ajout, et les écritures invalident les réponses mises en cache
+    (voir 'app.utils.response_cache').
+"""
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas
+from .actions import (counter_update, recount_statement, search_statements,
+                      species_popularity_statement, top_trainers_statement,
+                      trainer_counts_statement, trainer_loading)
+from .search import match_expression
+from .utils import pokeapi_async
+from .utils.fast_json import columns
+from .utils.name_resolver import name_resolver
+from .utils.response_cache import response_cache
+
+
+async def get_trainer(database: AsyncSession, trainer_id: int, expand: bool = True):
+    """
+        Find a user by his id
+    """
+    result = await database.execute(select(models.Trainer).options(*trainer_loading(expand))
+                                    .where(models.Trainer.id == trainer_id))
+    return result.scalars().first()
+
+
+async def get_trainer_by_name(database: AsyncSession, name: str):
+    """
+        Find a user by his name
+    """
+    result = await database.execute(select(models.Trainer).options(*trainer_loading())
+                                    .where(models.Trainer.name == name))
+    return result.scalars().all()
+
+
+async def get_trainers(database: AsyncSession, skip: int = 0, limit: int = 100,
+                       expand: bool = True, after_id: int = None):
+    """
+        Find all users
+        Default limit is 100
+    """
+    return await paginate(database, select(models.Trainer).options(*trainer_loading(expand)),
+                          models.Trainer, skip, limit, after_id)
+
+
+async def create_trainer(database: AsyncSession, trainer: schemas.TrainerCreate):
+    """
+        Create a new trainer
+    """
+    db_trainer = models.Trainer(name=trainer.name, birthdate=trainer.birthdate,
+                                inventory=[], pokemons=[])
+    database.add(db_trainer)
+    await database.commit()
+    response_cache.invalidate("trainers")
+    return db_trainer
+
+
+async def add_trainer_pokemon(database: AsyncSession, pokemon: schemas.PokemonCreate,
+                              trainer_id: int, defer_name: bool = False):
+    """
+        Create a pokemon and link it to a trainer
+        With defer_name the name is resolved in background after the commit
+    """
+    if defer_name:
+        db_item = models.Pokemon(**pokemon.dict(), name=None, name_status=models.NAME_PENDING,
+                                 trainer_id=trainer_id)
+    else:
+        data = await pokeapi_async.get_pokemon_data(pokemon.api_id)
+        db_item = models.Pokemon(**pokemon.dict(), name=data.name,
+                                 name_status=models.NAME_RESOLVED, trainer_id=trainer_id)
+    database.add(db_item)
+    await database.execute(counter_update(trainer_id, models.Trainer.pokemon_count))
+    await database.commit()
+    response_cache.invalidate_trainer(trainer_id, "pokemons")
+    if defer_name:
+        name_resolver.submit(db_item.id, db_item.api_id)
+    return db_item
+
+
+async def add_trainer_item(database: AsyncSession, item: schemas.ItemCreate, trainer_id: int):
+    """
+        Create an item and link it to a trainer
+    """
+    db_item = models.Item(**item.dict(), trainer_id=trainer_id)
+    database.add(db_item)
+    await database.execute(counter_update(trainer_id, models.Trainer.item_count))
+    await database.commit()
+    response_cache.invalidate_trainer(trainer_id, "items")
+    return db_item
+
+
+async def create_trainers(database: AsyncSession, trainers):
+    """
+        Create several trainers in one transaction
+        Return their ids
+    """
+    ids = await bulk_insert(database, models.Trainer,
+                            [{"name": trainer.name, "birthdate": trainer.birthdate}
+                             for trainer in trainers])
+    response_cache.invalidate("trainers")
+    return ids
+
+
+async def add_trainer_items(database: AsyncSession, items, trainer_id: int):
+    """
+        Create several items linked to a trainer in one transaction
+        Return their ids
+    """
+    ids = await bulk_insert(database, models.Item,
+                            [{**item.dict(), "trainer_id": trainer_id} for item in items],
+                            counter=(trainer_id, models.Trainer.item_count))
+    response_cache.invalidate_trainer(trainer_id, "items")
+    return ids
+
+
+async def add_trainer_pokemons(database: AsyncSession, pokemons, trainer_id: int,
+                               defer_name: bool = False):
+    """
+        Create several pokemons linked to a trainer in one transaction
+        Names are resolved with one lookup per distinct api_id, in background with defer_name
+        Return their ids
+    """
+    if defer_name:
+        ids = await bulk_insert(database, models.Pokemon,
+                                [{**pokemon.dict(), "name": None,
+                                  "name_status": models.NAME_PENDING,
+                                  "trainer_id": trainer_id} for pokemon in pokemons],
+                                counter=(trainer_id, models.Trainer.pokemon_count))
+        response_cache.invalidate_trainer(trainer_id, "pokemons")
+        for pokemon_id, pokemon in zip(ids, pokemons):
+            name_resolver.submit(pokemon_id, pokemon.api_id)
+        return ids
+    names = await pokeapi_async.get_pokemon_names(pokemon.api_id for pokemon in pokemons)
+    unknown = [api_id for api_id, name in names.items() if name is None]
+    if unknown:
+        raise ValueError(f"Unknown pokemon api_id: {unknown}")
+    ids = await bulk_insert(database, models.Pokemon,
+                            [{**pokemon.dict(), "name": names[pokemon.api_id],
+                              "trainer_id": trainer_id} for pokemon in pokemons],
+                            counter=(trainer_id, models.Trainer.pokemon_count))
+    response_cache.invalidate_trainer(trainer_id, "pokemons")
+    return ids
+
+
+async def bulk_insert(database: AsyncSession, model, mappings, counter=None):
+    """
+        Insert all mappings in one transaction and commit
+        counter (trainer_id, column) is increased by the number of rows in the same transaction
+        Return the ids of the new rows, read from each insert
+    """
+    if not mappings:
+        return []
+    statement = insert(model)
+    ids = [(await database.execute(statement, mapping)).inserted_primary_key[0]
+           for mapping in mappings]
+    if counter is not None:
+        await database.execute(counter_update(*counter, amount=len(mappings)))
+    await database.commit()
+    return ids
+
+
+async def get_items(database: AsyncSession, skip: int = 0, limit: int = 100,
+                    after_id: int = None):
+    """
+        Find all items
+        Default limit is 100
+    """
+    return await paginate(database, select(models.Item), models.Item, skip, limit, after_id)
+
+
+async def get_pokemon(database: AsyncSession, pokemon_id: int):
+    """
+        Find a pokemon by his id
+    """
+    return await database.get(models.Pokemon, pokemon_id)
+
+
+async def get_pokemons(database: AsyncSession, skip: int = 0, limit: int = 100,
+                       after_id: int = None):
+    """
+        Find all pokemons
+        Default limit is 100
+    """
+    return await paginate(database, select(models.Pokemon), models.Pokemon,
+                          skip, limit, after_id)
+
+
+async def paginate(database: AsyncSession, statement, model, skip: int, limit: int,
+                   after_id: int = None):
+    """
+        Order statement by id and return the requested page
+        after_id keeps only the rows after this id (keyset pagination)
+    """
+    if after_id is not None:
+        statement = statement.where(model.id > after_id)
+    result = await database.execute(statement.order_by(model.id).offset(skip).limit(limit))
+    return result.scalars().all()
+
+
+async def get_rows(database: AsyncSession, model, fields, skip: int = 0, limit: int = 100,
+                   after_id: int = None):
+    """
+        Find a page of rows as tuples of the given columns
+    """
+    statement = select(*columns(model, fields))
+    if after_id is not None:
+        statement = statement.where(model.id > after_id)
+    result = await database.execute(statement.order_by(model.id).offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_rows_by_trainer(database: AsyncSession, model, fields, trainer_ids):
+    """
+        Find the rows of model owned by the given trainers as tuples of the given columns
+    """
+    result = await database.execute(select(*columns(model, fields))
+                                    .where(model.trainer_id.in_(trainer_ids))
+                                    .order_by(model.id))
+    return result.all()
+
+
+async def get_top_trainers(database: AsyncSession, limit: int = 10, by: str = "pokemons"):
+    """
+        Trainers with the most pokemons (or items), as (id, name, count) rows
+        Read from the indexed counters
+    """
+    result = await database.execute(top_trainers_statement(limit, by))
+    return result.all()
+
+
+async def get_species_popularity(database: AsyncSession, limit: int = 10):
+    """
+        Most owned species, as (api_id, name, count, trainers) rows
+    """
+    result = await database.execute(species_popularity_statement(limit))
+    return result.all()
+
+
+async def get_trainer_counts(database: AsyncSession, trainer_id: int):
+    """
+        Number of pokemons and items of a trainer, as an (id, pokemons, items) row
+        None if the trainer does not exist
+    """
+    result = await database.execute(trainer_counts_statement(trainer_id))
+    return result.first()
+
+
+async def recount(database: AsyncSession):
+    """
+        Recompute the pokemon_count and item_count of every trainer
+        Return the number of trainers whose counters were wrong
+    """
+    result = await database.execute(recount_statement())
+    await database.commit()
+    return result.rowcount
+
+
+async def search(database: AsyncSession, query: str, limit: int = 20):
+    """
+        Full-text search of trainers, pokemons and items
+        Every word of query is matched as a prefix
+        Grouped by type in the order of 'app.actions.SEARCHES', best matches first in each type
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    results = []
+    for kind, statement in search_statements():
+        if len(results) >= limit:
+            break
+        rows = await database.execute(statement, {"match": expression,
+                                                  "limit": limit - len(results)})
+        results.extend({"type": kind, **row._mapping} for row in rows)
+    return results
+
+
+async def iter_all(database: AsyncSession, model, batch_size: int = 1000):
+    """
+        Iterate over all rows of model ordered by id
+        Rows are fetched batch_size at a time
+    """
+    result = await database.stream(select(model).order_by(model.id)
+                                   .execution_options(yield_per=batch_size))
+    async for row in result.scalars():
+        yield row
+
+
+async def get_all_species(database: AsyncSession):
+    """
+        Find all species of the local pokedex
+    """
+    result = await database.execute(select(models.Species).order_by(models.Species.id))
+    return result.scalars().all()
+
+
+async def replace_species(database: AsyncSession, records):
+    """
+        Replace the local pokedex with the given records in one transaction
+        Return the number of species inserted
+    """
+    mappings = [models.Species.mapping(record) for record in records]
+    await database.execute(delete(models.Species))
+    if mappings:
+        await database.execute(insert(models.Species), mappings)
+    await database.commit()
+    return len(mappings)
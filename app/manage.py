@@ -0,0 +1,162 @@
+"""
+Module contenant les commandes d'administration de l'application.
+
+Utilisation :
+    > python -m app.manage import-pokedex --file pokedex.json
+    > python -m app.manage import-pokedex --download [--first 1] [--last 898]
+    > python -m app.manage export-pokedex --file pokedex.json
+    > python -m app.manage build-battle-table [--file battle_table.npy]
+    > python -m app.manage migrate
+    > python -m app.manage recount
+
+Commandes :
+    - import-pokedex : Remplace la table "species" par un instantané du Pokédex,
+    lu depuis un fichier JSON ou msgpack (fonctionne hors ligne) ou téléchargé
+    depuis PokeAPI en parallèle.
+    - export-pokedex : Écrit le contenu de la table "species" dans un fichier JSON
+    ou msgpack, réutilisable par import-pokedex.
+    - build-battle-table : Précalcule la table de tous les combats entre les espèces
+    de la table "species" (voir 'app.utils.battle.BattleTable').
+    - migrate : Met à jour le schéma d'une base existante (voir 'app.migrations').
+    - recount : Recalcule les compteurs pokemon_count et item_count des dresseurs
+    (par exemple après des modifications faites hors de l'application).
+
+Notes :
+    - Le format du fichier est une liste de {"id": int, "name": str, "stats": [6 x int]},
+    les statistiques étant dans l'ordre de PokeAPI (hp, attack, defense,
+    special-attack, special-defense, speed).
+"""
+
+import argparse
+import asyncio
+import json
+from app import actions, models
+from app.migrations import migrate
+from app.sqlite import SessionLocal, engine
+from app.utils import pokeapi_async
+from app.utils.battle import BATTLE_TABLE_PATH, build_battle_table
+from app.utils.pokeapi import POKEDEX_SIZE
+
+
+def read_snapshot(path):
+    """
+        Read a pokedex snapshot from a json or msgpack file
+    """
+    if path.endswith(".msgpack"):
+        import msgpack  # pylint: disable=import-outside-toplevel
+        with open(path, "rb") as snapshot:
+            return msgpack.unpackb(snapshot.read())
+    with open(path, encoding="utf-8") as snapshot:
+        return json.load(snapshot)
+
+
+def write_snapshot(path, records):
+    """
+        Write a pokedex snapshot to a json or msgpack file
+    """
+    if path.endswith(".msgpack"):
+        import msgpack  # pylint: disable=import-outside-toplevel
+        with open(path, "wb") as snapshot:
+            snapshot.write(msgpack.packb(records))
+        return
+    with open(path, "w", encoding="utf-8") as snapshot:
+        json.dump(records, snapshot)
+
+
+async def download_pokedex(first, last):
+    """
+        Download the species first..last from pokeapi concurrently
+    """
+    try:
+        payloads = await pokeapi_async.get_pokemons_data(range(first, last + 1))
+    finally:
+        await pokeapi_async.close_client()
+    return [record.to_dict() for record in payloads if record is not None]
+
+
+def import_pokedex(args):
+    """
+        Replace the species table with a snapshot file or a pokeapi download
+    """
+    if args.download:
+        records = asyncio.run(download_pokedex(args.first, args.last))
+    else:
+        records = read_snapshot(args.file)
+    with SessionLocal() as database:
+        count = actions.replace_species(database, records)
+    print(f"{count} species imported")
+
+
+def export_pokedex(args):
+    """
+        Write the species table to a snapshot file
+    """
+    with SessionLocal() as database:
+        records = [species.to_dict() for species in actions.get_all_species(database)]
+    write_snapshot(args.file, records)
+    print(f"{len(records)} species exported to {args.file}")
+
+
+def build_table(args):
+    """
+        Precompute the battle table of the local pokedex
+    """
+    with SessionLocal() as database:
+        count = build_battle_table(actions.get_all_species(database), args.file)
+    print(f"battle table of {count} species written to {args.file}")
+
+
+def migrate_database(_args):
+    """
+        Apply the schema migrations
+    """
+    applied = migrate(engine)
+    print(f"{len(applied)} migrations applied: {', '.join(applied)}" if applied
+          else "database up to date")
+
+
+def recount_trainers(_args):
+    """
+        Repair the trainer counters
+    """
+    with SessionLocal() as database:
+        count = actions.recount(database)
+    print(f"{count} trainers repaired")
+
+
+def main(argv=None):
+    """
+        Parse the command line and run the command
+    """
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import-pokedex", help="load the local pokedex")
+    source = import_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="json or msgpack snapshot to load")
+    source.add_argument("--download", action="store_true", help="download from pokeapi")
+    import_parser.add_argument("--first", type=int, default=1)
+    import_parser.add_argument("--last", type=int, default=POKEDEX_SIZE)
+    import_parser.set_defaults(handler=import_pokedex)
+
+    export_parser = commands.add_parser("export-pokedex", help="dump the local pokedex")
+    export_parser.add_argument("--file", required=True, help="json or msgpack snapshot to write")
+    export_parser.set_defaults(handler=export_pokedex)
+
+    table_parser = commands.add_parser("build-battle-table", help="precompute all battles")
+    table_parser.add_argument("--file", default=BATTLE_TABLE_PATH, help="npy file to write")
+    table_parser.set_defaults(handler=build_table)
+
+    migrate_parser = commands.add_parser("migrate", help="upgrade the database schema")
+    migrate_parser.set_defaults(handler=migrate_database)
+
+    recount_parser = commands.add_parser("recount", help="repair the trainer counters")
+    recount_parser.set_defaults(handler=recount_trainers)
+
+    args = parser.parse_args(argv)
+    models.Base.metadata.create_all(bind=engine)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
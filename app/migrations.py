@@ -0,0 +1,122 @@
+"""
+Module contenant les migrations du schéma de la base de données.
+
+"Base.metadata.create_all" crée les tables manquantes mais ne modifie pas les
+tables existantes : les migrations de ce module mettent à jour une base créée par
+une version précédente de l'application (par exemple "./sqlite.db").
+Chaque migration est idempotente et peut donc être rejouée sans risque.
+
+Fonctions :
+    - migrate(engine: Engine) -> List[str]:
+        Applique les migrations dans l'ordre et retourne le nom de celles qui ont
+        modifié la base.
+
+Notes :
+    - Les migrations sont appliquées au démarrage de l'application (voir 'main') et
+    par "python -m app.manage migrate", jamais à l'import d'un module.
+"""
+
+from sqlalchemy import inspect
+from .search import create_search_tables
+
+
+def column_names(connection, table):
+    """
+        Names of the columns of table
+    """
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def index_names(connection, table):
+    """
+        Names of the indexes of table
+    """
+    return {index["name"] for index in inspect(connection).get_indexes(table)}
+
+
+def add_pokemon_name_status(connection):
+    """
+        Add pokemons.name_status, existing pokemons are resolved
+    """
+    if "name_status" in column_names(connection, "pokemons"):
+        return False
+    connection.exec_driver_sql(
+        "ALTER TABLE pokemons ADD COLUMN name_status VARCHAR NOT NULL DEFAULT 'resolved'")
+    return True
+
+
+def add_trainer_counters(connection):
+    """
+        Add trainers.pokemon_count and trainers.item_count, computed from the existing rows,
+        and their indexes
+    """
+    if "pokemon_count" in column_names(connection, "trainers"):
+        return False
+    for counter, table in (("pokemon_count", "pokemons"), ("item_count", "items")):
+        connection.exec_driver_sql(
+            f"ALTER TABLE trainers ADD COLUMN {counter} INTEGER NOT NULL DEFAULT 0")
+        connection.exec_driver_sql(
+            f"UPDATE trainers SET {counter} = "
+            f"(SELECT count(*) FROM {table} WHERE {table}.trainer_id = trainers.id)")
+        if f"ix_trainers_{counter}" not in index_names(connection, "trainers"):
+            connection.exec_driver_sql(
+                f"CREATE INDEX ix_trainers_{counter} ON trainers ({counter} DESC, id)")
+    return True
+
+
+OBSOLETE_INDEXES = {
+    "trainers": ["ix_trainers_id"],
+    "pokemons": ["ix_pokemons_id", "ix_pokemons_name", "ix_pokemons_custom_name"],
+    "items": ["ix_items_id", "ix_items_name", "ix_items_description"],
+}
+
+NEW_INDEXES = {
+    "pokemons": {"ix_pokemons_trainer_id_api_id": "(trainer_id, api_id)"},
+    "items": {"ix_items_trainer_id": "(trainer_id)"},
+}
+
+
+def rework_indexes(connection):
+    """
+        Drop the indexes no query uses and index the trainer_id foreign keys
+    """
+    changed = False
+    for table, names in OBSOLETE_INDEXES.items():
+        for name in set(names) & index_names(connection, table):
+            connection.exec_driver_sql(f"DROP INDEX {name}")
+            changed = True
+    for table, indexes in NEW_INDEXES.items():
+        existing = index_names(connection, table)
+        for name, columns in indexes.items():
+            if name not in existing:
+                connection.exec_driver_sql(f"CREATE INDEX {name} ON {table} {columns}")
+                changed = True
+    return changed
+
+
+def add_search_tables(connection):
+    """
+        Add the full-text search tables and index the existing rows
+    """
+    return create_search_tables(connection)
+
+
+MIGRATIONS = [
+    add_pokemon_name_status,
+    add_trainer_counters,
+    rework_indexes,
+    add_search_tables,
+]
+
+
+def migrate(engine):
+    """
+        Apply every migration in order
+        Return the names of the migrations which changed the database
+    """
+    applied = []
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            if migration(connection):
+                applied.append(migration.__name__)
+    return applied
@@ -1,33 +1,60 @@
 """
 Module représentant les modèles de données pour une application de formation de Pokemon.
 
-Ce module définit trois modèles SQLAlchemy : Trainer, Pokemon et Item.
-Ces modèles sont utilisés pour stocker des informations sur les dresseurs, leurs pokémons et
-les objets qu'ils possèdent.
+Ce module définit quatre modèles SQLAlchemy : Trainer, Pokemon, Item et Species.
+Ces modèles sont utilisés pour stocker des informations sur les dresseurs, leurs pokémons,
+les objets qu'ils possèdent et une copie locale du Pokédex de PokeAPI.
 
 Classes :
     - Trainer : Représente un dresseur de pokémon.
     - Pokemon : Représente un pokémon associé à un dresseur.
     - Item : Représente un objet dans l'inventaire d'un dresseur.
+    - Species : Représente une espèce de Pokémon (nom et statistiques de base).
+
+Notes :
+    - Les index suivent les requêtes de l'application : trainers.name
+    (get_trainer_by_name), items.trainer_id et pokemons (trainer_id, api_id) pour le
+    chargement des collections d'un dresseur, pokemons.api_id pour la popularité des
+    espèces, et les compteurs des dresseurs pour les classements. Les clés primaires
+    n'ont pas d'index supplémentaire (rowid).
+    - "create_all" crée aussi les tables de recherche plein texte (voir 'app.search').
+    - Species lit et produit ses enregistrements (instantanés, réponses PokeAPI) via
+    'app.utils.species.SpeciesRecord'.
 """
 
-from sqlalchemy import Column, ForeignKey, Integer, String, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Date, event, func, inspect
+from sqlalchemy.orm import object_session, relationship
+from .search import create_search_tables
 from .sqlite import Base
+from .utils import species
+
+NAME_RESOLVED = "resolved"
+NAME_PENDING = "pending"
+NAME_FAILED = "failed"
 
 
 class Trainer(Base):
     """
         Class representing a pokemon trainer
+        Parameters:
+            pokemon_count (int), item_count (int): size of the collections, kept in
+            sync by the actions for ranking queries
     """
     __tablename__ = "trainers"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, index=True)
     birthdate = Column(Date)
+    pokemon_count = Column(Integer, nullable=False, default=0, server_default="0")
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    inventory = relationship("Item", back_populates="trainer", order_by="Item.id")
+    pokemons = relationship("Pokemon", back_populates="trainer", order_by="Pokemon.id")
 
-    inventory = relationship("Item", back_populates="trainer")
-    pokemons = relationship("Pokemon", back_populates="trainer")
+    __table_args__ = (
+        Index("ix_trainers_pokemon_count", pokemon_count.desc(), id),
+        Index("ix_trainers_item_count", item_count.desc(), id),
+    )
 
     def __str__(self):
         return f"Trainer(id={self.id}, name={self.name}, birthdate={self.birthdate})"
@@ -35,8 +62,27 @@ class Trainer(Base):
     def get_pokemon_count(self):
         """
         Get the count of pokemons associated with the trainer.
+        The size of the collection if it is loaded, otherwise a COUNT query that
+        does not load it. Nothing is flushed.
+        """
+        state = inspect(self)
+        session = object_session(self)
+        if "pokemons" not in state.unloaded or session is None or not state.persistent:
+            return len(self.pokemons)
+        return session.query(func.count(Pokemon.id)) \
+            .filter(Pokemon.trainer_id == self.id).scalar()
+
+    def to_dict(self):
         """
-        return len(self.pokemons)
+        Converts the Trainer instance to a dictionary, without its collections.
+        Returns:
+            dict: A dictionary representation of the Trainer.
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "birthdate": self.birthdate
+        }
 
 
 class Pokemon(Base):
@@ -45,18 +91,26 @@ class Pokemon(Base):
    Parameters:
        api_id (int): id from the pokeapi
        name (str): Populate with the pokeapi data
+       name_status (str): "resolved", or "pending"/"failed" while name is resolved
+       in background
    """
 
     __tablename__ = "pokemons"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     api_id = Column(Integer, index=True)
-    name = Column(String, index=True)
-    custom_name = Column(String, index=True)
+    name = Column(String)
+    custom_name = Column(String)
     trainer_id = Column(Integer, ForeignKey("trainers.id"))
+    name_status = Column(String, nullable=False, default=NAME_RESOLVED,
+                         server_default=NAME_RESOLVED)
 
     trainer = relationship("Trainer", back_populates="pokemons")
 
+    __table_args__ = (
+        Index("ix_pokemons_trainer_id_api_id", trainer_id, api_id),
+    )
+
     def __str__(self):
         """
                         Returns a string representation of the Pokemon.
@@ -84,10 +138,10 @@ class Item(Base):
     """
     __tablename__ = "items"
 
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    description = Column(String, index=True)
-    trainer_id = Column(Integer, ForeignKey("trainers.id"))
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    description = Column(String)
+    trainer_id = Column(Integer, ForeignKey("trainers.id"), index=True)
 
     trainer = relationship("Trainer", back_populates="inventory")
 
@@ -109,3 +163,68 @@ class Item(Base):
             "description": self.description,
             "trainer_id": self.trainer_id
         }
+
+
+class Species(Base):
+    """
+        Class representing a pokemon species from the local pokedex
+        Parameters:
+            id (int): id from the pokeapi
+            name (str): name from the pokeapi
+    """
+    __tablename__ = "species"
+
+    STAT_NAMES = species.STAT_NAMES
+    STAT_COLUMNS = ("hp", "attack", "defense", "special_attack", "special_defense", "speed")
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    hp = Column(Integer, nullable=False)
+    attack = Column(Integer, nullable=False)
+    defense = Column(Integer, nullable=False)
+    special_attack = Column(Integer, nullable=False)
+    special_defense = Column(Integer, nullable=False)
+    speed = Column(Integer, nullable=False)
+
+    def __str__(self):
+        return f"Species(id={self.id}, name={self.name})"
+
+    @property
+    def stats(self):
+        """
+        Base stats in the pokeapi order.
+        """
+        return [self.hp, self.attack, self.defense,
+                self.special_attack, self.special_defense, self.speed]
+
+    def record(self):
+        """
+        Converts the Species instance to a compact species record.
+        """
+        return species.SpeciesRecord(self.id, self.name, tuple(self.stats))
+
+    def to_dict(self):
+        """
+        Converts the Species instance to a dictionary.
+        Returns:
+            dict: A dictionary representation of the Species, as stored in a pokedex snapshot.
+        """
+        return self.record().to_dict()
+
+    @classmethod
+    def mapping(cls, record):
+        """
+        Converts a snapshot record or a pokeapi payload to a column mapping.
+        Raises ValueError if it does not have exactly six base stats.
+        """
+        parsed = species.SpeciesRecord.parse(record)
+        return {"id": parsed.id, "name": parsed.name,
+                **dict(zip(cls.STAT_COLUMNS, parsed.stats))}
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(_metadata, connection, **_kwargs):
+    """
+        Create the full-text search tables with the other tables
+    """
+    create_search_tables(connection)
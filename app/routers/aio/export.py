@@ -0,0 +1,34 @@
+"""
+Module contenant la version asynchrone du routeur d'export.
+
+Même endpoint que 'app.routers.export', implémenté avec une route "async def" : les
+lignes sont lues par lots ('actions_async.iter_all') et envoyées au fur et à mesure
+par un générateur asynchrone (utilisé avec DB_MODE=async).
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.routers import export
+from app.utils.utils import get_async_db
+from app import actions_async
+
+router = APIRouter()
+
+
+@router.get("/{table}")
+async def export_table(table: str, export_format: str = Query("ndjson", alias="format",
+                                                               regex="^(ndjson|csv)$"),
+                       database: AsyncSession = Depends(get_async_db)):
+    """
+        Stream all rows of a table as ndjson or csv
+    """
+    model = export.EXPORTS.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Unknown table")
+    rows = (row.to_dict() async for row in
+            actions_async.iter_all(database, model, batch_size=export.BATCH_SIZE))
+    return export.export_response(export.async_lines(rows, export_format), table,
+                                  export_format)
@@ -0,0 +1,37 @@
+"""
+Module contenant la version asynchrone du routeur des objets.
+
+Mêmes endpoints que 'app.routers.items', implémentés avec des routes "async def"
+et les actions de 'app.actions_async' (utilisé avec DB_MODE=async).
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+"""
+
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Request, Response
+from app.utils.fast_json import ITEM_FIELDS, encode_rows, json_response
+from app.utils.utils import decode_cursor, get_async_db, next_page_headers
+from app import actions_async, models, schemas
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[schemas.Item])
+async def get_items(request: Request, response: Response, skip: int = 0, limit: int = 100,
+                    cursor: Optional[str] = None, fast: bool = False,
+                    database: AsyncSession = Depends(get_async_db)):
+    """
+        Return all items
+        Default limit is 100
+    """
+    if fast:
+        rows = await actions_async.get_rows(database, models.Item, ITEM_FIELDS, skip=skip,
+                                            limit=limit, after_id=decode_cursor(cursor))
+        return json_response(encode_rows(ITEM_FIELDS, rows),
+                             next_page_headers(request, rows, limit))
+    items = await actions_async.get_items(database, skip=skip, limit=limit,
+                                          after_id=decode_cursor(cursor))
+    response.headers.update(next_page_headers(request, items, limit))
+    return items
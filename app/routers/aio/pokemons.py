@@ -0,0 +1,50 @@
+"""
+Module contenant la version asynchrone du routeur des pokémons.
+
+Mêmes endpoints de lecture de la base que 'app.routers.pokemons.router',
+implémentés avec des routes "async def" et les actions de 'app.actions_async'
+(utilisé avec DB_MODE=async). Les routes PokeAPI restent dans
+'app.routers.pokemons.pokeapi_router', déjà asynchrones.
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+"""
+
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.utils.fast_json import POKEMON_FIELDS, encode_rows, json_response
+from app.utils.utils import decode_cursor, get_async_db, next_page_headers
+from app import actions_async, models, schemas
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[schemas.Pokemon])
+async def get_pokemons(request: Request, response: Response, skip: int = 0, limit: int = 100,
+                       cursor: Optional[str] = None, fast: bool = False,
+                       database: AsyncSession = Depends(get_async_db)):
+    """
+        Return all pokemons
+        Default limit is 100
+    """
+    if fast:
+        rows = await actions_async.get_rows(database, models.Pokemon, POKEMON_FIELDS, skip=skip,
+                                            limit=limit, after_id=decode_cursor(cursor))
+        return json_response(encode_rows(POKEMON_FIELDS, rows),
+                             next_page_headers(request, rows, limit))
+    pokemons = await actions_async.get_pokemons(database, skip=skip, limit=limit,
+                                                after_id=decode_cursor(cursor))
+    response.headers.update(next_page_headers(request, pokemons, limit))
+    return pokemons
+
+
+@router.get("/{pokemon_id:int}", response_model=schemas.Pokemon)
+async def get_pokemon(pokemon_id: int, database: AsyncSession = Depends(get_async_db)):
+    """
+        Return pokemon from his id
+    """
+    db_pokemon = await actions_async.get_pokemon(database, pokemon_id=pokemon_id)
+    if db_pokemon is None:
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+    return db_pokemon
@@ -0,0 +1,26 @@
+"""
+Module contenant la version asynchrone du routeur de la recherche plein texte.
+
+Même endpoint que 'app.routers.search', implémenté avec une route "async def"
+et les actions de 'app.actions_async' (utilisé avec DB_MODE=async).
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+"""
+
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, Query
+from app.utils.utils import get_async_db
+from app import actions_async, schemas
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[schemas.SearchResult])
+async def search(q: str = Query(..., max_length=200), limit: int = Query(20, ge=1, le=100),
+                 database: AsyncSession = Depends(get_async_db)):
+    """
+        Full-text search of trainers, pokemons and items
+    """
+    return await actions_async.search(database, q, limit=limit)
@@ -0,0 +1,47 @@
+"""
+Module contenant la version asynchrone du routeur des statistiques.
+
+Mêmes endpoints que 'app.routers.stats', implémentés avec des routes "async def"
+et les actions de 'app.actions_async' (utilisé avec DB_MODE=async).
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+"""
+
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.utils.utils import get_async_db
+from app import actions_async, schemas
+
+router = APIRouter()
+
+
+@router.get("/trainers/top", response_model=List[schemas.TrainerRank])
+async def top_trainers(limit: int = Query(10, ge=1, le=1000),
+                       by: str = Query("pokemons", regex="^(pokemons|items)$"),
+                       database: AsyncSession = Depends(get_async_db)):
+    """
+        Trainers with the most pokemons or items
+    """
+    return await actions_async.get_top_trainers(database, limit=limit, by=by)
+
+
+@router.get("/species/popularity", response_model=List[schemas.SpeciesPopularity])
+async def species_popularity(limit: int = Query(10, ge=1, le=1000),
+                             database: AsyncSession = Depends(get_async_db)):
+    """
+        Most owned species
+    """
+    return await actions_async.get_species_popularity(database, limit=limit)
+
+
+@router.get("/trainers/{trainer_id}", response_model=schemas.TrainerCounts)
+async def trainer_counts(trainer_id: int, database: AsyncSession = Depends(get_async_db)):
+    """
+        Number of pokemons and items of a trainer
+    """
+    counts = await actions_async.get_trainer_counts(database, trainer_id=trainer_id)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    return counts
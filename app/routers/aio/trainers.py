@@ -0,0 +1,140 @@
+"""
+Module contenant la version asynchrone du routeur des dresseurs.
+
+Mêmes endpoints que 'app.routers.trainers', implémentés avec des routes "async def"
+et les actions de 'app.actions_async' (utilisé avec DB_MODE=async).
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+"""
+
+from typing import List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.routers.trainers import summarize
+from app.utils.fast_json import (ITEM_FIELDS, POKEMON_FIELDS, TRAINER_FIELDS,
+                                 encode_trainers, json_response)
+from app.utils.utils import bulk_body, decode_cursor, get_async_db, next_page_headers
+from app import actions_async, models, schemas
+
+router = APIRouter()
+
+
+@router.post("/", response_model=schemas.Trainer)
+async def create_trainer(trainer: schemas.TrainerCreate,
+                         database: AsyncSession = Depends(get_async_db)):
+    """
+        Create a trainer
+    """
+    return await actions_async.create_trainer(database=database, trainer=trainer)
+
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_trainers(
+    trainers: List[schemas.TrainerCreate] = Depends(bulk_body(schemas.TrainerCreate)),
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Create many trainers in one transaction
+    """
+    return {"ids": await actions_async.create_trainers(database=database, trainers=trainers)}
+
+
+@router.get("", response_model=Union[List[schemas.Trainer], List[schemas.TrainerSummary]],
+            response_model_exclude_unset=True)
+async def get_trainers(request: Request, response: Response, skip: int = 0, limit: int = 100,
+                       cursor: Optional[str] = None, expand: bool = True, fast: bool = False,
+                       database: AsyncSession = Depends(get_async_db)):
+    """
+        Return all trainers
+        Default limit is 100
+    """
+    if fast:
+        rows = await actions_async.get_rows(database, models.Trainer, TRAINER_FIELDS, skip=skip,
+                                            limit=limit, after_id=decode_cursor(cursor))
+        collections = []
+        if expand:
+            trainer_ids = [row.id for row in rows]
+            collections = [
+                await actions_async.get_rows_by_trainer(database, models.Item, ITEM_FIELDS,
+                                                        trainer_ids),
+                await actions_async.get_rows_by_trainer(database, models.Pokemon,
+                                                        POKEMON_FIELDS, trainer_ids)]
+        return json_response(encode_trainers(rows, *collections),
+                             next_page_headers(request, rows, limit))
+    trainers = await actions_async.get_trainers(database, skip=skip, limit=limit, expand=expand,
+                                                after_id=decode_cursor(cursor))
+    response.headers.update(next_page_headers(request, trainers, limit))
+    if not expand:
+        return summarize(trainers)
+    return trainers
+
+
+@router.get("/{trainer_id}", response_model=Union[schemas.Trainer, schemas.TrainerSummary],
+            response_model_exclude_unset=True)
+async def get_trainer(trainer_id: int, expand: bool = True,
+                      database: AsyncSession = Depends(get_async_db)):
+    """
+        Return trainer from his id
+    """
+    db_trainer = await actions_async.get_trainer(database, trainer_id=trainer_id, expand=expand)
+    if db_trainer is None:
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    if not expand:
+        return summarize(db_trainer)
+    return db_trainer
+
+
+@router.post("/{trainer_id}/item/", response_model=schemas.Item)
+async def create_item_for_trainer(
+    trainer_id: int, item: schemas.ItemCreate, database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add an item in trainer inventory
+    """
+    return await actions_async.add_trainer_item(database=database, item=item,
+                                                trainer_id=trainer_id)
+
+
+@router.post("/{trainer_id}/pokemon/", response_model=schemas.Pokemon)
+async def create_pokemon_for_trainer(
+    trainer_id: int, pokemon: schemas.PokemonCreate, defer_name: bool = False,
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add a Pokemon to a trainer
+    """
+    return await actions_async.add_trainer_pokemon(database=database, pokemon=pokemon,
+                                                   trainer_id=trainer_id, defer_name=defer_name)
+
+
+@router.post("/{trainer_id}/items/bulk", response_model=schemas.BulkResult)
+async def create_items_for_trainer(
+    trainer_id: int,
+    items: List[schemas.ItemCreate] = Depends(bulk_body(schemas.ItemCreate)),
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add many items in trainer inventory in one transaction
+    """
+    return {"ids": await actions_async.add_trainer_items(database=database, items=items,
+                                                         trainer_id=trainer_id)}
+
+
+@router.post("/{trainer_id}/pokemons/bulk", response_model=schemas.BulkResult)
+async def create_pokemons_for_trainer(
+    trainer_id: int,
+    pokemons: List[schemas.PokemonCreate] = Depends(bulk_body(schemas.PokemonCreate)),
+    defer_name: bool = False,
+    database: AsyncSession = Depends(get_async_db)
+):
+    """
+        Add many Pokemons to a trainer in one transaction
+    """
+    try:
+        ids = await actions_async.add_trainer_pokemons(database=database, pokemons=pokemons,
+                                                       trainer_id=trainer_id,
+                                                       defer_name=defer_name)
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error)) from error
+    return {"ids": ids}
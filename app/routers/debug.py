@@ -0,0 +1,38 @@
+"""
+Module contenant une API routeur FastAPI pour le diagnostic des requêtes SQL
+d'une application de formation de Pokémon.
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+
+Fonctions :
+    - get_queries(limit: int = 20) -> List[schemas.QueryStats]:
+        Endpoint GET "/queries" retournant les requêtes SQL qui ont pris le plus de temps
+        au total depuis le démarrage (voir 'app.utils.query_log').
+        Paramètres :
+            - limit (int) : Nombre de requêtes retournées (par défaut : 20, max : 500).
+        Retourne :
+            - List[schemas.QueryStats] : Texte SQL, nombre d'appels, durées totale,
+            moyenne et maximale (ms), nombre d'exécutions lentes, plan d'exécution
+            (capturé à la première exécution lente) et tables parcourues sans index.
+        Lève :
+            - HTTPException(404) : Si le journal des requêtes lentes est désactivé
+            (SLOW_QUERY_MS non défini).
+"""
+
+from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from app import schemas
+from app.utils.query_log import query_log
+
+router = APIRouter()
+
+
+@router.get("/queries", response_model=List[schemas.QueryStats])
+def get_queries(limit: int = Query(20, ge=1, le=500)):
+    """
+        Statements taking the most time in total
+    """
+    if not query_log.enabled:
+        raise HTTPException(status_code=404, detail="Slow query log disabled (SLOW_QUERY_MS)")
+    return query_log.report(limit)
@@ -0,0 +1,161 @@
+"""
+Module contenant une API routeur FastAPI pour l'export des données
+d'une application de formation de Pokémon.
+
+Les lignes sont lues par lots ('actions.iter_all', "yield_per") et envoyées au fur et
+à mesure dans une 'StreamingResponse' : la mémoire utilisée ne dépend pas de la taille
+de la table. Chaque ligne est convertie avec la méthode 'to_dict' de son modèle.
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+    - EXPORTS : Modèle exporté pour chaque nom de table.
+
+Fonctions :
+    - export_table(table: str, export_format: str = "ndjson",
+    database: Session = Depends(get_db)) -> StreamingResponse:
+        Endpoint GET "/{table}" pour exporter toutes les lignes d'une table.
+        Paramètres :
+            - table (str) : "trainers", "pokemons" ou "items" (404 sinon).
+            - export_format (str) : "ndjson" (un objet JSON par ligne, par défaut) ou
+            "csv" (ligne d'en-tête puis une ligne par objet), paramètre "format".
+            - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
+        Retourne :
+            - StreamingResponse : Fichier "{table}.ndjson" ou "{table}.csv".
+
+    - ndjson_lines(rows: Iterable[dict]) -> Iterator[str]
+    - csv_lines(rows: Iterable[dict]) -> Iterator[str]
+    - async_lines(rows: AsyncIterator[dict], export_format: str) -> AsyncIterator[str]:
+        Équivalent asynchrone, utilisé par 'app.routers.aio.export'.
+
+Notes :
+    - Les dresseurs sont exportés sans leur inventaire ni leurs pokémons, qui ont leurs
+    propres exports (colonne trainer_id).
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app import actions, models
+from app.utils.utils import get_db
+
+BATCH_SIZE = 1000
+
+EXPORTS = {
+    "trainers": models.Trainer,
+    "pokemons": models.Pokemon,
+    "items": models.Item,
+}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+router = APIRouter()
+
+
+def batches(rows, size=None):
+    """
+        Split rows in lists of size rows, BATCH_SIZE by default
+    """
+    size = BATCH_SIZE if size is None else size
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+async def async_batches(rows, size=None):
+    """
+        Split an async iterator of rows in lists of size rows, BATCH_SIZE by default
+    """
+    size = BATCH_SIZE if size is None else size
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_chunk(batch, _first=False):
+    """
+        One json object per row of the batch
+    """
+    return "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+
+def csv_chunk(batch, first=False):
+    """
+        One csv line per row of the batch, after the header line for the first batch
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(batch[0]))
+    if first:
+        writer.writeheader()
+    writer.writerows(batch)
+    return buffer.getvalue()
+
+
+CHUNKS = {
+    "ndjson": ndjson_chunk,
+    "csv": csv_chunk,
+}
+
+
+def ndjson_lines(rows):
+    """
+        One json object per row, one chunk per batch
+    """
+    for batch in batches(rows):
+        yield ndjson_chunk(batch)
+
+
+def csv_lines(rows):
+    """
+        Header then one csv line per row, one chunk per batch
+    """
+    for index, batch in enumerate(batches(rows)):
+        yield csv_chunk(batch, index == 0)
+
+
+async def async_lines(rows, export_format):
+    """
+        Chunks of an async iterator of rows in export_format, one chunk per batch
+    """
+    first = True
+    async for batch in async_batches(rows):
+        yield CHUNKS[export_format](batch, first)
+        first = False
+
+
+def export_response(lines, table, export_format):
+    """
+        Streaming response of the file "{table}.{export_format}"
+    """
+    return StreamingResponse(
+        lines, media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{export_format}"'})
+
+
+@router.get("/{table}")
+def export_table(table: str, export_format: str = Query("ndjson", alias="format",
+                                                         regex="^(ndjson|csv)$"),
+                 database: Session = Depends(get_db)):
+    """
+        Stream all rows of a table as ndjson or csv
+    """
+    model = EXPORTS.get(table)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Unknown table")
+    rows = (row.to_dict() for row in actions.iter_all(database, model, batch_size=BATCH_SIZE))
+    lines = ndjson_lines(rows) if export_format == "ndjson" else csv_lines(rows)
+    return export_response(lines, table, export_format)
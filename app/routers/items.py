@@ -10,12 +10,16 @@ Classes et objets :
     - router : Instance de APIRouter pour définir les routes de l'API.
 
 Fonctions :
-    - get_items(skip: int = 0, limit: int = 100, database: Session =
-    Depends(get_db)) -> List[schemas.Item]:
+    - get_items(skip: int = 0, limit: int = 100, cursor: str = None, fast: bool = False,
+    database: Session = Depends(get_db)) -> List[schemas.Item]:
         Endpoint GET pour récupérer tous les objets.
         Paramètres :
             - skip (int) : Nombre d'éléments à sauter pour la pagination (par défaut : 0).
             - limit (int) : Limite du nombre d'éléments à récupérer (par défaut : 100).
+            - cursor (str) : Curseur de la page suivante, fourni par la page précédente
+            dans les en-têtes "X-Next-Cursor" et "Link" (rel="next").
+            - fast (bool) : Encoder directement les colonnes avec orjson, sans Pydantic
+            (même JSON, voir 'app.utils.fast_json').
             - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
 
 Notes :
@@ -24,20 +28,29 @@ Notes :
     - La réponse du endpoint est une liste d'objets de type 'schemas.Item'.
 """
 
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends
-from app.utils.utils import get_db
-from app import actions, schemas
+from fastapi import APIRouter, Depends, Request, Response
+from app.utils.fast_json import ITEM_FIELDS, encode_rows, json_response
+from app.utils.utils import decode_cursor, get_db, next_page_headers
+from app import actions, models, schemas
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.Item])
-def get_items(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+def get_items(request: Request, response: Response, skip: int = 0, limit: int = 100,
+              cursor: Optional[str] = None, fast: bool = False,
+              database: Session = Depends(get_db)):
     """
         Return all items
         Default limit is 100
     """
-    items = actions.get_items(database, skip=skip, limit=limit)
+    if fast:
+        rows = actions.get_rows(database, models.Item, ITEM_FIELDS, skip=skip, limit=limit,
+                                after_id=decode_cursor(cursor))
+        return json_response(encode_rows(ITEM_FIELDS, rows),
+                             next_page_headers(request, rows, limit))
+    items = actions.get_items(database, skip=skip, limit=limit, after_id=decode_cursor(cursor))
+    response.headers.update(next_page_headers(request, items, limit))
     return items
@@ -0,0 +1,38 @@
+"""
+Module contenant une API routeur FastAPI exposant les métriques de l'application
+au format Prometheus.
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+
+Fonctions :
+    - get_metrics() -> PlainTextResponse:
+        Endpoint GET retournant les compteurs et histogrammes de latence par route
+        mesurés par 'app.utils.metrics.MetricsMiddleware', et les appels à PokeAPI
+        exécutés ou regroupés avec un appel identique en cours
+        (pokeapi_singleflight_calls_total, pokeapi_singleflight_coalesced_total).
+        Retourne :
+            - PlainTextResponse : Métriques au format texte de Prometheus.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.utils import pokeapi, pokeapi_async
+from app.utils.metrics import metrics, render_counter
+
+router = APIRouter()
+
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """
+        Metrics in the Prometheus text format
+    """
+    flights = {'mode="sync"': pokeapi.pokemon_flight.stats(),
+               'mode="async"': pokeapi_async.pokemon_flight.stats()}
+    content = metrics.render() + "".join(
+        render_counter(f"pokeapi_singleflight_{counter}_total", description,
+                       {labels: stats[counter] for labels, stats in flights.items()})
+        for counter, description in (("calls", "Pokeapi lookups executed."),
+                                     ("coalesced", "Pokeapi lookups sharing a running call.")))
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
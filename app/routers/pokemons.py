@@ -9,21 +9,38 @@ des fonctions définies dans les modules 'actions', 'schemas', et 'utils',
 ainsi que des dépendances.
 
 Classes et objets :
-    - router : Instance de APIRouter pour définir les routes de l'API.
+    - router : Instance de APIRouter pour les routes qui lisent la base de données
+    (remplacé par 'app.routers.aio.pokemons.router' avec DB_MODE=async).
+    - pokeapi_router : Instance de APIRouter pour les routes qui n'utilisent que PokeAPI
+    (batailles, pokémons aléatoires).
 
 Fonctions :
-    - get_pokemons(skip: int = 0, limit: int = 100, database: Session = Depends(get_db))
-    -> List[schemas.Pokemon]:
+    - get_pokemons(skip: int = 0, limit: int = 100, cursor: str = None, fast: bool = False,
+    database: Session = Depends(get_db)) -> List[schemas.Pokemon]:
         Endpoint GET pour récupérer tous les pokémons.
         Paramètres :
             - skip (int) : Nombre d'éléments à sauter pour la pagination (par défaut : 0).
             - limit (int) : Limite du nombre d'éléments à récupérer (par défaut : 100).
+            - cursor (str) : Curseur de la page suivante, fourni par la page précédente
+            dans les en-têtes "X-Next-Cursor" et "Link" (rel="next").
+            - fast (bool) : Encoder directement les colonnes avec orjson, sans Pydantic
+            (même JSON, voir 'app.utils.fast_json').
             - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
         Retourne :
             - List[schemas.Pokemon] : Liste des pokémons récupérés depuis la base de données.
 
+    - get_pokemon(pokemon_id: int, database: Session = Depends(get_db)) -> schemas.Pokemon:
+        Endpoint GET pour récupérer un pokémon par son ID, notamment pour suivre la
+        résolution de son nom ("name_status" : "pending", "resolved" ou "failed").
+        Paramètres :
+            - pokemon_id (int) : ID du pokémon à récupérer.
+            - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
+        Retourne :
+            - schemas.Pokemon : Pokémon récupéré (404 s'il n'existe pas).
+
     - pokemons_battle(pokemon_api_id_1: int, pokemon_api_id_2: int) -> dict:
-        Endpoint GET pour une bataille entre deux pokémons.
+        Endpoint GET asynchrone pour une bataille entre deux pokémons, lue dans la
+        table précalculée si elle existe, sinon récupérés en parallèle.
         Paramètres :
             - pokemon_api_id_1 (int) : ID du premier pokémon.
             - pokemon_api_id_2 (int) : ID du deuxième pokémon.
@@ -32,34 +49,89 @@ Fonctions :
             {"pokemonApiID": pokemonApiID, "result": resultValue:int}
             (Draw en cas d'égalité).
 
-    - pokemons_random() -> List[dict]:
-        Endpoint GET pour obtenir 3 pokémons choisis aléatoirement.
+    - pokemons_battles(battles: schemas.BattleBatch) -> List[dict]:
+        Endpoint POST asynchrone pour évaluer plusieurs batailles en une requête.
+        Les couples absents de la table précalculée sont calculés par le moteur
+        vectorisé de 'app.utils.battle', chaque Pokémon étant récupéré une seule fois.
+        Paramètres :
+            - battles (schemas.BattleBatch) : Couples d'ID ("pairs") et/ou liste d'ID
+            dont tous les couples s'affrontent ("tournament").
+        Retourne :
+            - List[dict] : Un résultat {"Result": ...} par couple (None si un Pokémon
+            est inconnu, {"Error": ...} si PokeAPI n'a pas pu répondre pour l'un d'eux),
+            dans l'ordre de "pairs" puis des couples du tournoi.
+        Les identifiants doivent être compris entre 1 et POKEDEX_SIZE, avec au plus
+        BATTLE_MAX_SPECIES Pokémon distincts par requête (422 sinon).
+
+    - pokemons_counters(pokemon_api_id: int, limit: int = 10) -> List[int]:
+        Endpoint GET listant les pokémons qui battent pokemon_api_id, du plus fort au
+        plus faible (table précalculée requise, 404 si le pokémon n'y est pas).
+
+    - pokemons_best_counter(pokemon_api_id: int) -> dict:
+        Endpoint GET retournant le pokémon qui bat pokemon_api_id avec la plus grande
+        marge : {"api_id": int, "margin": int} (None si aucun ne le bat).
+
+    - pokemons_random(count: int = 3, slim: bool = False) -> List[dict]:
+        Endpoint GET asynchrone pour obtenir des pokémons distincts choisis aléatoirement.
+        Les identifiants sont tirés en une fois puis récupérés en parallèle ; les échecs
+        sont retirés dans la limite de RANDOM_ATTEMPTS tirages (503 au-delà).
+        Paramètres :
+            - count (int) : Nombre de pokémons à retourner (par défaut : 3, max : 20).
+            - slim (bool) : Réponse réduite à l'identifiant, au nom et aux statistiques de
+            base en liste d'entiers, servie par le cache.
         Retourne :
-            - List[dict] : Liste de 3 pokémons avec leurs données.
+            - List[dict] : Liste de count pokémons, réponses complètes de PokeAPI (par
+            défaut) ou {"id", "name", "stats": [int]} avec slim.
 """
-from random import randint
-from typing import List
-from fastapi import APIRouter, Depends
+from random import sample
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from app.utils.utils import get_db
-from app import actions, schemas
-from app.utils.pokeapi import battle_pokemon, get_pokemon_data
+from app.utils.fast_json import POKEMON_FIELDS, encode_rows, json_response
+from app.utils.utils import decode_cursor, get_db, next_page_headers
+from app import actions, models, schemas
+from app.utils.battle import battle_results, battle_table, round_robin
+from app.utils.pokeapi import POKEDEX_SIZE
+from app.utils.pokeapi_async import battle_pokemon, get_pokemons_data, get_pokemons_payloads
+
+RANDOM_ATTEMPTS = 3
 
 router = APIRouter()
+pokeapi_router = APIRouter()
 
 
 @router.get("/", response_model=List[schemas.Pokemon])
-def get_pokemons(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+def get_pokemons(request: Request, response: Response, skip: int = 0, limit: int = 100,
+                 cursor: Optional[str] = None, fast: bool = False,
+                 database: Session = Depends(get_db)):
     """
         Return all pokemons
         Default limit is 100
     """
-    pokemons = actions.get_pokemons(database, skip=skip, limit=limit)
+    if fast:
+        rows = actions.get_rows(database, models.Pokemon, POKEMON_FIELDS, skip=skip, limit=limit,
+                                after_id=decode_cursor(cursor))
+        return json_response(encode_rows(POKEMON_FIELDS, rows),
+                             next_page_headers(request, rows, limit))
+    pokemons = actions.get_pokemons(database, skip=skip, limit=limit,
+                                    after_id=decode_cursor(cursor))
+    response.headers.update(next_page_headers(request, pokemons, limit))
     return pokemons
 
 
-@router.get("/battle/{pokemon_api_id_1}/{pokemon_api_id_2}")
-def pokemons_battle(pokemon_api_id_1: int, pokemon_api_id_2: int):
+@router.get("/{pokemon_id:int}", response_model=schemas.Pokemon)
+def get_pokemon(pokemon_id: int, database: Session = Depends(get_db)):
+    """
+        Return pokemon from his id
+    """
+    db_pokemon = actions.get_pokemon(database, pokemon_id=pokemon_id)
+    if db_pokemon is None:
+        raise HTTPException(status_code=404, detail="Pokemon not found")
+    return db_pokemon
+
+
+@pokeapi_router.get("/battle/{pokemon_api_id_1}/{pokemon_api_id_2}")
+async def pokemons_battle(pokemon_api_id_1: int, pokemon_api_id_2: int):
     """
         Battle between two pokemons
         Params:
@@ -68,19 +140,75 @@ def pokemons_battle(pokemon_api_id_1: int, pokemon_api_id_2: int):
         Return result
             {"pokemonApiID": pokemonApiID, "result": resultValue:int} (Draw if draw)
     """
-    return battle_pokemon(pokemon_api_id_1, pokemon_api_id_2)
+    result = battle_table.outcome(pokemon_api_id_1, pokemon_api_id_2)
+    if result is not None:
+        return result
+    return await battle_pokemon(pokemon_api_id_1, pokemon_api_id_2)
+
+
+@pokeapi_router.post("/battles")
+async def pokemons_battles(battles: schemas.BattleBatch):
+    """
+        Battle many pairs of pokemons at once
+        Return one result per pair, pairs first then tournament matchups
+    """
+    pairs = [tuple(pair) for pair in battles.pairs] + round_robin(battles.tournament)
+    results = battle_table.outcomes(pairs)
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        api_ids = list(dict.fromkeys(api_id for index in missing for api_id in pairs[index]))
+        pokemons = dict(zip(api_ids, await get_pokemons_data(api_ids, return_exceptions=True)))
+        failed = {api_id for api_id, data in pokemons.items() if isinstance(data, Exception)}
+        for api_id in failed:
+            pokemons[api_id] = None
+        for index, result in zip(missing, battle_results([pairs[index] for index in missing],
+                                                         pokemons)):
+            unavailable = failed.intersection(pairs[index])
+            results[index] = {"Error": f"Pokeapi unavailable for {sorted(unavailable)}"} \
+                if unavailable else result
+    return results
+
+
+@pokeapi_router.get("/counters/{pokemon_api_id}")
+def pokemons_counters(pokemon_api_id: int, limit: int = Query(10, ge=1, le=POKEDEX_SIZE)):
+    """
+        Pokemons beating the given one, strongest first
+        Needs the precomputed battle table
+    """
+    counters = battle_table.beaten_by(pokemon_api_id, limit=limit)
+    if counters is None:
+        raise HTTPException(status_code=404, detail="Pokemon not in battle table")
+    return counters
 
 
-@router.get("/random/")
-def pokemons_random():
+@pokeapi_router.get("/counters/{pokemon_api_id}/best")
+def pokemons_best_counter(pokemon_api_id: int):
     """
-        Get 3 random pokemons
+        Pokemon beating the given one with the largest stat margin
+        Return {"api_id": counter_api_id, "margin": stat_difference}, None if nothing beats it
+    """
+    if battle_table.beaten_by(pokemon_api_id, limit=1) is None:
+        raise HTTPException(status_code=404, detail="Pokemon not in battle table")
+    return battle_table.best_counter(pokemon_api_id)
+
+
+@pokeapi_router.get("/random/")
+async def pokemons_random(count: int = Query(3, ge=1, le=20), slim: bool = False):
+    """
+        Get count distinct random pokemons
         Return:
-            List of 3 pokemons
+            List of count pokemons, full pokeapi payloads or compact records if slim
     """
-    pokemons: list[dict, dict, dict] = []
-    while len(pokemons) != 3:
-        pokemon = get_pokemon_data(randint(1, 898))
-        if pokemon not in pokemons and pokemon is not None:
-            pokemons.append(pokemon)
-    return pokemons
+    fetch = get_pokemons_data if slim else get_pokemons_payloads
+    pokemons = []
+    drawn = set()
+    for _ in range(RANDOM_ATTEMPTS):
+        population = [api_id for api_id in range(1, POKEDEX_SIZE + 1) if api_id not in drawn]
+        api_ids = sample(population, count - len(pokemons))
+        drawn.update(api_ids)
+        candidates = await fetch(api_ids, return_exceptions=True)
+        pokemons.extend(pokemon for pokemon in candidates
+                        if pokemon is not None and not isinstance(pokemon, Exception))
+        if len(pokemons) == count:
+            return [pokemon.to_dict() for pokemon in pokemons] if slim else pokemons
+    raise HTTPException(status_code=503, detail="Pokeapi unavailable")
@@ -0,0 +1,48 @@
+"""
+Module contenant une API routeur FastAPI pour la recherche plein texte
+d'une application de formation de Pokémon.
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+
+Fonctions :
+    - search(q: str, limit: int = 20, database: Session = Depends(get_db))
+    -> List[schemas.SearchResult]:
+        Endpoint GET pour chercher des dresseurs (nom), des pokémons (nom et surnom) et
+        des objets (nom et description).
+        Paramètres :
+            - q (str) : Texte saisi ; chaque mot est cherché comme début de mot, sans
+            tenir compte de la casse ni des accents ("pika sac" trouve "Pikachu de Sacha").
+            - limit (int) : Nombre maximal de résultats (par défaut : 20, max : 100).
+            - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
+        Retourne :
+            - List[schemas.SearchResult] : Résultats groupés par type, dans l'ordre
+            "trainer", "pokemon" puis "item", chaque groupe du plus pertinent au moins
+            pertinent (rank croissant), avec "detail" (surnom du pokémon ou description
+            de l'objet).
+
+Notes :
+    - La recherche utilise les index FTS5 de 'app.search' au lieu de parcourir les
+    tables avec "LIKE '%...%'".
+    - Les scores bm25 de deux tables FTS5 n'utilisent pas les mêmes statistiques et ne
+    sont pas comparables : rank est le score bm25 dans la table du résultat, et ne
+    compare que des résultats du même type. limit s'applique à la liste entière : les
+    dresseurs sont servis en premier.
+"""
+
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app import actions, schemas
+from app.utils.utils import get_db
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[schemas.SearchResult])
+def search(q: str = Query(..., max_length=200), limit: int = Query(20, ge=1, le=100),
+           database: Session = Depends(get_db)):
+    """
+        Full-text search of trainers, pokemons and items
+    """
+    return actions.search(database, q, limit=limit)
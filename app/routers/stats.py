@@ -0,0 +1,67 @@
+"""
+Module contenant une API routeur FastAPI pour les statistiques
+d'une application de formation de Pokémon.
+
+Aucune collection n'est chargée en mémoire : 'actions.get_top_trainers' et
+'actions.get_trainer_counts' lisent les compteurs pokemon_count et item_count des
+dresseurs (colonnes indexées, tenues à jour par les actions d'écriture et réparées par
+"python -m app.manage recount"), et 'actions.get_species_popularity' est calculé par
+SQLite avec une requête "GROUP BY".
+
+Classes et objets :
+    - router : Instance de APIRouter pour définir les routes de l'API.
+
+Fonctions :
+    - top_trainers(limit: int = 10, by: str = "pokemons", database: Session = Depends(get_db))
+    -> List[schemas.TrainerRank]:
+        Endpoint GET "/trainers/top" classant les dresseurs par nombre de pokémons
+        (by=pokemons) ou d'objets (by=items), du plus grand au plus petit.
+
+    - species_popularity(limit: int = 10, database: Session = Depends(get_db))
+    -> List[schemas.SpeciesPopularity]:
+        Endpoint GET "/species/popularity" classant les espèces (api_id) par nombre de
+        pokémons possédés, avec le nombre de dresseurs différents qui les possèdent.
+
+    - trainer_counts(trainer_id: int, database: Session = Depends(get_db))
+    -> schemas.TrainerCounts:
+        Endpoint GET "/trainers/{trainer_id}" retournant le nombre de pokémons et
+        d'objets d'un dresseur (404 s'il n'existe pas).
+"""
+
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from app import actions, schemas
+from app.utils.utils import get_db
+
+router = APIRouter()
+
+
+@router.get("/trainers/top", response_model=List[schemas.TrainerRank])
+def top_trainers(limit: int = Query(10, ge=1, le=1000),
+                 by: str = Query("pokemons", regex="^(pokemons|items)$"),
+                 database: Session = Depends(get_db)):
+    """
+        Trainers with the most pokemons or items
+    """
+    return actions.get_top_trainers(database, limit=limit, by=by)
+
+
+@router.get("/species/popularity", response_model=List[schemas.SpeciesPopularity])
+def species_popularity(limit: int = Query(10, ge=1, le=1000),
+                       database: Session = Depends(get_db)):
+    """
+        Most owned species
+    """
+    return actions.get_species_popularity(database, limit=limit)
+
+
+@router.get("/trainers/{trainer_id}", response_model=schemas.TrainerCounts)
+def trainer_counts(trainer_id: int, database: Session = Depends(get_db)):
+    """
+        Number of pokemons and items of a trainer
+    """
+    counts = actions.get_trainer_counts(database, trainer_id=trainer_id)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Trainer not found")
+    return counts
@@ -23,20 +23,29 @@ Fonctions :
         Retourne :
             - schemas.Trainer : Dresseur créé.
 
-    - get_trainers(skip: int = 0, limit: int = 100, database: Session = Depends(get_db))
-     -> List[schemas.Trainer]:
+    - get_trainers(skip: int = 0, limit: int = 100, cursor: str = None, expand: bool = True,
+    fast: bool = False, database: Session = Depends(get_db)) -> List[schemas.Trainer]:
         Endpoint GET pour récupérer tous les dresseurs.
         Paramètres :
             - skip (int) : Nombre d'éléments à sauter pour la pagination (par défaut : 0).
             - limit (int) : Limite du nombre d'éléments à récupérer (par défaut : 100).
+            - cursor (str) : Curseur de la page suivante, fourni par la page précédente
+            dans les en-têtes "X-Next-Cursor" et "Link" (rel="next").
+            - expand (bool) : Inclure l'inventaire et les pokémons (par défaut : True).
+            Avec False, la réponse suit 'schemas.TrainerSummary' et les collections ne
+            sont pas chargées.
+            - fast (bool) : Sélectionner uniquement les colonnes et les encoder directement
+            avec orjson, sans Pydantic (même JSON, voir 'app.utils.fast_json').
             - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
         Retourne :
             - List[schemas.Trainer] : Liste des dresseurs récupérés depuis la base de données.
 
-    - get_trainer(trainer_id: int, database: Session = Depends(get_db)) -> schemas.Trainer:
+    - get_trainer(trainer_id: int, expand: bool = True, database: Session = Depends(get_db))
+     -> schemas.Trainer:
         Endpoint GET pour récupérer un dresseur par son ID.
         Paramètres :
             - trainer_id (int) : ID du dresseur à récupérer.
+            - expand (bool) : Inclure l'inventaire et les pokémons (par défaut : True).
             - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
         Retourne :
             - schemas.Trainer : Dresseur récupéré.
@@ -52,22 +61,44 @@ Fonctions :
             - schemas.Item : Objet ajouté à l'inventaire.
 
     - create_pokemon_for_trainer(trainer_id: int, pokemon: schemas.PokemonCreate,
-    database: Session = Depends(get_db)) -> schemas.Pokemon:
+    defer_name: bool = False, database: Session = Depends(get_db)) -> schemas.Pokemon:
         Endpoint POST pour ajouter un Pokémon à un dresseur.
         Paramètres :
             - trainer_id (int) : ID du dresseur.
             - pokemon (schemas.PokemonCreate) : Données du Pokémon à ajouter.
+            - defer_name (bool) : Insérer sans attendre PokeAPI, le nom étant résolu en
+            arrière-plan (name_status "pending", voir GET /pokemons/{pokemon_id}).
             - database (Session) : Session SQLAlchemy pour l'accès à la base de données.
         Retourne :
             - schemas.Pokemon : Pokémon ajouté au dresseur.
+
+    - create_trainers(trainers: List[schemas.TrainerCreate], database: Session = Depends(get_db))
+     -> schemas.BulkResult:
+        Endpoint POST "/bulk" pour créer plusieurs dresseurs en une transaction.
+
+    - create_items_for_trainer(trainer_id: int, items: List[schemas.ItemCreate],
+    database: Session = Depends(get_db)) -> schemas.BulkResult:
+        Endpoint POST "/{trainer_id}/items/bulk" pour ajouter plusieurs objets.
+
+    - create_pokemons_for_trainer(trainer_id: int, pokemons: List[schemas.PokemonCreate],
+    defer_name: bool = False, database: Session = Depends(get_db)) -> schemas.BulkResult:
+        Endpoint POST "/{trainer_id}/pokemons/bulk" pour ajouter plusieurs Pokémon
+        (404 si un api_id est inconnu de PokeAPI, sauf avec defer_name).
+
+Notes :
+    - Les endpoints "bulk" acceptent un tableau JSON ou un flux NDJSON
+    ("Content-Type: application/x-ndjson", un élément par ligne), au plus BULK_LIMIT
+    éléments, et retournent {"ids": [...]} dans l'ordre des éléments reçus.
 """
 
 
-from typing import List
+from typing import List, Optional, Union
 from sqlalchemy.orm import Session
-from fastapi import APIRouter,  Depends, HTTPException
-from app.utils.utils import get_db
-from app import actions, schemas
+from fastapi import APIRouter,  Depends, HTTPException, Request, Response
+from app.utils.fast_json import (ITEM_FIELDS, POKEMON_FIELDS, TRAINER_FIELDS,
+                                 encode_trainers, json_response)
+from app.utils.utils import bulk_body, decode_cursor, get_db, next_page_headers
+from app import actions, models, schemas
 router = APIRouter()
 
 
@@ -79,27 +110,70 @@ def create_trainer(trainer: schemas.TrainerCreate, database: Session = Depends(g
     return actions.create_trainer(database=database, trainer=trainer)
 
 
-@router.get("", response_model=List[schemas.Trainer])
-def get_trainers(skip: int = 0, limit: int = 100, database: Session = Depends(get_db)):
+@router.post("/bulk", response_model=schemas.BulkResult)
+def create_trainers(
+    trainers: List[schemas.TrainerCreate] = Depends(bulk_body(schemas.TrainerCreate)),
+    database: Session = Depends(get_db)
+):
+    """
+        Create many trainers in one transaction
+    """
+    return {"ids": actions.create_trainers(database=database, trainers=trainers)}
+
+
+@router.get("", response_model=Union[List[schemas.Trainer], List[schemas.TrainerSummary]],
+            response_model_exclude_unset=True)
+def get_trainers(request: Request, response: Response, skip: int = 0, limit: int = 100,
+                 cursor: Optional[str] = None, expand: bool = True, fast: bool = False,
+                 database: Session = Depends(get_db)):
     """
         Return all trainers
         Default limit is 100
     """
-    trainers = actions.get_trainers(database, skip=skip, limit=limit)
+    if fast:
+        rows = actions.get_rows(database, models.Trainer, TRAINER_FIELDS, skip=skip, limit=limit,
+                                after_id=decode_cursor(cursor))
+        collections = []
+        if expand:
+            trainer_ids = [row.id for row in rows]
+            collections = [
+                actions.get_rows_by_trainer(database, models.Item, ITEM_FIELDS, trainer_ids),
+                actions.get_rows_by_trainer(database, models.Pokemon, POKEMON_FIELDS, trainer_ids)]
+        return json_response(encode_trainers(rows, *collections),
+                             next_page_headers(request, rows, limit))
+    trainers = actions.get_trainers(database, skip=skip, limit=limit, expand=expand,
+                                    after_id=decode_cursor(cursor))
+    response.headers.update(next_page_headers(request, trainers, limit))
+    if not expand:
+        return summarize(trainers)
     return trainers
 
 
-@router.get("/{trainer_id}", response_model=schemas.Trainer)
-def get_trainer(trainer_id: int, database: Session = Depends(get_db)):
+@router.get("/{trainer_id}", response_model=Union[schemas.Trainer, schemas.TrainerSummary],
+            response_model_exclude_unset=True)
+def get_trainer(trainer_id: int, expand: bool = True, database: Session = Depends(get_db)):
     """
         Return trainer from his id
     """
-    db_trainer = actions.get_trainer(database, trainer_id=trainer_id)
+    db_trainer = actions.get_trainer(database, trainer_id=trainer_id, expand=expand)
     if db_trainer is None:
         raise HTTPException(status_code=404, detail="Trainer not found")
+    if not expand:
+        return summarize(db_trainer)
     return db_trainer
 
 
+def summarize(trainers):
+    """
+        Trainers without their collections
+        Only the fields set are sent (response_model_exclude_unset): the summaries are not
+        completed with the empty collections of schemas.Trainer
+    """
+    if isinstance(trainers, list):
+        return [schemas.TrainerSummary.from_orm(trainer) for trainer in trainers]
+    return schemas.TrainerSummary.from_orm(trainers)
+
+
 @router.post("/{trainer_id}/item/", response_model=schemas.Item)
 def create_item_for_trainer(
     trainer_id: int, item: schemas.ItemCreate, database: Session = Depends(get_db)
@@ -112,9 +186,42 @@ def create_item_for_trainer(
 
 @router.post("/{trainer_id}/pokemon/", response_model=schemas.Pokemon)
 def create_pokemon_for_trainer(
-    trainer_id: int, pokemon: schemas.PokemonCreate, database: Session = Depends(get_db)
+    trainer_id: int, pokemon: schemas.PokemonCreate, defer_name: bool = False,
+    database: Session = Depends(get_db)
 ):
     """
         Add a Pokemon to a trainer
     """
-    return actions.add_trainer_pokemon(database=database, pokemon=pokemon, trainer_id=trainer_id)
+    return actions.add_trainer_pokemon(database=database, pokemon=pokemon, trainer_id=trainer_id,
+                                       defer_name=defer_name)
+
+
+@router.post("/{trainer_id}/items/bulk", response_model=schemas.BulkResult)
+def create_items_for_trainer(
+    trainer_id: int,
+    items: List[schemas.ItemCreate] = Depends(bulk_body(schemas.ItemCreate)),
+    database: Session = Depends(get_db)
+):
+    """
+        Add many items in trainer inventory in one transaction
+    """
+    return {"ids": actions.add_trainer_items(database=database, items=items,
+                                             trainer_id=trainer_id)}
+
+
+@router.post("/{trainer_id}/pokemons/bulk", response_model=schemas.BulkResult)
+def create_pokemons_for_trainer(
+    trainer_id: int,
+    pokemons: List[schemas.PokemonCreate] = Depends(bulk_body(schemas.PokemonCreate)),
+    defer_name: bool = False,
+    database: Session = Depends(get_db)
+):
+    """
+        Add many Pokemons to a trainer in one transaction
+    """
+    try:
+        ids = actions.add_trainer_pokemons(database=database, pokemons=pokemons,
+                                           trainer_id=trainer_id, defer_name=defer_name)
+    except ValueError as error:
+        raise HTTPException(status_code=404, detail=str(error)) from error
+    return {"ids": ids}
@@ -1,6 +1,7 @@
 from datetime import date
-from typing import List, Optional, Union
-from pydantic import BaseModel
+from typing import List, Optional, Tuple, Union
+from pydantic import BaseModel, conint, conlist, root_validator
+from app.utils.pokeapi import POKEDEX_SIZE
 
 
 #
@@ -37,8 +38,9 @@ class PokemonCreate(PokemonBase):
 
 class Pokemon(PokemonBase):
     id: int
-    name: str
+    name: Optional[str]
     trainer_id: int
+    name_status: str = "resolved"
 
     class Config:
         orm_mode = True
@@ -56,6 +58,13 @@ class TrainerCreate(TrainerBase):
     pass
 
 
+class TrainerSummary(TrainerBase):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
 class Trainer(TrainerBase):
     id: int
     inventory: List[Item] = []
@@ -63,3 +72,87 @@ class Trainer(TrainerBase):
 
     class Config:
         orm_mode = True
+
+
+#
+#  BULK
+#
+class BulkResult(BaseModel):
+    ids: List[int]
+
+
+#
+#  BATTLE
+#
+BATTLE_MAX_SPECIES = 200
+PokemonApiId = conint(ge=1, le=POKEDEX_SIZE)
+
+
+class BattleBatch(BaseModel):
+    pairs: conlist(Tuple[PokemonApiId, PokemonApiId], max_items=10000) = []
+    tournament: conlist(PokemonApiId, max_items=150) = []
+
+    @root_validator(skip_on_failure=True)
+    def limit_species(cls, values):  # pylint: disable=no-self-argument
+        api_ids = {api_id for pair in values["pairs"] for api_id in pair}
+        api_ids.update(values["tournament"])
+        if len(api_ids) > BATTLE_MAX_SPECIES:
+            raise ValueError(f"At most {BATTLE_MAX_SPECIES} distinct pokemons per batch")
+        return values
+
+
+#
+#  STATS
+#
+class TrainerRank(BaseModel):
+    id: int
+    name: str
+    count: int
+
+    class Config:
+        orm_mode = True
+
+
+class SpeciesPopularity(BaseModel):
+    api_id: int
+    name: Optional[str]
+    count: int
+    trainers: int
+
+    class Config:
+        orm_mode = True
+
+
+class TrainerCounts(BaseModel):
+    id: int
+    pokemons: int
+    items: int
+
+    class Config:
+        orm_mode = True
+
+
+#
+#  SEARCH
+#
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    trainer_id: Optional[int] = None
+    name: Optional[str]
+    detail: Optional[str] = None
+    rank: float
+
+
+#
+#  DEBUG
+#
+class QueryStats(BaseModel):
+    statement: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    slow: int
+    plan: Optional[List[str]] = None
+    full_scans: List[str] = []
@@ -0,0 +1,84 @@
+"""
+Module contenant l'index de recherche plein texte (SQLite FTS5).
+
+Chaque table cherchable a une table virtuelle FTS5 à contenu externe ("trainers_fts",
+"pokemons_fts", "items_fts") qui n'indexe que les colonnes de texte, la ligne elle-même
+restant dans la table d'origine (même rowid). Des triggers AFTER INSERT/UPDATE/DELETE
+tiennent l'index à jour dans la transaction de chaque écriture, y compris les ajouts
+en masse et la résolution des noms en arrière-plan.
+
+Objets :
+    - FTS_TABLES : Colonnes indexées de chaque table.
+
+Fonctions :
+    - search_statements(table: str, columns: Tuple[str]) -> List[str] :
+        Instructions créant la table FTS5 et ses triggers.
+    - create_search_tables(connection: Connection) -> bool :
+        Crée les tables FTS5 manquantes et y indexe les lignes existantes.
+    - match_expression(query: str) -> str | None :
+        Requête FTS5 cherchant chaque mot saisi comme préfixe.
+
+Notes :
+    - Les tables sont créées par "Base.metadata.create_all" (événement after_create,
+    voir 'app.models') et par la migration 'app.migrations.add_search_tables'.
+    - Le tokenizer "unicode61 remove_diacritics 2" ignore la casse et les accents ;
+    les index de préfixes de 2 et 3 caractères accélèrent la saisie semi-automatique.
+"""
+
+import re
+from sqlalchemy import inspect
+
+FTS_TABLES = {
+    "trainers": ("name",),
+    "pokemons": ("name", "custom_name"),
+    "items": ("name", "description"),
+}
+
+
+def search_statements(table, columns):
+    """
+        Create statements of the fts table of table and of its sync triggers
+    """
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});"
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {names}) "
+              f"VALUES ('delete', old.id, {old_values});")
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='{table}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {names} ON {table} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def create_search_tables(connection):
+    """
+        Create the missing fts tables and index the existing rows
+        Return True if a table was created
+    """
+    existing = set(inspect(connection).get_table_names())
+    created = False
+    for table, columns in FTS_TABLES.items():
+        if table not in existing or f"{table}_fts" in existing:
+            continue
+        for statement in search_statements(table, columns):
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')")
+        created = True
+    return created
+
+
+def match_expression(query):
+    """
+        Fts query matching every word of query as a prefix
+        None if query has no word
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
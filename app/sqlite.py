@@ -8,21 +8,119 @@ Ce module utilise SQLAlchemy pour créer un moteur de base de données,
 Classes et objets :
     - engine : Moteur SQLAlchemy pour la base de données.
     - SessionLocal : Usine de session pour créer des sessions de base de données.
+    - PROFILES : Profils de réglage SQLite disponibles ("legacy" et "tuned").
+
+Fonctions :
+    - engine_profile(name: str = None) -> dict:
+        Retourne le profil demandé, surchargé par les variables d'environnement.
+
+    - create_sqlite_engine(url: str, profile: dict) -> Engine:
+        Crée un moteur SQLite avec le pool et les PRAGMA du profil.
+
+    - listen_pragmas(engine: Engine, profile: dict):
+        Applique les PRAGMA du profil à chaque nouvelle connexion du moteur.
 
 Notes :
     - La base de données utilisée est SQLite, et le fichier de base de données
-    est situé à "./sqlite.db".
+    est situé à "./sqlite.db" (variable d'environnement SQLITE_URL pour en changer).
     - L'option "check_same_thread" est définie à False pour permettre l'utilisation
     de sessions SQLAlchemy dans des threads différents.
+    - Le profil est choisi avec SQLITE_PROFILE (par défaut "legacy", le comportement
+    par défaut de SQLite). "tuned" active le journal WAL (les lectures ne sont plus
+    bloquées par les écritures), synchronous=NORMAL, mmap_size, cache_size,
+    busy_timeout et un QueuePool ; le mode WAL est enregistré dans le fichier de la base
+    et crée les fichiers "-wal" et "-shm" à côté d'elle, il n'est donc pas utilisé par
+    défaut sur "./sqlite.db". Chaque réglage peut être surchargé par SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_BUSY_TIMEOUT,
+    SQLITE_POOL ("queue", "singleton", "static" ou "null") et SQLITE_POOL_SIZE.
+    - Les PRAGMA sont appliqués à chaque nouvelle connexion du pool.
+    - DB_MODE=async fait utiliser aux routes la couche asynchrone de 'app.sqlite_async'
+    (même fichier, même profil) au lieu de SessionLocal.
 """
 
-
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, QueuePool, SingletonThreadPool, StaticPool
+
+SQL_LITE = os.getenv("SQLITE_URL", "sqlite:///./sqlite.db")
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+PROFILES = {
+    "legacy": {
+        "journal_mode": None,
+        "synchronous": None,
+        "mmap_size": None,
+        "cache_size": None,
+        "busy_timeout": None,
+        "pool": "null",
+        "pool_size": 5,
+    },
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000,
+        "pool": "queue",
+        "pool_size": 10,
+    },
+}
+
+PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+
+POOLS = {
+    "queue": QueuePool,
+    "singleton": SingletonThreadPool,
+    "static": StaticPool,
+    "null": NullPool,
+}
+
+
+def engine_profile(name=None):
+    """
+        Return the named profile overridden by the SQLITE_* environment variables
+    """
+    profile = dict(PROFILES[name or os.getenv("SQLITE_PROFILE", "legacy")])
+    for setting in profile:
+        value = os.getenv(f"SQLITE_{setting.upper()}")
+        if value is not None:
+            profile[setting] = value
+    return profile
+
+
+def create_sqlite_engine(url, profile):
+    """
+        Create an engine applying the pool and the PRAGMA of profile
+    """
+    pool_class = POOLS[profile["pool"]]
+    options = {"connect_args": {"check_same_thread": False}, "poolclass": pool_class}
+    if pool_class is QueuePool:
+        options["pool_size"] = int(profile["pool_size"])
+        options["max_overflow"] = int(profile["pool_size"])
+    elif pool_class is SingletonThreadPool:
+        options["pool_size"] = int(profile["pool_size"])
+    new_engine = create_engine(url, **options)
+    listen_pragmas(new_engine, profile)
+    return new_engine
+
+
+def listen_pragmas(new_engine, profile):
+    """
+        Apply the PRAGMA of profile on every new connection of new_engine
+    """
+    pragmas = [(pragma, profile[pragma]) for pragma in PRAGMAS if profile[pragma] is not None]
+
+    @event.listens_for(new_engine, "connect")
+    def apply_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas:
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
 
-SQL_LITE = "sqlite:///./sqlite.db"
-engine = create_engine(SQL_LITE, connect_args={"check_same_thread": False})
+engine = create_sqlite_engine(SQL_LITE, engine_profile())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
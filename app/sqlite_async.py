@@ -0,0 +1,65 @@
+"""
+Module gérant la configuration asynchrone de la base de données SQLAlchemy.
+
+Ce module est l'équivalent asynchrone de 'app.sqlite' : il crée un moteur
+asynchrone (pilote aiosqlite) sur le même fichier, avec le même profil de
+réglage, et une usine de sessions asynchrones.
+
+Fonctions :
+    - create_async_sqlite_engine(url: str, profile: dict) -> AsyncEngine:
+        Crée un moteur asynchrone avec le pool et les PRAGMA du profil.
+    - get_async_engine() -> AsyncEngine : Moteur asynchrone de la base de données.
+    - get_async_session_factory() -> sessionmaker : Usine de sessions asynchrones.
+
+Notes :
+    - Le moteur et l'usine de sessions sont créés au premier appel : rien n'est créé
+    (ni connexion aiosqlite ni pool) quand l'application tourne avec DB_MODE=sync.
+    - expire_on_commit est désactivé : les objets restent lisibles après un commit
+    sans nouvelle requête, le chargement implicite (lazy load) n'étant pas possible
+    en asynchrone.
+"""
+
+from functools import lru_cache
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
+from app.sqlite import SQL_LITE, engine_profile, listen_pragmas
+
+ASYNC_POOLS = {
+    "queue": AsyncAdaptedQueuePool,
+    "singleton": StaticPool,
+    "static": StaticPool,
+    "null": NullPool,
+}
+
+
+def create_async_sqlite_engine(url, profile):
+    """
+        Create an async engine applying the pool and the PRAGMA of profile
+    """
+    pool_class = ASYNC_POOLS[profile["pool"]]
+    options = {"poolclass": pool_class}
+    if pool_class is AsyncAdaptedQueuePool:
+        options["pool_size"] = int(profile["pool_size"])
+        options["max_overflow"] = int(profile["pool_size"])
+    new_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+                                     **options)
+    listen_pragmas(new_engine.sync_engine, profile)
+    return new_engine
+
+
+@lru_cache(maxsize=None)
+def get_async_engine():
+    """
+        Return the async engine of the database, created on first call
+    """
+    return create_async_sqlite_engine(SQL_LITE, engine_profile())
+
+
+@lru_cache(maxsize=None)
+def get_async_session_factory():
+    """
+        Return the async session factory, created on first call
+    """
+    return sessionmaker(get_async_engine(), class_=AsyncSession,
+                        autocommit=False, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,238 @@
+"""
+Module contenant le moteur de bataille vectorisé.
+
+Les statistiques de base des Pokémon sont rangées dans une matrice NumPy
+(un Pokémon par ligne, une statistique par colonne), ce qui permet de calculer
+le résultat de milliers de combats en une seule soustraction/somme, avec la même
+règle que 'app.utils.pokeapi.battle_compare_stats'.
+
+Fonctions :
+    - stat_matrix(pokemons: Iterable[SpeciesRecord]) -> numpy.ndarray:
+        Construit la matrice (n x 6) des statistiques de base des Pokémon
+        (ValueError si un Pokémon n'a pas exactement six statistiques).
+
+    - score_battles(matrix: numpy.ndarray, first: Sequence[int], second: Sequence[int])
+    -> numpy.ndarray:
+        Somme des différences de statistiques pour chaque couple de lignes.
+
+    - battle_results(pairs: Sequence[tuple], pokemons: dict) -> List[dict | None]:
+        Résultats des combats au format {"Result": winner_api_id} ({"Result": "Draw"}
+        en cas d'égalité, None si un des Pokémon est inconnu).
+
+    - round_robin(api_ids: Sequence[int]) -> List[tuple]:
+        Tous les couples d'un tournoi où chaque Pokémon affronte tous les autres une fois.
+
+    - build_battle_table(species: Iterable[models.Species], path: str) -> int:
+        Précalcule la table de tous les combats à partir du Pokédex local.
+
+Classes :
+    - BattleTable : Table précalculée (int16, projetée en mémoire depuis le disque) des
+    différences de total de statistiques entre chaque couple d'espèces.
+        Méthodes :
+            - outcome(first_api_id: int, second_api_id: int) -> dict | None : Résultat en O(1).
+            - outcomes(pairs: Sequence[tuple]) -> List[dict | None] : Résultats vectorisés.
+            - beaten_by(api_id: int, limit: int) -> List[int] : Espèces qui battent api_id,
+            de la plus forte à la plus faible.
+            - best_counter(api_id: int) -> dict | None : Espèce qui bat api_id avec la plus
+            grande marge.
+
+Notes :
+    - Le résultat d'un combat ne dépend que de la différence des totaux de statistiques,
+    table[i, j] = total(i) - total(j). La ligne/colonne 0 correspond à une espèce fictive
+    dont toutes les statistiques valent 0, donc table[i, 0] = total(i).
+    - Les espèces absentes du Pokédex local ont leur ligne et leur colonne à UNKNOWN.
+    - La table est écrite par "python -m app.manage build-battle-table" dans
+    BATTLE_TABLE_PATH (variable d'environnement, par défaut "./battle_table.npy").
+"""
+
+import os
+import threading
+from itertools import combinations
+import numpy as np
+from app.models import Species
+
+STAT_COUNT = len(Species.STAT_NAMES)
+BATTLE_TABLE_PATH = os.getenv("BATTLE_TABLE_PATH", "./battle_table.npy")
+UNKNOWN = np.iinfo(np.int16).min
+
+
+def stat_matrix(pokemons):
+    """
+        Build the (n x 6) base stat matrix of the given species records
+        Raise ValueError if a record does not have exactly six base stats
+    """
+    rows = []
+    for pokemon in pokemons:
+        if len(pokemon.stats) != STAT_COUNT:
+            raise ValueError(f"Pokemon {pokemon.id} has {len(pokemon.stats)} base stats, "
+                             f"expected {STAT_COUNT}")
+        rows.append(pokemon.stats)
+    return np.array(rows, dtype=np.int32).reshape(-1, STAT_COUNT)
+
+
+def score_battles(matrix, first, second):
+    """
+        Sum of stat differences between rows first[i] and second[i] for every i
+    """
+    return (matrix[np.asarray(first)] - matrix[np.asarray(second)]).sum(axis=1)
+
+
+def battle_results(pairs, pokemons):
+    """
+        Score every (first_api_id, second_api_id) pair with one vectorized operation
+        pokemons maps api_id to species record (None if unknown)
+    """
+    known = [api_id for api_id, pokemon in pokemons.items() if pokemon]
+    rows = {api_id: index for index, api_id in enumerate(known)}
+    playable = [index for index, (first, second) in enumerate(pairs)
+                if first in rows and second in rows]
+
+    results = [None] * len(pairs)
+    if not playable:
+        return results
+    matrix = stat_matrix(pokemons[api_id] for api_id in known)
+    scores = score_battles(matrix,
+                           [rows[pairs[index][0]] for index in playable],
+                           [rows[pairs[index][1]] for index in playable])
+    for index, score in zip(playable, scores.tolist()):
+        results[index] = result_from_score(pairs[index], score)
+    return results
+
+
+def result_from_score(pair, score):
+    """
+        Turn the stat difference of a pair into the battle result
+    """
+    if score > 0:
+        return {"Result": pair[0]}
+    if score < 0:
+        return {"Result": pair[1]}
+    return {"Result": "Draw"}
+
+
+def round_robin(api_ids):
+    """
+        Every pair of a tournament where each pokemon fights each other once
+    """
+    return list(combinations(dict.fromkeys(api_ids), 2))
+
+
+def build_battle_table(species, path=BATTLE_TABLE_PATH):
+    """
+        Precompute the all-pairs stat total difference table of the given species
+        Return the number of species in the table
+    """
+    totals = {entry.id: sum(entry.stats) for entry in species}
+    size = max(totals, default=0) + 1
+    known = np.zeros(size, dtype=bool)
+    known[0] = True
+    column = np.zeros(size, dtype=np.int32)
+    for api_id, total in totals.items():
+        known[api_id] = True
+        column[api_id] = total
+
+    table = np.lib.format.open_memmap(path, mode="w+", dtype=np.int16, shape=(size, size))
+    for api_id in range(size):
+        table[api_id] = np.where(known & known[api_id], column[api_id] - column, UNKNOWN)
+    table.flush()
+    del table
+    return len(totals)
+
+
+class BattleTable:
+    """
+        Memory-mapped precomputed battle outcomes
+    """
+
+    def __init__(self, path=BATTLE_TABLE_PATH):
+        self.path = path
+        self._table = None
+        self._ranking = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+            Map the table from disk, return False if it was not built
+        """
+        with self._lock:
+            self._loaded = True
+            if not os.path.exists(self.path):
+                self._table = self._ranking = None
+                return False
+            self._table = np.load(self.path, mmap_mode="r")
+            totals = np.asarray(self._table[:, 0], dtype=np.int32)
+            known = np.flatnonzero(totals != UNKNOWN)
+            known = known[known != 0]
+            # api_ids from the strongest to the weakest, with their negated totals
+            order = np.argsort(-totals[known], kind="stable")
+            self._ranking = (known[order], -totals[known][order])
+            return True
+
+    def _get(self):
+        """
+            Return the table, loading it on first use
+        """
+        if not self._loaded:
+            self.load()
+        return self._table
+
+    def _score(self, first_api_id, second_api_id):
+        """
+            Stat total difference, None if a species is unknown
+        """
+        table = self._get()
+        if table is None or not (0 <= first_api_id < len(table)
+                                 and 0 <= second_api_id < len(table)):
+            return None
+        score = int(table[first_api_id, second_api_id])
+        return None if score == UNKNOWN else score
+
+    def outcome(self, first_api_id, second_api_id):
+        """
+            Battle result read from the table, None if it cannot answer
+        """
+        score = self._score(first_api_id, second_api_id)
+        if score is None or first_api_id == 0 or second_api_id == 0:
+            return None
+        return result_from_score((first_api_id, second_api_id), score)
+
+    def outcomes(self, pairs):
+        """
+            Battle results of many pairs read at once, None for the pairs it cannot answer
+        """
+        table = self._get()
+        results = [None] * len(pairs)
+        if table is None or not pairs:
+            return results
+        first, second = np.asarray(pairs, dtype=np.int64).reshape(-1, 2).T
+        inside = (first > 0) & (first < len(table)) & (second > 0) & (second < len(table))
+        scores = np.full(len(pairs), UNKNOWN, dtype=np.int32)
+        scores[inside] = table[first[inside], second[inside]]
+        for index in np.flatnonzero(scores != UNKNOWN).tolist():
+            results[index] = result_from_score(pairs[index], int(scores[index]))
+        return results
+
+    def beaten_by(self, api_id, limit=None):
+        """
+            api_ids of the species beating api_id, strongest first
+            None if api_id is unknown
+        """
+        total = self._score(api_id, 0)
+        if total is None or api_id == 0:
+            return None
+        ranking, negated_totals = self._ranking
+        stronger = int(np.searchsorted(negated_totals, -total, side="left"))
+        return ranking[:stronger if limit is None else min(stronger, limit)].tolist()
+
+    def best_counter(self, api_id):
+        """
+            Species beating api_id with the largest margin, None if nothing beats it
+        """
+        counters = self.beaten_by(api_id, limit=1)
+        if not counters:
+            return None
+        return {"api_id": counters[0], "margin": self._score(counters[0], api_id)}
+
+
+battle_table = BattleTable()
@@ -0,0 +1,237 @@
+"""
+Module contenant un cache à deux niveaux pour les réponses de l'API PokeAPI.
+
+Le premier niveau est un cache LRU borné en mémoire, le second un stockage
+persistant dans une base SQLite séparée (par défaut "./pokeapi_cache.db",
+à côté de "./sqlite.db"). Les entrées expirent après une durée de vie (TTL)
+et les plus anciennes sont évincées lorsque la taille maximale est atteinte.
+
+Classes :
+    - PokemonCache : Cache mémoire + disque indexé par l'identifiant PokeAPI.
+        Méthodes :
+            - get(api_id: int) -> dict | None : Récupère une entrée si elle est valide.
+            - get_memory(api_id: int) -> dict | None : Récupère une entrée du cache
+            mémoire seulement, sans accès au disque.
+            - set(api_id: int, value: dict) : Enregistre une entrée dans les deux niveaux.
+            - invalidate(api_id: int) : Supprime une entrée des deux niveaux.
+            - clear() : Vide le cache.
+            - warm_up(api_ids: Iterable[int] = None, loader: Callable = None) -> int :
+                Charge les entrées du disque en mémoire et récupère les manquantes.
+            - stats() -> dict : Compteurs de hits/misses et tailles.
+
+Notes :
+    - Le cache est protégé par un verrou car les routes synchrones de FastAPI
+    s'exécutent dans un pool de threads.
+    - Passer path=None désactive le stockage sur disque.
+    - Les valeurs sont stockées sur disque en JSON ; decode (facultatif) reconstruit la
+    valeur à partir du JSON relu (par exemple 'SpeciesRecord.parse') ; une entrée qu'il
+    rejette (ValueError, KeyError, TypeError) est traitée comme absente et supprimée.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class PokemonCache:
+    """
+        Two-tier (memory LRU + SQLite) cache for pokeapi responses
+    """
+
+    def __init__(self, path=None, max_memory_entries=1024, max_disk_entries=10000,
+                 ttl=DEFAULT_TTL, decode=None):
+        self.path = path
+        self.decode = decode
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._connection = None
+
+    def _disk(self):
+        """
+            Lazily open the on-disk store
+        """
+        if self.path is None:
+            return None
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pokeapi_cache ("
+                "api_id INTEGER PRIMARY KEY, payload TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_pokeapi_cache_accessed_at "
+                "ON pokeapi_cache (accessed_at)")
+            self._connection.commit()
+        return self._connection
+
+    def _decode(self, payload):
+        """
+            Value of a json payload read from disk, None if decode rejects it
+        """
+        value = json.loads(payload)
+        if self.decode is None:
+            return value
+        try:
+            return self.decode(value)
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _remember(self, api_id, expires_at, value):
+        """
+            Put an entry in the memory LRU, evicting the least recently used one
+        """
+        self._memory[api_id] = (expires_at, value)
+        self._memory.move_to_end(api_id)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, api_id):
+        """
+            Return the cached value for api_id or None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(api_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(api_id)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[api_id]
+
+            disk = self._disk()
+            if disk is not None:
+                row = disk.execute(
+                    "SELECT payload, expires_at FROM pokeapi_cache WHERE api_id = ?",
+                    (api_id,)).fetchone()
+                value = self._decode(row[0]) if row is not None and row[1] > now else None
+                if value is not None:
+                    disk.execute("UPDATE pokeapi_cache SET accessed_at = ? WHERE api_id = ?",
+                                 (now, api_id))
+                    disk.commit()
+                    self._remember(api_id, row[1], value)
+                    self.disk_hits += 1
+                    return value
+                if row is not None:
+                    disk.execute("DELETE FROM pokeapi_cache WHERE api_id = ?", (api_id,))
+                    disk.commit()
+
+            self.misses += 1
+            return None
+
+    def get_memory(self, api_id):
+        """
+            Return the value of api_id from the memory tier only, None if it is not there
+            A miss is counted by the following get
+        """
+        with self._lock:
+            entry = self._memory.get(api_id)
+            if entry is None or entry[0] <= time.time():
+                return None
+            self._memory.move_to_end(api_id)
+            self.memory_hits += 1
+            return entry[1]
+
+    def set(self, api_id, value):
+        """
+            Store value for api_id in memory and on disk
+        """
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(api_id, expires_at, value)
+            disk = self._disk()
+            if disk is None:
+                return
+            disk.execute(
+                "INSERT OR REPLACE INTO pokeapi_cache (api_id, payload, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)", (api_id, json.dumps(value), expires_at, now))
+            overflow = disk.execute("SELECT COUNT(*) FROM pokeapi_cache").fetchone()[0] \
+                - self.max_disk_entries
+            if overflow > 0:
+                disk.execute(
+                    "DELETE FROM pokeapi_cache WHERE api_id IN ("
+                    "SELECT api_id FROM pokeapi_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,))
+            disk.commit()
+
+    def invalidate(self, api_id):
+        """
+            Remove api_id from both tiers
+        """
+        with self._lock:
+            self._memory.pop(api_id, None)
+            disk = self._disk()
+            if disk is not None:
+                disk.execute("DELETE FROM pokeapi_cache WHERE api_id = ?", (api_id,))
+                disk.commit()
+
+    def clear(self):
+        """
+            Empty both tiers and reset the counters
+        """
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+            disk = self._disk()
+            if disk is not None:
+                disk.execute("DELETE FROM pokeapi_cache")
+                disk.commit()
+
+    def warm_up(self, api_ids=None, loader=None):
+        """
+            Load the freshest disk entries in memory, then fetch the missing api_ids with loader
+            Return the number of entries loaded from the loader
+        """
+        now = time.time()
+        with self._lock:
+            disk = self._disk()
+            if disk is not None:
+                rows = disk.execute(
+                    "SELECT api_id, payload, expires_at FROM pokeapi_cache "
+                    "WHERE expires_at > ? ORDER BY accessed_at DESC LIMIT ?",
+                    (now, self.max_memory_entries)).fetchall()
+                for api_id, payload, expires_at in reversed(rows):
+                    value = self._decode(payload)
+                    if value is not None:
+                        self._remember(api_id, expires_at, value)
+
+        loaded = 0
+        if api_ids is None or loader is None:
+            return loaded
+        for api_id in api_ids:
+            with self._lock:
+                entry = self._memory.get(api_id)
+            if entry is not None and entry[0] > now:
+                continue
+            value = loader(api_id)
+            if value is not None:
+                self.set(api_id, value)
+                loaded += 1
+        return loaded
+
+    def stats(self):
+        """
+            Return hit/miss counters and sizes of both tiers
+        """
+        with self._lock:
+            disk = self._disk()
+            disk_entries = 0 if disk is None else \
+                disk.execute("SELECT COUNT(*) FROM pokeapi_cache").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
@@ -0,0 +1,76 @@
+"""
+Module contenant la sérialisation rapide des listes de dresseurs, pokémons et objets.
+
+Les routes de liste valident et copient chaque objet ORM à travers Pydantic
+(response_model) avant l'encodage JSON. Avec le paramètre "fast=true", elles
+sélectionnent uniquement les colonnes des schémas sous forme de tuples et les
+encodent directement avec orjson dans une 'Response' brute.
+
+Le JSON produit est identique, octet par octet, à celui des schémas 'schemas.Trainer',
+'schemas.TrainerSummary', 'schemas.Pokemon' et 'schemas.Item' : mêmes champs, dans le
+même ordre, même encodage compact et UTF-8.
+
+Objets :
+    - TRAINER_FIELDS, ITEM_FIELDS, POKEMON_FIELDS : Champs des schémas, dans l'ordre.
+
+Fonctions :
+    - columns(model: Base, fields: Tuple[str]) -> List[Column] : Colonnes à sélectionner.
+    - encode_rows(fields: Tuple[str], rows: List[tuple]) -> bytes
+    - encode_trainers(rows: List[tuple], inventory: List[tuple] = None,
+    pokemons: List[tuple] = None) -> bytes : Dresseurs avec leurs collections
+    (ou sans si elles ne sont pas fournies).
+    - json_response(content: bytes, headers: dict = None) -> Response
+"""
+
+import orjson
+from fastapi import Response
+from app import schemas
+
+TRAINER_FIELDS = tuple(schemas.TrainerSummary.__fields__)
+ITEM_FIELDS = tuple(schemas.Item.__fields__)
+POKEMON_FIELDS = tuple(schemas.Pokemon.__fields__)
+
+
+def columns(model, fields):
+    """
+        Columns of model selected for fields
+    """
+    return [getattr(model, field) for field in fields]
+
+
+def encode_rows(fields, rows):
+    """
+        Encode column tuples as a json list of objects
+    """
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+
+def group_by_trainer(fields, rows):
+    """
+        Objects of rows grouped by their trainer_id
+    """
+    index = fields.index("trainer_id")
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[index], []).append(dict(zip(fields, row)))
+    return groups
+
+
+def encode_trainers(rows, inventory=None, pokemons=None):
+    """
+        Encode trainer tuples, with their collections when given
+    """
+    if inventory is None:
+        return encode_rows(TRAINER_FIELDS, rows)
+    items = group_by_trainer(ITEM_FIELDS, inventory)
+    owned = group_by_trainer(POKEMON_FIELDS, pokemons)
+    return orjson.dumps([{**dict(zip(TRAINER_FIELDS, row)),
+                          "inventory": items.get(row.id, []),
+                          "pokemons": owned.get(row.id, [])} for row in rows])
+
+
+def json_response(content, headers=None):
+    """
+        Raw json response of already encoded content
+    """
+    return Response(content, media_type="application/json", headers=headers)
@@ -0,0 +1,263 @@
+"""
+Module contenant l'instrumentation des requêtes HTTP.
+
+Pour chaque requête, 'MetricsMiddleware' mesure la durée totale, le nombre et la durée
+cumulée des requêtes SQL (événements "before_cursor_execute" et "after_cursor_execute"
+des moteurs passés à 'instrument_engine') et des appels à PokeAPI (blocs
+'pokeapi_timer' autour des recherches de 'app.utils.pokeapi' et
+'app.utils.pokeapi_async' non servies par le cache, attente d'un appel partagé
+comprise). Le reste de la durée est le temps passé dans l'application
+elle-même (validation Pydantic, sérialisation, ...).
+
+Ces mesures sont retournées dans l'en-tête "Server-Timing" de la réponse :
+    Server-Timing: total;dur=12.5, db;dur=3.1;desc="4 queries",
+    pokeapi;dur=0.0;desc="0 calls", app;dur=9.4
+
+et cumulées par route dans 'metrics', affiché au format Prometheus par GET /metrics :
+    - http_requests_total{method, route, status}
+    - http_request_duration_seconds{method, route} : histogramme
+    - db_queries_total, db_query_duration_seconds_total{method, route}
+    - pokeapi_requests_total, pokeapi_request_duration_seconds_total{method, route}
+
+Classes et objets :
+    - RequestTimings : Mesures de la requête en cours.
+    - Metrics : Compteurs et histogrammes par route.
+    - MetricsMiddleware : Middleware ASGI qui mesure chaque requête.
+    - metrics : Instance partagée de 'Metrics'.
+
+Fonctions :
+    - instrument_engine(engine: Engine) : Mesure les requêtes SQL du moteur.
+    - pokeapi_timer() : Bloc mesurant un appel à PokeAPI.
+    - render_counter(name: str, description: str, samples: dict) -> str :
+        Compteur au format Prometheus.
+    - route_name(routes: List[BaseRoute], scope: dict) -> str : Chemin de la route appelée.
+
+Notes :
+    - La requête en cours est portée par une 'ContextVar' : les routes synchrones
+    exécutées dans le pool de threads de Starlette la voient, mais pas les threads
+    démarrés à part (résolution des noms en arrière-plan).
+    - La route est le chemin déclaré ("/trainers/{trainer_id}"), pas l'URL, pour que le
+    nombre de séries reste borné ("unmatched" pour les URL inconnues).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.routing import Match
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+current_timings = ContextVar("current_timings", default=None)
+
+
+class RequestTimings:
+    """
+        Durations of the request being served
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_count = 0
+        self.db_seconds = 0.0
+        self.pokeapi_count = 0
+        self.pokeapi_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_query(self, seconds):
+        """
+            Record one SQL statement
+        """
+        with self._lock:
+            self.db_count += 1
+            self.db_seconds += seconds
+
+    def add_pokeapi_call(self, seconds):
+        """
+            Record one pokeapi call
+        """
+        with self._lock:
+            self.pokeapi_count += 1
+            self.pokeapi_seconds += seconds
+
+    def elapsed(self):
+        """
+            Seconds since the start of the request
+        """
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """
+            Value of the Server-Timing header
+        """
+        total = self.elapsed()
+        app_seconds = max(total - self.db_seconds - self.pokeapi_seconds, 0.0)
+        return (f"total;dur={1000 * total:.1f}, "
+                f"db;dur={1000 * self.db_seconds:.1f};desc=\"{self.db_count} queries\", "
+                f"pokeapi;dur={1000 * self.pokeapi_seconds:.1f};"
+                f"desc=\"{self.pokeapi_count} calls\", "
+                f"app;dur={1000 * app_seconds:.1f}")
+
+
+def instrument_engine(engine):
+    """
+        Record the SQL statements of engine in the current request
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(connection, _cursor, _statement, _parameters, _context, _executemany):
+        connection.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(connection, _cursor, _statement, _parameters, _context, _executemany):
+        start = connection.info["query_start"].pop()
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add_query(time.perf_counter() - start)
+
+
+@contextmanager
+def pokeapi_timer():
+    """
+        Record the enclosed pokeapi call in the current request
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add_pokeapi_call(time.perf_counter() - start)
+
+
+class Metrics:
+    """
+        Request counters and latency histograms by route
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._routes = {}
+
+    def observe(self, method, route, status, timings):
+        """
+            Add a finished request
+        """
+        duration = timings.elapsed()
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            route_metrics = self._routes.setdefault((method, route), {
+                "buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0,
+                "db_count": 0, "db_seconds": 0.0, "pokeapi_count": 0, "pokeapi_seconds": 0.0})
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    route_metrics["buckets"][index] += 1
+            route_metrics["count"] += 1
+            route_metrics["sum"] += duration
+            route_metrics["db_count"] += timings.db_count
+            route_metrics["db_seconds"] += timings.db_seconds
+            route_metrics["pokeapi_count"] += timings.pokeapi_count
+            route_metrics["pokeapi_seconds"] += timings.pokeapi_seconds
+
+    def clear(self):
+        """
+            Reset every metric
+        """
+        with self._lock:
+            self._requests.clear()
+            self._routes.clear()
+
+    def render(self):
+        """
+            Metrics in the Prometheus text format
+        """
+        with self._lock:
+            requests = sorted(self._requests.items())
+            routes = sorted((key, dict(value, buckets=list(value["buckets"])))
+                            for key, value in self._routes.items())
+        lines = ["# HELP http_requests_total Requests served.",
+                 "# TYPE http_requests_total counter"]
+        lines += [f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} '
+                  f"{count}" for (method, route, status), count in requests]
+        lines += ["# HELP http_request_duration_seconds Request duration.",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), value in routes:
+            labels = f'method="{method}",route="{route}"'
+            for bound, count in zip(self.buckets, value["buckets"]):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} '
+                             f"{count}")
+            lines += [f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} '
+                      f"{value['count']}",
+                      f"http_request_duration_seconds_sum{{{labels}}} {value['sum']}",
+                      f"http_request_duration_seconds_count{{{labels}}} {value['count']}"]
+        for name, field, kind, description in (
+                ("db_queries_total", "db_count", "counter", "SQL statements executed."),
+                ("db_query_duration_seconds_total", "db_seconds", "counter",
+                 "Time spent in SQL statements."),
+                ("pokeapi_requests_total", "pokeapi_count", "counter", "Calls to pokeapi."),
+                ("pokeapi_request_duration_seconds_total", "pokeapi_seconds", "counter",
+                 "Time spent waiting for pokeapi.")):
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{method="{method}",route="{route}"}} {value[field]}'
+                      for (method, route), value in routes]
+        return "\n".join(lines) + "\n"
+
+
+def render_counter(name, description, samples):
+    """
+        Counter in the Prometheus text format, samples are {labels: value}
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+    lines += [f"{name}{{{labels}}} {value}" for labels, value in samples.items()]
+    return "\n".join(lines) + "\n"
+
+
+def route_name(routes, scope):
+    """
+        Declared path of the route matching scope
+    """
+    for route in routes:
+        match, _child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+        ASGI middleware measuring every request
+    """
+
+    def __init__(self, app, routes=(), registry=None):
+        self.app = app
+        self.routes = routes
+        self.registry = metrics if registry is None else registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"server-timing", timings.server_timing().encode())])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timings.reset(token)
+            self.registry.observe(scope["method"], route_name(self.routes, scope),
+                                  status["code"], timings)
+
+
+metrics = Metrics()
@@ -0,0 +1,214 @@
+"""
+Module contenant la résolution en arrière-plan des noms des pokémons.
+
+Un pokémon ajouté avec defer_name=True est inséré immédiatement sans nom
+(name_status "pending") : l'appel à PokeAPI ne bloque ni la requête ni le verrou
+d'écriture de SQLite. Son identifiant est placé dans une file traitée par un thread
+qui regroupe les demandes par lots, ne résout qu'une fois chaque api_id du lot
+(voir 'app.utils.pokeapi.get_pokemon_names') et met à jour tout le lot en une
+transaction ("resolved", ou "failed" si PokeAPI ne connaît pas l'api_id), puis
+invalide les réponses mises en cache des dresseurs concernés.
+
+Si la recherche groupée échoue (PokeAPI indisponible, timeout, ...), chaque api_id est
+recherché séparément : un api_id en erreur ne fait pas échouer le reste du lot. Ses
+pokémons sont remis en file après un délai exponentiel borné (retry_backoff * 2 ** n,
+au plus max_backoff secondes) et passent à "failed" après max_retries nouvelles
+tentatives.
+
+Classes :
+    - NameResolver : File et thread de résolution des noms.
+        Méthodes :
+            - submit(pokemon_id: int, api_id: int, attempt: int = 0) : Demande la
+            résolution d'un pokémon.
+            - resume() -> int : Remet en file les pokémons encore "pending" en base.
+            - join() : Attend que toutes les demandes en file soient traitées, nouvelles
+            tentatives comprises.
+            - stats() -> dict : Taille de la file, nombre de noms résolus/en échec et de
+            nouvelles tentatives.
+
+Objets :
+    - name_resolver : Instance partagée utilisée par les actions.
+"""
+
+import logging
+import queue
+import threading
+from sqlalchemy import update
+from app import models
+from app.sqlite import SessionLocal
+from . import pokeapi
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+
+class NameResolver:
+    """
+        Background worker resolving the names of pending pokemons in batches
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size=100, batch_wait=0.05,
+                 max_retries=5, retry_backoff=1.0, max_backoff=60.0):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.resolved = 0
+        self.failed = 0
+        self.retried = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, pokemon_id, api_id, attempt=0):
+        """
+            Queue the name resolution of a pending pokemon
+        """
+        self._start()
+        self._queue.put((pokemon_id, api_id, attempt))
+
+    def resume(self):
+        """
+            Queue the pokemons left pending, for example by a restart
+            Return their number
+        """
+        with self.session_factory() as database:
+            pending = database.query(models.Pokemon.id, models.Pokemon.api_id) \
+                .filter(models.Pokemon.name_status == models.NAME_PENDING).all()
+        for pokemon_id, api_id in pending:
+            self.submit(pokemon_id, api_id)
+        return len(pending)
+
+    def join(self):
+        """
+            Wait until every queued pokemon is processed, retries included
+        """
+        self._queue.join()
+
+    def stats(self):
+        """
+            Queue size and counters
+        """
+        return {"queued": self._queue.qsize(), "resolved": self.resolved, "failed": self.failed,
+                "retried": self.retried}
+
+    def _start(self):
+        """
+            Start the worker thread on first use
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="name-resolver",
+                                                daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """
+            Block for one request then gather the ones arriving within batch_wait
+        """
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get(timeout=self.batch_wait))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """
+            Worker loop
+        """
+        while True:
+            batch = self._next_batch()
+            try:
+                retries = self._resolve(batch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Name resolution failed for %s pokemons", len(batch))
+                # Past max_retries the pokemons stay pending until the next resume()
+                retries = [request for request in batch if request[2] < self.max_retries]
+            self._retry_later(retries)
+            for _ in range(len(batch) - len(retries)):
+                self._queue.task_done()
+
+    def _retry_later(self, requests):
+        """
+            Queue the requests again after a capped exponential backoff
+            They are marked done once queued again, so join() waits for the retries
+        """
+        by_attempt = {}
+        for pokemon_id, api_id, attempt in requests:
+            by_attempt.setdefault(attempt, []).append((pokemon_id, api_id, attempt + 1))
+        self.retried += len(requests)
+        for attempt, retries in by_attempt.items():
+            timer = threading.Timer(min(self.retry_backoff * 2 ** attempt, self.max_backoff),
+                                    self._requeue, args=(retries,))
+            timer.daemon = True
+            timer.start()
+
+    def _requeue(self, requests):
+        """
+            Put back requests waiting for a retry
+        """
+        for request in requests:
+            self._queue.put(request)
+        for _ in requests:
+            self._queue.task_done()
+
+    @staticmethod
+    def _lookup(api_ids):
+        """
+            Names of api_ids in one parallel lookup, or one lookup per api_id if it fails
+            Return {api_id: name} and the set of api_ids whose lookup failed
+        """
+        try:
+            return pokeapi.get_pokemon_names(api_ids), set()
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Name lookup of %s pokemons failed, retrying them one by one",
+                           len(api_ids))
+        names, errors = {}, set()
+        for api_id in api_ids:
+            try:
+                names.update(pokeapi.get_pokemon_names([api_id]))
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Name lookup failed for api_id %s", api_id)
+                errors.add(api_id)
+        return names, errors
+
+    def _resolve(self, batch):
+        """
+            Resolve each distinct api_id of the batch once and update the batch in one transaction
+            Return the requests to retry, their lookup having failed
+        """
+        requests_by_api_id = {}
+        for request in batch:
+            requests_by_api_id.setdefault(request[1], []).append(request)
+        names, errors = self._lookup(list(requests_by_api_id))
+
+        retries = []
+        with self.session_factory() as database:
+            for api_id, requests in requests_by_api_id.items():
+                if api_id in errors:
+                    retries += [request for request in requests if request[2] < self.max_retries]
+                    requests = [request for request in requests if request[2] >= self.max_retries]
+                    if not requests:
+                        continue
+                name = names.get(api_id)
+                status = models.NAME_FAILED if name is None else models.NAME_RESOLVED
+                database.execute(update(models.Pokemon)
+                                 .where(models.Pokemon.id.in_([request[0] for request in requests]))
+                                 .values(name=name, name_status=status))
+                if name is None:
+                    self.failed += len(requests)
+                else:
+                    self.resolved += len(requests)
+            database.commit()
+            trainer_ids = database.query(models.Pokemon.trainer_id).distinct() \
+                .filter(models.Pokemon.id.in_([request[0] for request in batch])).all()
+        response_cache.invalidate("trainers", "pokemons",
+                                  *(f"trainer:{trainer_id}" for (trainer_id,) in trainer_ids))
+        return retries
+
+
+name_resolver = NameResolver()
@@ -11,19 +11,48 @@ Fonctions :
         Retourne :
             - str : Nom du Pokémon.
 
-    - get_pokemon_stats(api_id: int) -> list:
+    - get_pokemon_names(api_ids: Iterable[int]) -> dict:
+        Récupère les noms de plusieurs Pokémon en une fois (identifiants dédoublonnés,
+        Pokédex local en une requête puis PokeAPI en parallèle).
+        Retourne :
+            - dict : {api_id: nom} (None pour les Pokémon inconnus).
+
+    - get_pokemon_stats(api_id: int) -> Tuple[int]:
         Récupère les statistiques d'un Pokémon à partir de l'API PokeAPI.
         Paramètres :
             - api_id (int) : ID du Pokémon.
         Retourne :
-            - list : Liste des statistiques du Pokémon.
+            - Tuple[int] : Les six statistiques de base du Pokémon.
 
-    - get_pokemon_data(api_id: int) -> dict:
+    - get_pokemon_data(api_id: int) -> SpeciesRecord:
         Récupère les données d'un Pokémon à partir de l'API PokeAPI.
         Paramètres :
             - api_id (int) : ID du Pokémon.
         Retourne :
-            - dict : Données du Pokémon.
+            - SpeciesRecord : Identifiant, nom et statistiques de base du Pokémon
+            (None pour un Pokémon inconnu).
+
+    - get_stored_pokemon_data(api_id: int) -> SpeciesRecord | None:
+        Récupère les données d'un Pokémon sans appeler PokeAPI (Pokédex local puis cache).
+
+    - get_local_pokemon_data(api_id: int) -> SpeciesRecord | None:
+        Récupère les données d'un Pokémon depuis le Pokédex local (table "species").
+
+    - get_local_pokemon_names(api_ids: Iterable[int]) -> dict:
+        Récupère en une requête les noms des Pokémon présents dans le Pokédex local.
+
+    - fetch_and_cache(api_id: int) -> SpeciesRecord | None:
+        Récupère les données d'un Pokémon depuis PokeAPI et les met en cache
+        (appel partagé par les recherches simultanées).
+
+    - fetch_pokemon_data(api_id: int) -> dict | None:
+        Récupère la réponse complète de l'API PokeAPI pour un Pokémon, sans cache.
+
+    - fetch_species(api_id: int) -> SpeciesRecord | None:
+        Récupère un Pokémon depuis l'API PokeAPI, sans cache, réduit à un 'SpeciesRecord'.
+
+    - warm_up_cache(api_ids: Iterable[int] = None) -> int:
+        Précharge le cache (entrées du disque puis api_ids manquants).
 
     - battle_pokemon(first_api_id: int, second_api_id: int) -> dict:
         Effectue une bataille entre deux Pokémon.
@@ -34,39 +63,168 @@ Fonctions :
             - dict : Résultat de la bataille. {"Result": winner_api_id}
             ({"Result": "Draw"} en cas d'égalité).
 
+    - battle_outcome(first_api_id: int, premier_pokemon: SpeciesRecord,
+    second_api_id: int, second_pokemon: SpeciesRecord) -> dict:
+        Calcule le résultat d'une bataille à partir des données déjà récupérées.
+
     - battle_compare_stats(first_pokemon_stats: list, second_pokemon_stats: list) -> int:
         Compare les statistiques entre deux Pokémon.
         Paramètres :
-            - first_pokemon_stats (list) : Statistiques du premier Pokémon.
-            - second_pokemon_stats (list) : Statistiques du deuxième Pokémon.
+            - first_pokemon_stats (list) : Statistiques de base du premier Pokémon.
+            - second_pokemon_stats (list) : Statistiques de base du deuxième Pokémon.
         Retourne :
             - int : Résultat de la comparaison des statistiques.
+
+Notes :
+    - Les réponses de PokeAPI sont réduites dès leur réception à un 'SpeciesRecord'
+    (nom et statistiques de base, voir 'app.utils.species') : seul cet enregistrement
+    est conservé et utilisé.
+    - Les Pokémon sont mis en cache (mémoire + disque) par 'pokemon_cache'.
+    Le fichier et la durée de vie sont configurables avec les variables d'environnement
+    POKEAPI_CACHE_PATH (vide pour désactiver le disque) et POKEAPI_CACHE_TTL (secondes).
+    - Avec POKEDEX_LOCAL=1, les données sont d'abord lues dans le Pokédex local
+    (voir "python -m app.manage import-pokedex"), PokeAPI n'est appelé que pour les
+    espèces absentes de la table.
+    - POKEAPI_BASE_URL remplace l'adresse de PokeAPI, par exemple par le service local
+    de 'loadtests.fake_pokeapi' pendant les tests de charge.
+    - Les recherches simultanées d'un même Pokémon absent du cache partagent un seul
+    appel à PokeAPI ('pokemon_flight', voir 'app.utils.single_flight').
+    - Les appels HTTP à PokeAPI sont comptés dans les métriques de la requête en cours
+    (voir 'app.utils.metrics').
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 import requests
+from app import models
+from app.sqlite import SessionLocal
+from .cache import DEFAULT_TTL, PokemonCache
+from .metrics import pokeapi_timer
+from .single_flight import SingleFlight
+from .species import SpeciesRecord
+
+BASE_URL = os.getenv("POKEAPI_BASE_URL", "https://pokeapi.co/api/v2")
+POKEDEX_SIZE = 898
+USE_LOCAL_POKEDEX = os.getenv("POKEDEX_LOCAL", "0") == "1"
+
+pokemon_flight = SingleFlight()
 
-BASE_URL = "https://pokeapi.co/api/v2"
+pokemon_cache = PokemonCache(
+    path=os.getenv("POKEAPI_CACHE_PATH", "./pokeapi_cache.db") or None,
+    ttl=float(os.getenv("POKEAPI_CACHE_TTL", str(DEFAULT_TTL))), decode=SpeciesRecord.parse)
 
 
 def get_pokemon_name(api_id):
     """
         Get a pokemon name from the API pokeapi
     """
-    return get_pokemon_data(api_id)['name']
+    return get_pokemon_data(api_id).name
+
+
+def get_pokemon_names(api_ids):
+    """
+        Get the names of several pokemons with one lookup per distinct api_id
+        Return {api_id: name}, name is None if pokeapi does not know this pokemon
+    """
+    names = dict.fromkeys(api_ids)
+    if USE_LOCAL_POKEDEX and names:
+        names.update(get_local_pokemon_names(names))
+    missing = [api_id for api_id, name in names.items() if name is None]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), 16)) as executor:
+            # Each lookup runs in a copy of the caller context to be counted in its request
+            futures = [executor.submit(copy_context().run, get_pokemon_data, api_id)
+                       for api_id in missing]
+            for api_id, data in zip(missing, (future.result() for future in futures)):
+                names[api_id] = None if data is None else data.name
+    return names
 
 
 def get_pokemon_stats(api_id):
     """
-        Get pokemon stats from the API pokeapi
+        Get the six base stats of a pokemon from the API pokeapi
     """
-    return get_pokemon_data(api_id)['stats']
+    return get_pokemon_data(api_id).stats
 
 
 def get_pokemon_data(api_id):
     """
-        Get data of pokemon name from the API pokeapi
+        Get the species record of a pokemon from the API pokeapi
+        Served from the local pokedex or pokemon_cache when possible
+    """
+    data = get_stored_pokemon_data(api_id)
+    if data is None:
+        with pokeapi_timer():
+            data = pokemon_flight.do(api_id, fetch_and_cache, api_id)
+    return data
+
+
+def get_stored_pokemon_data(api_id):
+    """
+        Get the species record of a pokemon from the local pokedex or pokemon_cache
+        Return None if it has to be fetched from the API pokeapi
+    """
+    if USE_LOCAL_POKEDEX:
+        data = get_local_pokemon_data(api_id)
+        if data is not None:
+            return data
+    return pokemon_cache.get(api_id)
+
+
+def fetch_and_cache(api_id):
+    """
+        Get the species record of a pokemon from the API pokeapi and store it in pokemon_cache
     """
-    return requests.get(f"{BASE_URL}/pokemon/{api_id}", timeout=10).json()
+    record = fetch_species(api_id)
+    if record is not None:
+        pokemon_cache.set(api_id, record)
+    return record
+
+
+def get_local_pokemon_data(api_id):
+    """
+        Get the species record of a pokemon from the local pokedex
+        Return None if the species is not imported
+    """
+    with SessionLocal() as database:
+        species = database.get(models.Species, api_id)
+        return None if species is None else species.record()
+
+
+def get_local_pokemon_names(api_ids):
+    """
+        Get the names of the given pokemons found in the local pokedex, in one query
+    """
+    with SessionLocal() as database:
+        return dict(database.query(models.Species.id, models.Species.name)
+                    .filter(models.Species.id.in_(list(api_ids))).all())
+
+
+def fetch_pokemon_data(api_id):
+    """
+        Get data of pokemon from the API pokeapi, bypassing the cache
+        Return None if pokeapi does not know this pokemon
+    """
+    response = requests.get(f"{BASE_URL}/pokemon/{api_id}", timeout=10)
+    if response.status_code == 404:
+        return None
+    return response.json()
+
+
+def fetch_species(api_id):
+    """
+        Get the species record of a pokemon from the API pokeapi, bypassing the cache
+        Only the name and the base stats of the payload are kept
+    """
+    return SpeciesRecord.parse(fetch_pokemon_data(api_id))
+
+
+def warm_up_cache(api_ids=None):
+    """
+        Load the persisted cache in memory and fetch the given api_ids not cached yet
+    """
+    return pokemon_cache.warm_up(api_ids, loader=fetch_species)
 
 
 def battle_pokemon(first_api_id, second_api_id):
@@ -77,8 +235,16 @@ def battle_pokemon(first_api_id, second_api_id):
     """
     premier_pokemon = get_pokemon_data(first_api_id)
     second_pokemon = get_pokemon_data(second_api_id)
+    return battle_outcome(first_api_id, premier_pokemon, second_api_id, second_pokemon)
+
+
+def battle_outcome(first_api_id, premier_pokemon, second_api_id, second_pokemon):
+    """
+        Return result of battle between two already fetched pokemons
+        None if one of them is missing
+    """
     if premier_pokemon and second_pokemon:
-        battle_result = battle_compare_stats(premier_pokemon["stats"], second_pokemon["stats"])
+        battle_result = battle_compare_stats(premier_pokemon.stats, second_pokemon.stats)
         if battle_result > 0:
             return {"Result": first_api_id}
         if battle_result < 0:
@@ -90,8 +256,6 @@ def battle_pokemon(first_api_id, second_api_id):
 def battle_compare_stats(first_pokemon_stats, second_pokemon_stats):
     """
         Compare given stat between two pokemons
+        Sum of the differences of their base stats
     """
-    result = 0
-    for index, stats in enumerate(first_pokemon_stats):
-        result += stats["base_stat"] - second_pokemon_stats[index]["base_stat"]
-    return result
+    return sum(first - second for first, second in zip(first_pokemon_stats, second_pokemon_stats))
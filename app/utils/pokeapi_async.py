@@ -0,0 +1,229 @@
+"""
+Module contenant un client asynchrone pour l'API PokeAPI.
+
+Le client réutilise un pool de connexions HTTP keep-alive (httpx), limite le nombre
+de requêtes simultanées par hôte, applique un timeout et réessaie les erreurs
+transitoires avec un délai exponentiel. Les fonctions de ce module sont les
+équivalents asynchrones de celles de 'app.utils.pokeapi' et partagent son cache ; les
+recherches simultanées d'un même Pokémon absent du cache partagent un seul appel
+('pokemon_flight').
+
+Notes :
+    - Le cache mémoire répond directement ; le Pokédex local et le cache disque
+    (requêtes SQLite synchrones) sont lus et écrits dans un thread ('asyncio.to_thread') pour ne
+    pas bloquer la boucle d'événements.
+    - Le client httpx est lié à la boucle d'événements en cours ; celui d'une boucle
+    précédente est fermé avant d'être remplacé.
+
+Classes :
+    - PokeApiClient : Client HTTP asynchrone vers PokeAPI.
+
+Fonctions :
+    - get_pokemon_data(api_id: int) -> SpeciesRecord | None:
+        Récupère les données d'un Pokémon (Pokédex local, cache puis PokeAPI).
+
+    - get_pokemons_data(api_ids: Iterable[int], return_exceptions: bool = False) -> list:
+        Récupère les données de plusieurs Pokémon en parallèle.
+        Avec return_exceptions, les erreurs sont retournées à la place des données.
+
+    - get_pokemon_payload(api_id: int) -> dict | None:
+        Récupère la réponse complète de PokeAPI pour un Pokémon, sans passer par le
+        cache (seul son 'SpeciesRecord' y est enregistré).
+
+    - get_pokemons_payloads(api_ids: Iterable[int], return_exceptions: bool = False)
+    -> list:
+        Récupère les réponses complètes de plusieurs Pokémon en parallèle.
+
+    - get_pokemon_names(api_ids: Iterable[int]) -> dict:
+        Récupère les noms de plusieurs Pokémon, une recherche par identifiant distinct.
+        Retourne :
+            - dict : {api_id: nom} (None pour les Pokémon inconnus).
+
+    - battle_pokemon(first_api_id: int, second_api_id: int) -> dict:
+        Effectue une bataille entre deux Pokémon récupérés en parallèle.
+        Retourne :
+            - dict : Résultat de la bataille. {"Result": winner_api_id}
+            ({"Result": "Draw"} en cas d'égalité).
+
+    - close_client():
+        Ferme les connexions du client partagé.
+"""
+
+import asyncio
+from urllib.parse import urlsplit
+import httpx
+from . import pokeapi
+from .metrics import pokeapi_timer
+from .single_flight import AsyncSingleFlight
+from .species import SpeciesRecord
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class PokeApiClient:
+    """
+        Async pokeapi client with a keep-alive connection pool
+    """
+
+    def __init__(self, base_url=pokeapi.BASE_URL, max_connections=100, max_keepalive=20,
+                 max_concurrency_per_host=50, timeout=10, retries=3, backoff=0.2,
+                 transport=None):
+        self.base_url = base_url
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive)
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.timeout = httpx.Timeout(timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.transport = transport
+        self._client = None
+        self._loop = None
+        self._semaphores = {}
+
+    async def _http(self):
+        """
+            Return the httpx client bound to the running event loop
+            The client of a previous loop is closed before being replaced
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                await self._client.aclose()
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout,
+                                             transport=self.transport)
+            self._loop = loop
+            self._semaphores = {}
+        return self._client
+
+    def _semaphore(self, url):
+        """
+            Return the semaphore limiting concurrent calls to the host of url
+        """
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_concurrency_per_host)
+        return self._semaphores[host]
+
+    async def get_json(self, path):
+        """
+            GET base_url + path and decode the json body
+            Return None on 404, retry transient errors with exponential backoff
+        """
+        url = f"{self.base_url}{path}"
+        client = await self._http()
+        async with self._semaphore(url):
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await client.get(url)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                else:
+                    if response.status_code == 404:
+                        return None
+                    if response.status_code not in RETRY_STATUS_CODES or attempt == self.retries:
+                        response.raise_for_status()
+                        return response.json()
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        return None
+
+    async def aclose(self):
+        """
+            Close the pooled connections
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+
+
+client = PokeApiClient()
+pokemon_flight = AsyncSingleFlight()
+
+
+async def get_pokemon_data(api_id):
+    """
+        Get the species record of a pokemon from the local pokedex, the cache or the API pokeapi
+    """
+    data = pokeapi.pokemon_cache.get_memory(api_id)
+    if data is None:
+        data = await asyncio.to_thread(pokeapi.get_stored_pokemon_data, api_id)
+    if data is None:
+        with pokeapi_timer():
+            data = await pokemon_flight.do(api_id, fetch_and_cache, api_id)
+    return data
+
+
+async def cache_payload(api_id, payload):
+    """
+        Reduce a pokeapi payload to its species record and store it in the shared cache
+    """
+    record = SpeciesRecord.parse(payload)
+    if record is not None:
+        await asyncio.to_thread(pokeapi.pokemon_cache.set, api_id, record)
+    return record
+
+
+async def fetch_and_cache(api_id):
+    """
+        Get the species record of a pokemon from the API pokeapi and store it in the shared cache
+    """
+    return await cache_payload(api_id, await client.get_json(f"/pokemon/{api_id}"))
+
+
+async def get_pokemon_payload(api_id):
+    """
+        Get the full pokeapi payload of a pokemon, None if pokeapi does not know it
+        The payload is not cached, its species record is
+    """
+    with pokeapi_timer():
+        payload = await client.get_json(f"/pokemon/{api_id}")
+    await cache_payload(api_id, payload)
+    return payload
+
+
+async def get_pokemons_payloads(api_ids, return_exceptions=False):
+    """
+        Get the full pokeapi payloads of several pokemons concurrently, in the order of api_ids
+    """
+    return await asyncio.gather(*(get_pokemon_payload(api_id) for api_id in api_ids),
+                                return_exceptions=return_exceptions)
+
+
+async def get_pokemons_data(api_ids, return_exceptions=False):
+    """
+        Get data of several pokemons concurrently, in the order of api_ids
+    """
+    return await asyncio.gather(*(get_pokemon_data(api_id) for api_id in api_ids),
+                                return_exceptions=return_exceptions)
+
+
+async def get_pokemon_names(api_ids):
+    """
+        Get the names of several pokemons with one lookup per distinct api_id
+        Return {api_id: name}, name is None if pokeapi does not know this pokemon
+    """
+    names = dict.fromkeys(api_ids)
+    if pokeapi.USE_LOCAL_POKEDEX and names:
+        names.update(await asyncio.to_thread(pokeapi.get_local_pokemon_names, list(names)))
+    missing = [api_id for api_id, name in names.items() if name is None]
+    for api_id, data in zip(missing, await get_pokemons_data(missing)):
+        names[api_id] = None if data is None else data.name
+    return names
+
+
+async def battle_pokemon(first_api_id, second_api_id):
+    """
+        Do battle between 2 pokemons fetched concurrently
+        Return result of battle
+        if there is a winner it return winner id else it return draw
+    """
+    premier_pokemon, second_pokemon = await get_pokemons_data([first_api_id, second_api_id])
+    return pokeapi.battle_outcome(first_api_id, premier_pokemon, second_api_id, second_pokemon)
+
+
+async def close_client():
+    """
+        Close the shared client connections
+    """
+    await client.aclose()
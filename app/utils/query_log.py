@@ -0,0 +1,162 @@
+"""
+Module contenant le journal des requêtes SQL lentes (mode diagnostic, désactivé par
+défaut).
+
+Avec SLOW_QUERY_MS défini, chaque requête exécutée par les moteurs passés à
+'QueryLog.listen' est chronométrée et cumulée par texte SQL (nombre d'appels, durée
+totale et maximale). Une requête plus longue que le seuil est journalisée
+(logger "app.utils.query_log", niveau WARNING) avec ses paramètres ; son plan
+d'exécution ("EXPLAIN QUERY PLAN") est alors capturé une fois et les parcours complets
+de table ("SCAN trainers", sans index) sont signalés.
+
+Le rapport GET /debug/queries liste les requêtes qui ont pris le plus de temps au total.
+
+Classes et objets :
+    - QueryLog : Statistiques et plans des requêtes d'un ou plusieurs moteurs.
+    - query_log : Instance partagée, configurée par les variables d'environnement.
+
+Fonctions :
+    - normalize(statement: str) -> str : Texte SQL avec les listes "IN (?, ?, ...)"
+    réduites, pour regrouper les chargements "selectin" de tailles différentes.
+    - full_scans(plan: List[str]) -> List[str] : Tables parcourues entièrement.
+
+Notes :
+    - Variables d'environnement : SLOW_QUERY_MS (seuil en ms, vide pour désactiver),
+    SLOW_QUERY_MAX_STATEMENTS (nombre de textes SQL suivis, 500 par défaut).
+    - Au-delà de SLOW_QUERY_MAX_STATEMENTS, un nouveau texte SQL n'est plus cumulé mais
+    reste journalisé (avec son plan, capturé à chaque fois) s'il est lent.
+    - Un "SCAN" suivi d'un "LIMIT" (pagination triée par id) s'arrête tôt mais reste
+    signalé : c'est la durée cumulée qui indique s'il pose problème.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r"\(\?(?:, \?)+\)")
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def normalize(statement):
+    """
+        Statement with the IN lists of placeholders collapsed
+    """
+    return IN_LIST.sub("(?, ...)", " ".join(statement.split()))
+
+
+def full_scans(plan):
+    """
+        Tables scanned without index in the query plan
+    """
+    return [match.group(1) for match in map(FULL_SCAN.match, plan) if match]
+
+
+class QueryLog:
+    """
+        Slow query log with per statement statistics and query plans
+    """
+
+    def __init__(self, threshold_ms=None, max_statements=500):
+        self.threshold_ms = threshold_ms
+        self.max_statements = max_statements
+        self._lock = threading.Lock()
+        self._statements = {}
+
+    @property
+    def enabled(self):
+        """
+            True when a threshold is set
+        """
+        return self.threshold_ms is not None
+
+    def listen(self, engine):
+        """
+            Time the statements of engine, nothing when disabled
+        """
+        if not self.enabled:
+            return
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_query(connection, _cursor, _statement, _parameters, _context, _executemany):
+            connection.info.setdefault("query_log_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def end_query(connection, _cursor, statement, parameters, _context, executemany):
+            duration_ms = 1000 * (time.perf_counter() - connection.info["query_log_start"].pop())
+            self.record(connection, statement, parameters, executemany, duration_ms)
+
+    def record(self, connection, statement, parameters, executemany, duration_ms):
+        """
+            Add an executed statement, log and explain it if it is slow
+        """
+        key = normalize(statement)
+        slow = duration_ms > self.threshold_ms
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None and len(self._statements) < self.max_statements:
+                stats = self._statements[key] = {
+                    "statement": key, "calls": 0, "total_ms": 0.0, "max_ms": 0.0, "slow": 0,
+                    "plan": None, "full_scans": []}
+            if stats is not None:
+                stats["calls"] += 1
+                stats["total_ms"] += duration_ms
+                stats["max_ms"] = max(stats["max_ms"], duration_ms)
+                stats["slow"] += slow
+            explain = slow and (stats is None or stats["plan"] is None) and not executemany
+        if not slow:
+            return
+        logger.warning("Slow query (%.1f ms): %s parameters=%r", duration_ms, key, parameters)
+        if explain and key.split(" ", 1)[0].upper() in EXPLAINABLE:
+            plan = self.explain(connection, statement, parameters)
+            scans = full_scans(plan)
+            if stats is not None:
+                with self._lock:
+                    stats["plan"] = plan
+                    stats["full_scans"] = scans
+            if scans:
+                logger.warning("Full table scan of %s: %s", ", ".join(scans), key)
+
+    @staticmethod
+    def explain(connection, statement, parameters):
+        """
+            Details of the query plan, an empty list if it cannot be explained
+            Run on the DBAPI connection, outside of the instrumented events
+        """
+        explain_cursor = connection.connection.cursor()
+        try:
+            explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            return [row[3] for row in explain_cursor.fetchall()]
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("EXPLAIN QUERY PLAN failed: %s", statement)
+            return []
+        finally:
+            explain_cursor.close()
+
+    def report(self, limit=20):
+        """
+            Statements taking the most time in total, with their mean duration
+        """
+        with self._lock:
+            statements = sorted((dict(stats) for stats in self._statements.values()),
+                                key=lambda stats: stats["total_ms"], reverse=True)[:limit]
+        for stats in statements:
+            stats["mean_ms"] = stats["total_ms"] / stats["calls"]
+        return statements
+
+    def clear(self):
+        """
+            Forget every statement
+        """
+        with self._lock:
+            self._statements.clear()
+
+
+query_log = QueryLog(
+    threshold_ms=float(os.environ["SLOW_QUERY_MS"]) if os.getenv("SLOW_QUERY_MS") else None,
+    max_statements=int(os.getenv("SLOW_QUERY_MAX_STATEMENTS", "500")))
@@ -0,0 +1,260 @@
+"""
+Module contenant un cache des réponses des endpoints de lecture.
+
+Les réponses 200 de GET /trainers, /trainers/{trainer_id}, /items, /pokemons et
+/pokemons/{pokemon_id} sont conservées, indexées par le chemin et les paramètres de
+la requête, avec un ETag : un client qui renvoie cet ETag dans "If-None-Match"
+reçoit une réponse 304 sans corps.
+
+Chaque entrée est associée à des étiquettes ("trainers", "trainer:{id}", "items",
+"pokemons") dont le stockage tient un numéro de génération. Les actions d'écriture
+incrémentent la génération des étiquettes touchées (voir 'app.actions') : une entrée
+dont une étiquette a changé de génération depuis son calcul n'est plus servie.
+
+Classes :
+    - MemoryBackend : Stockage LRU en mémoire des entrées et des générations.
+        Méthodes :
+            - get(key: str) -> tuple | None
+            - set(key: str, entry: tuple)
+            - generations(tags: Iterable[str]) -> tuple : Génération de chaque étiquette.
+            - increment(tags: Iterable[str]) : Incrémente la génération des étiquettes.
+            - clear() : Supprime les entrées (les générations sont conservées).
+    - ResponseCache : Entrées, générations et compteurs.
+        Méthodes :
+            - get(key: str) -> CachedResponse | None : Entrée encore valide.
+            - set(key: str, response: CachedResponse, generations: tuple)
+            - generations(tags: Iterable[str]) -> tuple : Générations actuelles.
+            - invalidate(*tags: str) : Invalide les entrées portant ces étiquettes.
+            - invalidate_trainer(trainer_id: int, *collections: str) : Invalide la liste
+            et le détail d'un dresseur, et les collections modifiées.
+            - clear() : Vide le cache.
+            - stats() -> dict : Compteurs de hits/misses/304.
+    - ResponseCacheMiddleware : Middleware ASGI servant et remplissant le cache.
+
+Fonctions :
+    - route_tags(path: str) -> tuple | None : Étiquettes d'un chemin, None s'il
+    n'est pas mis en cache.
+
+Objets :
+    - response_cache : Instance partagée par le middleware et les actions.
+
+Notes :
+    - RESPONSE_CACHE_SIZE fixe le nombre d'entrées (1024 par défaut, 0 désactive le cache).
+    - Tout objet ayant les méthodes de MemoryBackend peut servir de stockage (par
+    exemple un magasin clé-valeur partagé par plusieurs processus). Les générations y
+    sont conservées avec les entrées : l'écriture traitée par un processus invalide les
+    entrées servies par les autres. increment doit alors être atomique (INCR) et les
+    générations ne doivent pas être évincées.
+    - L'en-tête "X-Cache" (HIT ou MISS) indique si la réponse vient du cache.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+from urllib.parse import parse_qsl, urlencode
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+
+CachedResponse = namedtuple("CachedResponse", ["tags", "headers", "body", "etag"])
+
+ROUTES = [
+    (re.compile(r"^/trainers/?$"), lambda match: ("trainers",)),
+    (re.compile(r"^/trainers/(\d+)$"), lambda match: (f"trainer:{match[1]}",)),
+    (re.compile(r"^/items/?$"), lambda match: ("items",)),
+    (re.compile(r"^/pokemons/(\d+)?$"), lambda match: ("pokemons",)),
+]
+
+
+def route_tags(path):
+    """
+        Tags of a cached read path, None if the path is not cached
+    """
+    for pattern, tags in ROUTES:
+        match = pattern.match(path)
+        if match:
+            return tags(match)
+    return None
+
+
+class MemoryBackend:
+    """
+        Bounded LRU storage of the cache entries
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+
+    def get(self, key):
+        """
+            Entry stored under key
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        """
+            Store entry under key and evict the least recently used ones
+        """
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        """
+            Current generation of each tag
+        """
+        return tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def increment(self, tags):
+        """
+            Increment the generation of each tag
+            Generations are never evicted: a stale entry would match a reset generation
+        """
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        """
+            Remove every entry, the generations are kept
+        """
+        self._entries.clear()
+
+
+class ResponseCache:
+    """
+        Response cache invalidated by tag generations
+    """
+
+    def __init__(self, backend=None, enabled=RESPONSE_CACHE_SIZE > 0):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def generations(self, tags):
+        """
+            Current generation of each tag, read from the backend
+        """
+        with self._lock:
+            return self.backend.generations(tags)
+
+    def get(self, key):
+        """
+            Cached response of key if none of its tags changed since
+        """
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is not None:
+                response, generations = entry
+                if generations == self.backend.generations(response.tags):
+                    self.hits += 1
+                    return response
+            self.misses += 1
+            return None
+
+    def set(self, key, response, generations):
+        """
+            Store response with the generations read before computing it
+        """
+        with self._lock:
+            self.backend.set(key, (response, generations))
+
+    def invalidate(self, *tags):
+        """
+            Invalidate the entries with one of these tags
+        """
+        with self._lock:
+            self.backend.increment(tags)
+
+    def invalidate_trainer(self, trainer_id, *collections):
+        """
+            Invalidate the trainer list, the trainer and the changed collections
+        """
+        self.invalidate("trainers", f"trainer:{trainer_id}", *collections)
+
+    def clear(self):
+        """
+            Remove every entry
+        """
+        with self._lock:
+            self.backend.clear()
+
+    def stats(self):
+        """
+            Hits, misses and 304 counters
+        """
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+
+
+class ResponseCacheMiddleware:
+    """
+        ASGI middleware serving the cached read endpoints
+    """
+
+    def __init__(self, app, cache=None):
+        self.app = app
+        self.cache = response_cache if cache is None else cache
+
+    async def __call__(self, scope, receive, send):
+        tags = route_tags(scope["path"]) if scope["type"] == "http" else None
+        if tags is None or scope["method"] != "GET" or not self.cache.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        query = urlencode(sorted(parse_qsl(scope["query_string"].decode("latin-1"),
+                                           keep_blank_values=True)))
+        key = f"{scope['path']}?{query}"
+        if_none_match = dict(scope["headers"]).get(b"if-none-match")
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            await self.respond(send, cached, if_none_match, b"HIT")
+            return
+
+        generations = self.cache.generations(tags)
+        start, body = {}, []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            else:
+                body.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        content = b"".join(body)
+        if start["status"] != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": content})
+            return
+        etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'.encode()
+        response = CachedResponse(tags, list(start["headers"]) + [(b"etag", etag)],
+                                  content, etag)
+        self.cache.set(key, response, generations)
+        await self.respond(send, response, if_none_match, b"MISS")
+
+    async def respond(self, send, response, if_none_match, status):
+        """
+            Send the cached response, or a 304 if the client already has it
+        """
+        if if_none_match is not None and response.etag in \
+                [etag.strip() for etag in if_none_match.split(b",")]:
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": [(b"etag", response.etag), (b"x-cache", status)]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": response.headers + [(b"x-cache", status)]})
+        await send({"type": "http.response.body", "body": response.body})
+
+
+response_cache = ResponseCache()
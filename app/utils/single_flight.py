@@ -0,0 +1,101 @@
+"""
+Module contenant le regroupement des appels identiques simultanés ("single-flight").
+
+Quand plusieurs requêtes demandent en même temps la même clé (par exemple le même
+Pokémon absent du cache), seul le premier appel est exécuté ; les autres attendent
+son résultat (ou son exception) au lieu de lancer chacun leur propre requête HTTP.
+Une fois l'appel terminé, la clé est libérée : l'appel suivant est de nouveau exécuté.
+
+Classes :
+    - SingleFlight : Regroupement entre threads (routes synchrones).
+        Méthodes :
+            - do(key: Hashable, func: Callable, *args) -> Any
+    - AsyncSingleFlight : Regroupement entre tâches d'une même boucle asyncio.
+        Méthodes :
+            - do(key: Hashable, func: Callable, *args) -> Any (coroutine)
+
+Notes :
+    - "calls" compte les appels exécutés et "coalesced" ceux qui ont réutilisé un appel
+    en cours (exposés par GET /metrics).
+    - Côté asyncio, l'appel partagé est protégé par 'asyncio.shield' : l'annulation
+    d'une requête ne l'interrompt pas pour les autres.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+        Share one in-flight call per key between threads
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, func, *args):
+        """
+            Return func(*args), or the result of the call already running for key
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        """
+            Executed and coalesced calls
+        """
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+class AsyncSingleFlight:
+    """
+        Share one in-flight coroutine per key between the tasks of an event loop
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = {}
+
+    async def do(self, key, func, *args):
+        """
+            Return await func(*args), or the result of the call already running for key
+        """
+        flight_key = (asyncio.get_running_loop(), key)
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            task = self._in_flight[flight_key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda _task: self._in_flight.pop(flight_key, None))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        """
+            Executed and coalesced calls
+        """
+        return {"calls": self.calls, "coalesced": self.coalesced}
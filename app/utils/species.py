@@ -0,0 +1,81 @@
+"""
+Module contenant la représentation compacte d'un Pokémon utilisée par l'application.
+
+Une réponse complète de PokeAPI pèse des centaines de Ko (sprites, attaques, indices des
+jeux, ...) alors que l'application n'en lit que le nom et les six statistiques de base.
+Chaque réponse est donc convertie une seule fois, à la réception, en 'SpeciesRecord' :
+c'est ce que retournent 'app.utils.pokeapi.get_pokemon_data' et son équivalent
+asynchrone, et ce que conservent les caches mémoire et disque.
+
+Constantes :
+    - STAT_NAMES : Noms des six statistiques de base, dans l'ordre de PokeAPI.
+
+Classes :
+    - SpeciesRecord : Tuple nommé (id, name, stats), stats étant les six statistiques de
+    base dans l'ordre de PokeAPI (hp, attack, defense, special-attack, special-defense,
+    speed).
+        Méthodes :
+            - parse(value: dict | list | SpeciesRecord) -> SpeciesRecord | None :
+                Convertit une réponse de PokeAPI, un enregistrement du Pokédex ou une
+                entrée du cache disque (ValueError s'il n'a pas exactement six
+                statistiques de base).
+            - to_dict() -> dict : {"id", "name", "stats": [int]}, format des instantanés
+            du Pokédex et des réponses "slim".
+            - to_pokeapi() -> dict : Sous-ensemble de la réponse de PokeAPI
+            ({"id", "name", "stats": [{"base_stat", "stat": {"name"}}]}).
+
+Notes :
+    - Le modèle 'app.models.Species' passe par SpeciesRecord pour lire un
+    enregistrement et pour produire ses formats : le format compact n'est défini qu'ici.
+    - Un tuple nommé n'a pas de dictionnaire d'attributs : un enregistrement occupe
+    quelques centaines d'octets, contre plusieurs centaines de Ko pour la réponse brute.
+    - Le cache disque stocke l'enregistrement en JSON sous forme de liste
+    [id, name, [stats]] ; les anciennes entrées (réponses complètes) sont converties à
+    la lecture, celles qui ne peuvent pas l'être sont ignorées par le cache.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+STAT_NAMES = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+
+
+class SpeciesRecord(NamedTuple):
+    """
+        Name and base stats of a pokemon
+    """
+    id: Optional[int]
+    name: str
+    stats: Tuple[int, ...]
+
+    @classmethod
+    def parse(cls, value):
+        """
+            Record of a pokeapi payload, a pokedex record or a cached [id, name, stats] list
+            None stays None, raise ValueError if there are not exactly six base stats
+        """
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, (list, tuple)):
+            api_id, name, stats = value
+        else:
+            api_id, name = value.get("id"), value["name"]
+            stats = [stat["base_stat"] if isinstance(stat, dict) else stat
+                     for stat in value["stats"]]
+        if len(stats) != len(STAT_NAMES):
+            raise ValueError(f"Pokemon {api_id} has {len(stats)} base stats, "
+                             f"expected {len(STAT_NAMES)}")
+        return cls(api_id, name, tuple(stats))
+
+    def to_dict(self):
+        """
+            Record as {"id", "name", "stats"}, the stats being a list of integers
+        """
+        return {"id": self.id, "name": self.name, "stats": list(self.stats)}
+
+    def to_pokeapi(self):
+        """
+            Record in the format of the pokeapi payload
+        """
+        return {"id": self.id, "name": self.name,
+                "stats": [{"base_stat": value, "stat": {"name": name}}
+                          for name, value in zip(STAT_NAMES, self.stats)]}
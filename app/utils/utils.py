@@ -9,19 +9,48 @@ Fonctions :
         Retourne :
             - SessionLocal : Session SQLAlchemy pour l'accès à la base de données.
 
+    - get_async_db() -> AsyncSession:
+        Récupère une session asynchrone de base de données (DB_MODE=async).
+
     - age_from_birthdate(birthdate: date) -> int:
         Calcule l'âge à partir de la date de naissance.
         Paramètres :
             - birthdate (date) : Date de naissance.
         Retourne :
             - int : Âge calculé.
+
+    - encode_cursor(last_id: int) -> str:
+        Encode l'identifiant de la dernière ligne d'une page en curseur opaque.
+
+    - decode_cursor(cursor: str | None) -> int | None:
+        Décode un curseur (HTTPException 400 s'il est invalide).
+
+    - next_page_headers(request: Request, rows: list, limit: int) -> dict:
+        En-têtes "Link" (rel="next") et "X-Next-Cursor" de la page suivante,
+        vides s'il s'agit de la dernière page.
+
+    - ndjson_rows(stream: AsyncIterator[bytes]) -> AsyncIterator:
+        Décode les lignes d'un flux NDJSON au fur et à mesure de leur réception.
+
+    - bulk_body(schema: Type[BaseModel]) -> Callable:
+        Dépendance FastAPI lisant un tableau JSON ou un flux NDJSON
+        ("Content-Type: application/x-ndjson") d'éléments du schéma donné. Le flux NDJSON
+        est lu par morceaux (request.stream()) et refusé (413) dès qu'il dépasse
+        BULK_LIMIT lignes.
 """
 
+import base64
+import binascii
+import json
 from datetime import date
-from app import models
-from app.sqlite import SessionLocal, engine
+from typing import List
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError, parse_obj_as
+from app.sqlite import SessionLocal
+from app.sqlite_async import get_async_session_factory
 
-models.Base.metadata.create_all(bind=engine)
+BULK_LIMIT = 10000
 
 
 def get_db():
@@ -35,6 +64,14 @@ def get_db():
         database.close()
 
 
+async def get_async_db():
+    """
+        Get an async session of the DB
+    """
+    async with get_async_session_factory()() as database:
+        yield database
+
+
 def age_from_birthdate(birthdate):
     """
         Return an age from a birthday
@@ -42,3 +79,79 @@ def age_from_birthdate(birthdate):
     today = date.today()
     return today.year - birthdate.year - ((today.month, today.day)
                                           < (birthdate.month, birthdate.day))
+
+
+def encode_cursor(last_id):
+    """
+        Return an opaque cursor pointing after the row last_id
+    """
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+        Return the id encoded in cursor, None if there is no cursor
+    """
+    if cursor is None:
+        return None
+    try:
+        prefix, last_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)) \
+            .decode().split(":")
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(last_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error) as error:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from error
+
+
+def next_page_headers(request, rows, limit):
+    """
+        Link and X-Next-Cursor headers of the next page, if the page is full
+    """
+    if not rows or len(rows) < limit:
+        return {}
+    cursor = encode_cursor(rows[-1].id)
+    next_url = request.url.remove_query_params("skip").include_query_params(cursor=cursor)
+    return {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": cursor}
+
+
+async def ndjson_rows(stream):
+    """
+        Decode the lines of a ndjson byte stream as they arrive, skipping blank lines
+    """
+    pending = b""
+    async for chunk in stream:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if pending.strip():
+        yield json.loads(pending)
+
+
+def bulk_body(schema):
+    """
+        Dependency parsing a json array or a ndjson stream of schema
+    """
+    async def parse(request: Request):
+        try:
+            if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+                rows = []
+                async for row in ndjson_rows(request.stream()):
+                    if len(rows) == BULK_LIMIT:
+                        raise HTTPException(status_code=413, detail=f"At most {BULK_LIMIT} rows")
+                    rows.append(row)
+            else:
+                rows = json.loads(await request.body())
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail="Invalid json body") from error
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Expected a list")
+        if len(rows) > BULK_LIMIT:
+            raise HTTPException(status_code=413, detail=f"At most {BULK_LIMIT} rows")
+        try:
+            return parse_obj_as(List[schema], rows)
+        except ValidationError as error:
+            raise RequestValidationError(error.raw_errors) from error
+    return parse
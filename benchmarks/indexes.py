@@ -0,0 +1,104 @@
+"""
+Benchmark des index des tables "pokemons" et "items", avant et après leur refonte.
+
+Deux bases temporaires sont créées avec le schéma actuel ; la base "legacy" reçoit
+ensuite les index d'origine (un index par colonne, aucun sur trainer_id). Pour chacune,
+le benchmark mesure :
+    - l'écriture : débit d'insertion des pokémons et des objets (un commit par ligne,
+    comme 'actions.add_trainer_item') et taille finale du fichier, les index en trop
+    étant autant de B-arbres à mettre à jour à chaque insertion ;
+    - la lecture : latence moyenne de 'actions.get_trainer' (chargement des collections
+    par trainer_id) et de 'actions.get_trainer_by_name'.
+
+Utilisation :
+    > python -m benchmarks.indexes [--trainers 2000] [--per-trainer 10] [--lookups 2000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date
+from sqlalchemy.orm import sessionmaker
+from app import actions, models, schemas
+from app.sqlite import PROFILES, create_sqlite_engine
+
+LEGACY_INDEXES = [
+    "DROP INDEX ix_pokemons_trainer_id_api_id",
+    "DROP INDEX ix_items_trainer_id",
+    "CREATE INDEX ix_trainers_id ON trainers (id)",
+    "CREATE INDEX ix_pokemons_id ON pokemons (id)",
+    "CREATE INDEX ix_pokemons_name ON pokemons (name)",
+    "CREATE INDEX ix_pokemons_custom_name ON pokemons (custom_name)",
+    "CREATE INDEX ix_items_id ON items (id)",
+    "CREATE INDEX ix_items_name ON items (name)",
+    "CREATE INDEX ix_items_description ON items (description)",
+]
+
+
+def run_schema(name, trainers, per_trainer, lookups):
+    """
+        Return (writes per second, size in MB, get_trainer ms, get_trainer_by_name ms)
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        engine = create_sqlite_engine(f"sqlite:///{path}", PROFILES["tuned"])
+        models.Base.metadata.create_all(bind=engine)
+        if name == "legacy":
+            with engine.begin() as connection:
+                for statement in LEGACY_INDEXES:
+                    connection.exec_driver_sql(statement)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        rng = random.Random(0)
+
+        with session_factory() as database:
+            actions.create_trainers(database, [
+                schemas.TrainerCreate(name=f"Trainer {index}", birthdate=date(2000, 1, 1))
+                for index in range(trainers)])
+            writes = trainers * per_trainer
+            start = time.perf_counter()
+            for index in range(writes):
+                trainer_id = rng.randint(1, trainers)
+                database.add(models.Pokemon(api_id=rng.randint(1, 898), name=f"pokemon{index}",
+                                            custom_name=f"Custom {index}", trainer_id=trainer_id))
+                database.commit()
+                actions.add_trainer_item(database, schemas.ItemCreate(
+                    name=f"Item {index}", description=f"Description {index}"), trainer_id)
+            write_rate = 2 * writes / (time.perf_counter() - start)
+
+        with session_factory() as database:
+            start = time.perf_counter()
+            for _ in range(lookups):
+                actions.get_trainer(database, rng.randint(1, trainers))
+                database.expunge_all()
+            trainer_ms = 1000 * (time.perf_counter() - start) / lookups
+
+            start = time.perf_counter()
+            for _ in range(lookups):
+                actions.get_trainer_by_name(database, f"Trainer {rng.randint(0, trainers - 1)}")
+            name_ms = 1000 * (time.perf_counter() - start) / lookups
+
+        engine.dispose()
+        return write_rate, os.path.getsize(path) / 1024 / 1024, trainer_ms, name_ms
+
+
+def main(argv=None):
+    """
+        Run both index sets and print the results
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.indexes")
+    parser.add_argument("--trainers", type=int, default=2000)
+    parser.add_argument("--per-trainer", type=int, default=10)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    print(f"{'indexes':<10}{'writes/s':>12}{'size MB':>10}{'trainer ms':>12}{'by name ms':>12}")
+    for name in ("legacy", "reworked"):
+        writes, size, trainer_ms, name_ms = run_schema(name, args.trainers, args.per_trainer,
+                                                       args.lookups)
+        print(f"{name:<10}{writes:>12.0f}{size:>10.1f}{trainer_ms:>12.3f}{name_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
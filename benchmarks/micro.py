@@ -0,0 +1,305 @@
+"""
+Micro-benchmarks du calcul des combats, des fonctions de 'app.actions' et de la
+sérialisation des dresseurs.
+
+Trois groupes sont mesurés :
+    - "battle" : 'battle_compare_stats' sur les statistiques de base de deux Pokémon ;
+    - "actions" : chaque fonction de lecture et d'écriture de 'app.actions' contre une
+    base SQLite temporaire remplie avec N dresseurs, N pokémons et N objets, pour chaque
+    taille de --sizes ;
+    - "serialization" : un dresseur dont l'inventaire et l'équipe comptent K éléments,
+    encodé par Pydantic ('schemas.Trainer.from_orm' puis '.json()'), par
+    'jsonable_encoder' comme le font les routes, et par 'app.utils.fast_json'.
+
+Chaque fonction est appelée en boucle pendant au moins --min-time secondes (et au moins
+trois fois) ; le minimum, la médiane, la moyenne et l'écart type sont affichés en ms et
+enregistrés avec le commit, la date et la version de Python dans un fichier JSON.
+--compare affiche le rapport des médianes avec un fichier précédent.
+
+Utilisation :
+    > python -m benchmarks.micro [--sizes 1000 100000 1000000] [--inventories 10 100 1000]
+    [--groups battle actions serialization] [--min-time 0.2]
+    [--output benchmarks/results/<date>-<commit>.json] [--compare ancien.json]
+
+Fonctions :
+    - measure(func: Callable, min_time: float) -> dict : Statistiques des temps d'appel.
+    - compare(results: List[dict], previous: List[dict]) -> List[tuple] :
+        (groupe, nom, taille, médiane précédente, médiane, rapport) des mesures communes.
+
+Notes :
+    - Les noms des pokémons sont remplacés par un nom fixe pendant le benchmark : les
+    écritures mesurent la base, pas PokeAPI ni son cache.
+    - Le remplissage de la taille 1000000 prend plusieurs minutes (index plein texte
+    compris).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from unittest import mock
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from app import actions, models, schemas
+from app.sqlite import PROFILES, create_sqlite_engine
+from app.utils import fast_json
+from app.utils.pokeapi import POKEDEX_SIZE, battle_compare_stats
+from app.utils.response_cache import response_cache
+
+RESULTS = os.path.join(os.path.dirname(__file__), "results")
+GROUPS = ("battle", "actions", "serialization")
+SEED_BATCH = 50000
+
+TrainerRow = namedtuple("TrainerRow", fast_json.TRAINER_FIELDS)
+
+
+def measure(func, min_time=0.2):
+    """
+        Call func until min_time is spent, at least three times
+        Return the rounds and the min, median, mean and stdev in ms
+    """
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < 3 or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        func()
+        timings.append(1000 * (time.perf_counter() - start))
+    return {"rounds": len(timings), "min_ms": min(timings),
+            "median_ms": statistics.median(timings), "mean_ms": statistics.mean(timings),
+            "stdev_ms": statistics.stdev(timings)}
+
+
+def fake_stats(rng):
+    """
+        Six base stats, as in a species record
+    """
+    return tuple(rng.randint(5, 255) for _ in models.Species.STAT_NAMES)
+
+
+def battle_benchmarks(_args):
+    """
+        (name, size, func) of the battle scoring
+    """
+    rng = random.Random(0)
+    first, second = fake_stats(rng), fake_stats(rng)
+    yield "battle_compare_stats", None, lambda: battle_compare_stats(first, second)
+
+
+def seed(session_factory, size):
+    """
+        Insert size trainers, pokemons and items, by batches
+    """
+    rng = random.Random(0)
+    with session_factory() as database:
+        for start in range(0, size, SEED_BATCH):
+            count = min(SEED_BATCH, size - start)
+            database.execute(insert(models.Trainer), [
+                {"name": f"Trainer {index}", "birthdate": date(2000, 1, 1)}
+                for index in range(start, start + count)])
+            database.execute(insert(models.Pokemon), [
+                {"api_id": rng.randint(1, POKEDEX_SIZE), "name": f"pokemon-{index}",
+                 "custom_name": f"Surnom {index}" if index % 3 == 0 else None,
+                 "trainer_id": rng.randint(1, size)} for index in range(start, start + count)])
+            database.execute(insert(models.Item), [
+                {"name": f"Potion {index % 50}", "description": f"Description {index}",
+                 "trainer_id": rng.randint(1, size)} for index in range(start, start + count)])
+            database.commit()
+        actions.recount(database)
+
+
+def action_benchmarks(database, size):
+    """
+        (name, func) of every action against a database of the given size
+    """
+    rng = random.Random(1)
+    trainer = schemas.TrainerCreate(name="Benchmark", birthdate=date(2000, 1, 1))
+    item = schemas.ItemCreate(name="Potion", description="Restaure 20 PV")
+    pokemon = schemas.PokemonCreate(api_id=25, custom_name="Pika")
+    middle = size // 2
+
+    def trainer_id():
+        return rng.randint(1, size)
+
+    def get_trainer():
+        actions.get_trainer(database, trainer_id())
+        database.expunge_all()
+
+    def get_trainers():
+        actions.get_trainers(database, limit=100, after_id=middle)
+        database.expunge_all()
+
+    def drain(iterator):
+        for _ in iterator:
+            pass
+        database.expunge_all()
+
+    return [
+        ("get_trainer", get_trainer),
+        ("get_trainer_by_name", lambda: actions.get_trainer_by_name(
+            database, f"Trainer {trainer_id() - 1}")),
+        ("get_trainers", get_trainers),
+        ("get_items", lambda: actions.get_items(database, limit=100, after_id=middle)),
+        ("get_pokemon", lambda: actions.get_pokemon(database, trainer_id())),
+        ("get_pokemons", lambda: actions.get_pokemons(database, limit=100, after_id=middle)),
+        ("get_rows", lambda: actions.get_rows(database, models.Pokemon, fast_json.POKEMON_FIELDS,
+                                              limit=100, after_id=middle)),
+        ("get_rows_by_trainer", lambda: actions.get_rows_by_trainer(
+            database, models.Item, fast_json.ITEM_FIELDS, range(middle, middle + 100))),
+        ("get_top_trainers", lambda: actions.get_top_trainers(database)),
+        ("get_species_popularity", lambda: actions.get_species_popularity(database)),
+        ("get_trainer_counts", lambda: actions.get_trainer_counts(database, trainer_id())),
+        ("search", lambda: actions.search(database, "potion")),
+        ("iter_all", lambda: drain(actions.iter_all(database, models.Trainer))),
+        ("get_all_species", lambda: actions.get_all_species(database)),
+        ("create_trainer", lambda: actions.create_trainer(database, trainer)),
+        ("add_trainer_item", lambda: actions.add_trainer_item(database, item, trainer_id())),
+        ("add_trainer_pokemon", lambda: actions.add_trainer_pokemon(
+            database, pokemon, trainer_id())),
+        ("create_trainers", lambda: actions.create_trainers(database, [trainer] * 100)),
+        ("add_trainer_items", lambda: actions.add_trainer_items(
+            database, [item] * 100, trainer_id())),
+        ("add_trainer_pokemons", lambda: actions.add_trainer_pokemons(
+            database, [pokemon] * 100, trainer_id())),
+        ("recount", lambda: actions.recount(database)),
+    ]
+
+
+def actions_benchmarks(args):
+    """
+        (name, size, func) of the actions, for each database size
+    """
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                          PROFILES["tuned"])
+            models.Base.metadata.create_all(bind=engine)
+            session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            seed(session_factory, size)
+            with session_factory() as database, \
+                    mock.patch.object(actions, "get_pokemon_name", lambda api_id: "pikachu"), \
+                    mock.patch.object(actions, "get_pokemon_names",
+                                      lambda api_ids: dict.fromkeys(api_ids, "pikachu")):
+                for name, func in action_benchmarks(database, size):
+                    yield f"actions.{name}", size, func
+            engine.dispose()
+
+
+def large_trainer(size):
+    """
+        Transient trainer with size items and size pokemons
+    """
+    trainer = models.Trainer(id=1, name="Sacha", birthdate=date(2000, 1, 1))
+    trainer.inventory = [models.Item(id=index, name=f"Potion {index}", description="Soigne",
+                                     trainer_id=1) for index in range(1, size + 1)]
+    trainer.pokemons = [models.Pokemon(id=index, api_id=index % POKEDEX_SIZE + 1,
+                                       name=f"pokemon-{index}", custom_name=None,
+                                       name_status=models.NAME_RESOLVED, trainer_id=1)
+                        for index in range(1, size + 1)]
+    return trainer
+
+
+def serialization_benchmarks(args):
+    """
+        (name, size, func) of the trainer serializations, for each inventory size
+    """
+    for size in args.inventories:
+        trainer = large_trainer(size)
+        row = TrainerRow(*(getattr(trainer, field) for field in fast_json.TRAINER_FIELDS))
+        inventory = [tuple(getattr(item, field) for field in fast_json.ITEM_FIELDS)
+                     for item in trainer.inventory]
+        pokemons = [tuple(getattr(pokemon, field) for field in fast_json.POKEMON_FIELDS)
+                    for pokemon in trainer.pokemons]
+        yield "schemas.Trainer.from_orm", size, lambda: schemas.Trainer.from_orm(trainer)
+        yield ("schemas.Trainer.json", size,
+               lambda: schemas.Trainer.from_orm(trainer).json())
+        yield ("jsonable_encoder", size,
+               lambda: json.dumps(jsonable_encoder(schemas.Trainer.from_orm(trainer))))
+        yield ("fast_json.encode_trainers", size,
+               lambda: fast_json.encode_trainers([row], inventory, pokemons))
+
+
+BENCHMARKS = {"battle": battle_benchmarks, "actions": actions_benchmarks,
+              "serialization": serialization_benchmarks}
+
+
+def git_commit():
+    """
+        Current commit, None outside of a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous):
+    """
+        Median of the results found in both runs, with their ratio
+    """
+    medians = {(result["group"], result["name"], result["size"]): result["median_ms"]
+               for result in previous}
+    return [(result["group"], result["name"], result["size"],
+             medians[key], result["median_ms"], result["median_ms"] / medians[key])
+            for result in results
+            if (key := (result["group"], result["name"], result["size"])) in medians
+            and medians[key]]
+
+
+def main(argv=None):
+    """
+        Run the benchmarks, print and save the results
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro")
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 100000, 1000000],
+                        help="rows per table of the actions database")
+    parser.add_argument("--inventories", nargs="+", type=int, default=[10, 100, 1000],
+                        help="items and pokemons of the serialized trainer")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per benchmark")
+    parser.add_argument("--output", help="json results file")
+    parser.add_argument("--compare", help="json results of a previous run")
+    args = parser.parse_args(argv)
+
+    commit = git_commit()
+    run = {"commit": commit, "date": datetime.now().isoformat(timespec="seconds"),
+           "python": platform.python_version(), "platform": platform.platform(),
+           "results": []}
+    response_cache.enabled = False
+    print(f"{'benchmark':<40}{'size':>9}{'rounds':>8}{'min ms':>11}{'median ms':>11}"
+          f"{'stdev ms':>11}")
+    for group in args.groups:
+        for name, size, func in BENCHMARKS[group](args):
+            result = {"group": group, "name": name, "size": size,
+                      **measure(func, args.min_time)}
+            run["results"].append(result)
+            print(f"{name:<40}{size or '':>9}{result['rounds']:>8}{result['min_ms']:>11.4f}"
+                  f"{result['median_ms']:>11.4f}{result['stdev_ms']:>11.4f}")
+
+    output = args.output or os.path.join(
+        RESULTS, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(run, output_file, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous_file:
+            previous = json.load(previous_file)
+        print(f"\ncompared with {previous['commit']} ({previous['date']})")
+        print(f"{'benchmark':<40}{'size':>9}{'before ms':>11}{'after ms':>11}{'ratio':>8}")
+        for _group, name, size, before, after, ratio in compare(run["results"],
+                                                                previous["results"]):
+            print(f"{name:<40}{size or '':>9}{before:>11.4f}{after:>11.4f}{ratio:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark du débit concurrent lecture/écriture selon le profil SQLite.
+
+Pour chaque profil de 'app.sqlite.PROFILES', une base temporaire est remplie puis
+plusieurs threads lecteurs (GET /trainers simulé via 'actions.get_trainers') tournent
+en même temps qu'un thread écrivain ('actions.add_trainer_item', un commit par objet)
+pendant une durée fixe. Le nombre de lectures et d'écritures par seconde est affiché.
+
+Utilisation :
+    > python -m benchmarks.sqlite_profile [--readers 8] [--seconds 5] [--trainers 1000]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from sqlalchemy.orm import sessionmaker
+from app import actions, models, schemas
+from app.sqlite import PROFILES, create_sqlite_engine
+
+
+def seed(session_factory, trainers):
+    """
+        Insert trainers with one item each
+    """
+    with session_factory() as database:
+        ids = actions.create_trainers(database, [
+            schemas.TrainerCreate(name=f"Trainer {index}", birthdate=date(2000, 1, 1))
+            for index in range(trainers)])
+        for trainer_id in ids:
+            database.add(models.Item(name="Potion", trainer_id=trainer_id))
+        database.commit()
+
+
+def run_profile(name, readers, seconds, trainers):
+    """
+        Return (reads per second, writes per second) of the profile
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}",
+                                      dict(PROFILES[name], pool_size=readers + 1))
+        models.Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(session_factory, trainers)
+
+        counts = {"reads": 0, "writes": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        def read():
+            done = 0
+            while time.perf_counter() < deadline:
+                with session_factory() as database:
+                    actions.get_trainers(database, skip=trainers // 2, limit=50)
+                done += 1
+            with lock:
+                counts["reads"] += done
+
+        def write():
+            done = 0
+            item = schemas.ItemCreate(name="Pokeball")
+            while time.perf_counter() < deadline:
+                with session_factory() as database:
+                    actions.add_trainer_item(database, item, trainer_id=1 + done % trainers)
+                done += 1
+            with lock:
+                counts["writes"] += done
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+        return counts["reads"] / seconds, counts["writes"] / seconds
+
+
+def main(argv=None):
+    """
+        Run every profile and print the throughputs
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.sqlite_profile")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--trainers", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}")
+    for name in PROFILES:
+        reads, writes = run_profile(name, args.readers, args.seconds, args.trainers)
+        print(f"{name:<10}{reads:>12.0f}{writes:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
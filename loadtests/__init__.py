@@ -0,0 +1,12 @@
+"""
+Tests de charge de l'application (Locust).
+
+Modules :
+    - fake_pokeapi : Remplaçant local et déterministe de PokeAPI.
+    - seed : Remplit une instance de l'application par ses endpoints "bulk".
+    - locustfile : Utilisateurs pondérés selon le trafic de production.
+    - run : Lance l'ensemble en mode headless, écrit les CSV et vérifie les seuils.
+
+Utilisation :
+    > python -m loadtests.run [--users 50] [--run-time 1m]
+"""
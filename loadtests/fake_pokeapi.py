@@ -0,0 +1,46 @@
+"""
+Remplaçant local de PokeAPI pour les tests de charge.
+
+Sert "/api/v2/pokemon/{api_id}" avec un nom et des statistiques déduits de l'identifiant :
+les réponses sont identiques d'une exécution à l'autre, ne dépendent pas du réseau et
+PokeAPI n'est pas sollicité par les tests. Les identifiants au-delà de POKEDEX_SIZE
+retournent 404, comme PokeAPI.
+
+Utilisation :
+    > uvicorn loadtests.fake_pokeapi:app --port 8001
+    > POKEAPI_BASE_URL=http://127.0.0.1:8001/api/v2 uvicorn main:app
+
+Notes :
+    - FAKE_POKEAPI_LATENCY (secondes, 0 par défaut) ajoute un délai à chaque réponse pour
+    simuler la latence de PokeAPI.
+"""
+
+import asyncio
+import os
+from fastapi import FastAPI, HTTPException
+from app.utils.pokeapi import POKEDEX_SIZE
+from app.utils.species import STAT_NAMES, SpeciesRecord
+
+LATENCY = float(os.getenv("FAKE_POKEAPI_LATENCY", "0"))
+
+app = FastAPI()
+
+
+def fake_pokemon(api_id):
+    """
+        Deterministic pokeapi payload of api_id
+    """
+    stats = tuple(20 + (api_id * (7 + 13 * index)) % 180 for index in range(len(STAT_NAMES)))
+    return SpeciesRecord(api_id, f"pokemon-{api_id}", stats).to_pokeapi()
+
+
+@app.get("/api/v2/pokemon/{api_id}")
+async def get_pokemon(api_id: int):
+    """
+        Pokemon payload in the pokeapi format
+    """
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+    if not 1 <= api_id <= POKEDEX_SIZE:
+        raise HTTPException(status_code=404, detail="Not found")
+    return fake_pokemon(api_id)
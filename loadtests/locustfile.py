@@ -0,0 +1,217 @@
+"""
+Scénarios Locust couvrant toutes les routes de l'application.
+
+Trois types d'utilisateurs, pondérés selon le trafic de production :
+    - ReaderUser (poids 7) : listes paginées par curseur (avec et sans collections,
+    chemin "fast"), détails, recherche, statistiques et, rarement, export.
+    - BattleUser (poids 2) : combats, combats en lot, adversaires et pokémons aléatoires.
+    - WriterUser (poids 1) : création de dresseurs, ajout d'objets et de pokémons,
+    unitaires ou en lot.
+
+Les identifiants utilisés sont ceux de l'instance testée, lus une fois au démarrage du
+test par "/export/trainers" et "/export/pokemons" (voir 'loadtests.seed' pour la remplir).
+Les URL paramétrées sont regroupées sous un nom unique dans les statistiques
+(par exemple "/trainers/[id]").
+
+Utilisation :
+    > locust -f loadtests/locustfile.py --host http://127.0.0.1:8000
+    > python -m loadtests.run # headless, avec l'application et PokeAPI locales
+"""
+
+import json
+import random
+import requests
+from locust import HttpUser, between, events, task
+from loadtests.seed import fake_items, fake_pokemons, fake_trainers
+from app.utils.pokeapi import POKEDEX_SIZE
+
+SEARCH_TERMS = ["sa", "ond", "pier", "potion", "baie", "pokemon-2", "surnom", "ball"]
+
+ids = {"trainers": [], "pokemons": []}
+
+
+@events.test_start.add_listener
+def load_ids(environment, **_kwargs):
+    """
+        Read the trainer and pokemon ids of the tested instance
+    """
+    for table in ids:
+        response = requests.get(f"{environment.host}/export/{table}", timeout=60)
+        response.raise_for_status()
+        ids[table] = [json.loads(line)["id"] for line in response.iter_lines() if line]
+
+
+def trainer_id():
+    """
+        Random existing trainer id
+    """
+    return random.choice(ids["trainers"]) if ids["trainers"] else 1
+
+
+def api_id():
+    """
+        Random pokedex id
+    """
+    return random.randint(1, POKEDEX_SIZE)
+
+
+class ReaderUser(HttpUser):
+    """
+        Browsing user
+    """
+    weight = 7
+    wait_time = between(0.5, 2)
+
+    @task(6)
+    def browse_trainers(self):
+        """
+            First pages of the trainer list, following the cursor
+        """
+        url = random.choice(["/trainers?limit=20", "/trainers?limit=50&expand=false",
+                             "/trainers?limit=100&fast=true"])
+        for _ in range(random.randint(1, 3)):
+            response = self.client.get(url, name="/trainers")
+            cursor = response.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+            url = f"/trainers?limit=20&cursor={cursor}"
+
+    @task(8)
+    def get_trainer(self):
+        """
+            Trainer detail
+        """
+        self.client.get(f"/trainers/{trainer_id()}", name="/trainers/[id]")
+
+    @task(3)
+    def get_items(self):
+        """
+            Item list
+        """
+        self.client.get("/items/?limit=50", name="/items/")
+
+    @task(3)
+    def get_pokemons(self):
+        """
+            Pokemon list
+        """
+        self.client.get(random.choice(["/pokemons/?limit=50", "/pokemons/?limit=200&fast=true"]),
+                        name="/pokemons/")
+
+    @task(4)
+    def get_pokemon(self):
+        """
+            Pokemon detail
+        """
+        pokemon_id = random.choice(ids["pokemons"]) if ids["pokemons"] else 1
+        self.client.get(f"/pokemons/{pokemon_id}", name="/pokemons/[id]")
+
+    @task(4)
+    def search(self):
+        """
+            Type-ahead search
+        """
+        self.client.get(f"/search?q={random.choice(SEARCH_TERMS)}", name="/search")
+
+    @task(2)
+    def stats(self):
+        """
+            Leaderboards and counters
+        """
+        self.client.get(random.choice(["/stats/trainers/top", "/stats/trainers/top?by=items",
+                                       "/stats/species/popularity"]), name="/stats/[ranking]")
+        self.client.get(f"/stats/trainers/{trainer_id()}", name="/stats/trainers/[id]")
+
+    @task(1)
+    def export(self):
+        """
+            Rare full export
+        """
+        self.client.get(random.choice(["/export/items?format=csv", "/export/pokemons"]),
+                        name="/export/[table]")
+
+
+class BattleUser(HttpUser):
+    """
+        Player comparing pokemons
+    """
+    weight = 2
+    wait_time = between(0.5, 2)
+
+    @task(6)
+    def battle(self):
+        """
+            One battle
+        """
+        self.client.get(f"/pokemons/battle/{api_id()}/{api_id()}", name="/pokemons/battle/[a]/[b]")
+
+    @task(2)
+    def battles(self):
+        """
+            Batch of battles and a small tournament
+        """
+        self.client.post("/pokemons/battles",
+                         json={"pairs": [[api_id(), api_id()] for _ in range(20)],
+                               "tournament": [api_id() for _ in range(6)]})
+
+    @task(2)
+    def counters(self):
+        """
+            Counters of a pokemon, 404 when the battle table is not built
+        """
+        with self.client.get(f"/pokemons/counters/{api_id()}/best",
+                             name="/pokemons/counters/[id]/best",
+                             catch_response=True) as response:
+            if response.status_code == 404:
+                response.success()
+
+    @task(1)
+    def random_pokemons(self):
+        """
+            Random pokemons
+        """
+        self.client.get(f"/pokemons/random/?count={random.randint(1, 6)}", name="/pokemons/random/")
+
+
+class WriterUser(HttpUser):
+    """
+        Player updating a team
+    """
+    weight = 1
+    wait_time = between(1, 3)
+
+    @task(2)
+    def create_trainer(self):
+        """
+            New trainer
+        """
+        response = self.client.post("/trainers/", json=fake_trainers(random, 1)[0])
+        if response.ok:
+            ids["trainers"].append(response.json()["id"])
+
+    @task(4)
+    def add_item(self):
+        """
+            New item
+        """
+        self.client.post(f"/trainers/{trainer_id()}/item/", json=fake_items(random, 1)[0],
+                         name="/trainers/[id]/item/")
+
+    @task(4)
+    def add_pokemon(self):
+        """
+            New pokemon, half of them with the name resolved in background
+        """
+        defer_name = random.choice(["true", "false"])
+        self.client.post(f"/trainers/{trainer_id()}/pokemon/?defer_name={defer_name}",
+                         json=fake_pokemons(random, 1)[0], name="/trainers/[id]/pokemon/")
+
+    @task(1)
+    def bulk(self):
+        """
+            Bulk imports
+        """
+        self.client.post(f"/trainers/{trainer_id()}/pokemons/bulk",
+                         json=fake_pokemons(random, 10), name="/trainers/[id]/pokemons/bulk")
+        self.client.post(f"/trainers/{trainer_id()}/items/bulk",
+                         json=fake_items(random, 10), name="/trainers/[id]/items/bulk")
@@ -0,0 +1,204 @@
+"""
+Exécution headless des tests de charge avec vérification de seuils.
+
+Sans --host, le script démarre dans des processus séparés le remplaçant de PokeAPI
+('loadtests.fake_pokeapi') et l'application sur une base temporaire, la remplit
+('loadtests.seed'), puis lance Locust en mode headless. Avec --host, l'instance
+donnée est testée telle quelle (--seed pour la remplir d'abord).
+
+Locust écrit ses CSV ("{prefix}_stats.csv", "{prefix}_stats_history.csv",
+"{prefix}_failures.csv", ...) ; le script y ajoute "{prefix}_summary.csv" : p50, p95,
+p99 (ms), requêtes par seconde, taux d'échec et verdict de chaque route. Le code de
+sortie est 1 si un seuil est dépassé, ce qui permet de bloquer un déploiement.
+
+Utilisation :
+    > python -m loadtests.run [--users 50] [--spawn-rate 10] [--run-time 1m]
+    [--csv loadtests/results/run] [--thresholds loadtests/thresholds.json]
+    > python -m loadtests.run --host http://staging:8000 [--seed]
+
+Fonctions :
+    - read_stats(path: str) -> List[dict] : Lit le CSV de statistiques de Locust.
+    - check_thresholds(stats: List[dict], thresholds: dict) -> List[str] :
+        Retourne les seuils dépassés, et ceux qui n'ont pas de données.
+
+Notes :
+    - Les seuils sont lus dans un fichier JSON {route: {métrique: limite}} où la route
+    est un nom des statistiques Locust ("Aggregated" pour l'ensemble) et la métrique
+    p50, p95 ou p99 (maximum en ms), fail_ratio (maximum) ou min_rps (minimum).
+    - Une route sans requête a ses percentiles ("N/A" pour Locust) et son fail_ratio
+    à None (cellule vide dans le résumé) : un seuil sans données échoue, de même qu'un
+    seuil sur une route absente des statistiques.
+    - La base temporaire utilise le profil SQLite "tuned" (WAL), sauf si
+    SQLITE_PROFILE est défini.
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+from loadtests.seed import seed
+
+LOCUSTFILE = os.path.join(os.path.dirname(__file__), "locustfile.py")
+THRESHOLDS = os.path.join(os.path.dirname(__file__), "thresholds.json")
+APP_PORT = 8000
+POKEAPI_PORT = 8001
+
+SUMMARY_FIELDS = ["name", "requests", "failures", "fail_ratio", "rps", "p50", "p95", "p99",
+                  "status"]
+
+
+def percentile(value):
+    """
+        Locust percentile in ms, None if there is no data ("N/A")
+    """
+    return None if value == "N/A" else float(value)
+
+
+def read_stats(path):
+    """
+        Rows of the locust stats csv as summary dicts
+        Metrics without data (no request) are None
+    """
+    stats = []
+    with open(path, encoding="utf-8", newline="") as stats_file:
+        for row in csv.DictReader(stats_file):
+            requests_count = int(row["Request Count"])
+            failures = int(row["Failure Count"])
+            stats.append({
+                "name": row["Name"],
+                "requests": requests_count,
+                "failures": failures,
+                "fail_ratio": failures / requests_count if requests_count else None,
+                "rps": float(row["Requests/s"]),
+                "p50": percentile(row["50%"]),
+                "p95": percentile(row["95%"]),
+                "p99": percentile(row["99%"]),
+            })
+    return stats
+
+
+def check_thresholds(stats, thresholds):
+    """
+        Exceeded thresholds, as messages
+        A threshold without data (route missing or metric None) fails too
+        Each stats row gets a "status" of "pass" or "fail"
+    """
+    violations = []
+    names = {row["name"] for row in stats}
+    violations += [f"{name}: no data (route not in the locust stats)"
+                   for name in thresholds if name not in names]
+    for row in stats:
+        row["status"] = "pass"
+        for metric, limit in thresholds.get(row["name"], {}).items():
+            value = row["rps"] if metric == "min_rps" else row[metric]
+            if value is None:
+                row["status"] = "fail"
+                violations.append(f"{row['name']}: {metric} = no data (limit {limit:g})")
+            elif value < limit if metric == "min_rps" else value > limit:
+                row["status"] = "fail"
+                violations.append(f"{row['name']}: {metric} = {value:g} (limit {limit:g})")
+    return violations
+
+
+def write_summary(path, stats):
+    """
+        Write the summary csv
+    """
+    with open(path, "w", encoding="utf-8", newline="") as summary_file:
+        writer = csv.DictWriter(summary_file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(stats)
+
+
+def start_server(module, port, env):
+    """
+        Start an uvicorn server and wait until it answers
+    """
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{module} did not start on port {port}")
+
+
+def run_locust(args, host):
+    """
+        Run locust headless, writing its csv files under args.csv
+    """
+    directory = os.path.dirname(args.csv)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    subprocess.run([sys.executable, "-m", "locust", "-f", LOCUSTFILE, "--headless",
+                    "--host", host, "--users", str(args.users),
+                    "--spawn-rate", str(args.spawn_rate), "--run-time", args.run_time,
+                    "--csv", args.csv, "--only-summary"], check=False)
+
+
+def main(argv=None):
+    """
+        Run the load test and check the thresholds
+    """
+    parser = argparse.ArgumentParser(prog="python -m loadtests.run")
+    parser.add_argument("--host", help="tested instance, local servers are started if omitted")
+    parser.add_argument("--seed", action="store_true", help="seed the --host instance first")
+    parser.add_argument("--trainers", type=int, default=500, help="trainers to seed")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--spawn-rate", type=float, default=10)
+    parser.add_argument("--run-time", default="1m")
+    parser.add_argument("--csv", default="loadtests/results/run", help="csv files prefix")
+    parser.add_argument("--thresholds", default=THRESHOLDS)
+    args = parser.parse_args(argv)
+
+    processes = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            host = args.host
+            if host is None:
+                host = f"http://127.0.0.1:{APP_PORT}"
+                env = dict(os.environ,
+                           SQLITE_URL=f"sqlite:///{os.path.join(directory, 'loadtest.db')}",
+                           SQLITE_PROFILE=os.getenv("SQLITE_PROFILE", "tuned"),
+                           POKEAPI_BASE_URL=f"http://127.0.0.1:{POKEAPI_PORT}/api/v2",
+                           POKEAPI_CACHE_PATH="")
+                processes.append(start_server("loadtests.fake_pokeapi:app", POKEAPI_PORT, env))
+                processes.append(start_server("main:app", APP_PORT, env))
+            if args.host is None or args.seed:
+                seed(host, args.trainers, pokemons=6, items=3)
+            run_locust(args, host)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    with open(args.thresholds, encoding="utf-8") as thresholds_file:
+        thresholds = json.load(thresholds_file)
+    stats = read_stats(f"{args.csv}_stats.csv")
+    violations = check_thresholds(stats, thresholds)
+    write_summary(f"{args.csv}_summary.csv", stats)
+
+    print(f"{'name':<40}{'reqs':>8}{'fail %':>8}{'rps':>8}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for row in stats:
+        fail_ratio = "N/A" if row["fail_ratio"] is None else f"{100 * row['fail_ratio']:.2f}"
+        p50, p95, p99 = ("N/A" if row[metric] is None else f"{row[metric]:.0f}"
+                         for metric in ("p50", "p95", "p99"))
+        print(f"{row['name']:<40}{row['requests']:>8}{fail_ratio:>8}"
+              f"{row['rps']:>8.1f}{p50:>8}{p95:>8}{p99:>8}  {row['status']}")
+    for violation in violations:
+        print(f"FAIL {violation}")
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
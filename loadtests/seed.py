@@ -0,0 +1,102 @@
+"""
+Remplissage d'une instance de l'application avant un test de charge.
+
+Les données sont créées par les endpoints "bulk" (POST /trainers/bulk,
+/trainers/{trainer_id}/pokemons/bulk et /trainers/{trainer_id}/items/bulk), donc
+contre n'importe quelle instance, et tirées d'un générateur aléatoire initialisé
+avec --seed : deux remplissages avec les mêmes options donnent les mêmes données.
+
+Utilisation :
+    > python -m loadtests.seed --host http://127.0.0.1:8000 [--trainers 500]
+    [--pokemons 6] [--items 3] [--seed 0]
+
+Fonctions :
+    - fake_trainers(rng: Random, count: int) -> List[dict]
+    - fake_pokemons(rng: Random, count: int) -> List[dict]
+    - fake_items(rng: Random, count: int) -> List[dict]
+    - seed(host: str, trainers: int, pokemons: int, items: int, seed_value: int) -> List[int] :
+        Crée les dresseurs et leurs collections, retourne les identifiants des dresseurs.
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+import requests
+from app.utils.pokeapi import POKEDEX_SIZE
+
+FIRST_NAMES = ["Sacha", "Ondine", "Pierre", "Flora", "Régis", "Aurore", "Iris", "Lino",
+               "Serena", "Tili", "Barbara", "Cynthia", "Olga", "Morgane", "Kiyo", "Jessie"]
+ITEMS = [("Potion", "Restaure 20 PV"), ("Super Potion", "Restaure 50 PV"),
+         ("Poké Ball", "Capture un Pokémon sauvage"), ("Super Ball", None),
+         ("Rappel", "Ranime un Pokémon K.O."), ("Baie Oran", "Restaure 10 PV"),
+         ("Antidote", "Soigne l'empoisonnement"), ("Corde Sortie", None)]
+
+TIMEOUT = 60
+
+
+def fake_trainers(rng, count):
+    """
+        Trainer payloads
+    """
+    return [{"name": f"{rng.choice(FIRST_NAMES)} {index}",
+             "birthdate": (date(1970, 1, 1) + timedelta(days=rng.randint(0, 15000))).isoformat()}
+            for index in range(count)]
+
+
+def fake_pokemons(rng, count):
+    """
+        Pokemon payloads, one in three with a nickname
+    """
+    return [{"api_id": rng.randint(1, POKEDEX_SIZE),
+             "custom_name": f"Surnom {rng.randint(1, 10000)}" if rng.random() < 1 / 3 else None}
+            for _ in range(count)]
+
+
+def fake_items(rng, count):
+    """
+        Item payloads
+    """
+    return [dict(zip(("name", "description"), rng.choice(ITEMS))) for _ in range(count)]
+
+
+def seed(host, trainers, pokemons, items, seed_value=0):
+    """
+        Create trainers with their pokemons and items
+        Return the trainer ids
+    """
+    rng = random.Random(seed_value)
+    with requests.Session() as session:
+        response = session.post(f"{host}/trainers/bulk", json=fake_trainers(rng, trainers),
+                                timeout=TIMEOUT)
+        response.raise_for_status()
+        trainer_ids = response.json()["ids"]
+        for trainer_id in trainer_ids:
+            if pokemons:
+                session.post(f"{host}/trainers/{trainer_id}/pokemons/bulk",
+                             json=fake_pokemons(rng, rng.randint(1, pokemons)),
+                             timeout=TIMEOUT).raise_for_status()
+            if items:
+                session.post(f"{host}/trainers/{trainer_id}/items/bulk",
+                             json=fake_items(rng, rng.randint(0, items)),
+                             timeout=TIMEOUT).raise_for_status()
+    return trainer_ids
+
+
+def main(argv=None):
+    """
+        Parse the command line and seed the instance
+    """
+    parser = argparse.ArgumentParser(prog="python -m loadtests.seed")
+    parser.add_argument("--host", default="http://127.0.0.1:8000")
+    parser.add_argument("--trainers", type=int, default=500)
+    parser.add_argument("--pokemons", type=int, default=6, help="max pokemons per trainer")
+    parser.add_argument("--items", type=int, default=3, help="max items per trainer")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    trainer_ids = seed(args.host, args.trainers, args.pokemons, args.items, args.seed)
+    print(f"{len(trainer_ids)} trainers seeded on {args.host}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,20 +8,107 @@ Modules inclus :
     - trainers : Gère les routes liées aux dresseurs de Pokémon.
     - pokemons : Gère les routes liées aux Pokémon.
     - items : Gère les routes liées aux objets dans l'inventaire des dresseurs.
+    - export : Gère l'export en flux des tables (NDJSON ou CSV).
+    - stats : Gère les statistiques calculées par la base de données.
+    - search : Gère la recherche plein texte.
+    - metrics : Expose les métriques au format Prometheus.
+    - debug : Rapport du journal des requêtes SQL lentes (SLOW_QUERY_MS).
+
+Les réponses des endpoints de lecture sont mises en cache par
+'app.utils.response_cache.ResponseCacheMiddleware'. Chaque requête est mesurée
+(durée, requêtes SQL, appels à PokeAPI) par 'app.utils.metrics.MetricsMiddleware' :
+en-tête "Server-Timing" et GET /metrics.
+
+Le schéma de la base est créé et migré au démarrage de l'application (événement
+"startup"), pas à l'import des modules.
+
+Avec DB_MODE=async, toutes les routes qui utilisent la base de données (dresseurs,
+objets, pokémons, export, statistiques et recherche) sont celles de 'app.routers.aio'
+(routes "async def" et sessions asynchrones).
 
 """
 
 
 from fastapi import FastAPI
-from app.routers import trainers, pokemons, items
+from app import models
+from app.migrations import migrate
+from app.routers import trainers, pokemons, items, debug, export, metrics, search, stats
+from app.routers.aio import trainers as aio_trainers, pokemons as aio_pokemons, \
+    items as aio_items, export as aio_export, stats as aio_stats, search as aio_search
+from app.sqlite import DB_MODE, engine
+from app.sqlite_async import get_async_engine
+from app.utils.battle import battle_table
+from app.utils.metrics import MetricsMiddleware, instrument_engine
+from app.utils.name_resolver import name_resolver
+from app.utils.query_log import query_log
+from app.utils.pokeapi import warm_up_cache
+from app.utils.pokeapi_async import close_client
+from app.utils.response_cache import ResponseCacheMiddleware
 
 
 app = FastAPI()
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(MetricsMiddleware, routes=app.routes)
+instrument_engine(engine)
+query_log.listen(engine)
+if DB_MODE == "async":
+    instrument_engine(get_async_engine().sync_engine)
+    query_log.listen(get_async_engine().sync_engine)
+
+
+@app.on_event("startup")
+def load_pokeapi_cache():
+    """
+        Create and migrate the database schema, load the persisted pokeapi cache in memory,
+        map the battle table and queue the pokemons whose name is still pending
+    """
+    models.Base.metadata.create_all(bind=engine)
+    migrate(engine)
+    warm_up_cache()
+    battle_table.load()
+    name_resolver.resume()
+
+
+@app.on_event("shutdown")
+async def close_pokeapi_client():
+    """
+        Close the pooled pokeapi connections
+    """
+    await close_client()
+
+
+def include_routers(application, db_mode=DB_MODE):
+    """
+        Include the sync or async database routers, and the pokeapi routes
+    """
+    if db_mode == "async":
+        trainers_router, items_router, pokemons_router = \
+            aio_trainers.router, aio_items.router, aio_pokemons.router
+        export_router, stats_router, search_router = \
+            aio_export.router, aio_stats.router, aio_search.router
+    else:
+        trainers_router, items_router, pokemons_router = \
+            trainers.router, items.router, pokemons.router
+        export_router, stats_router, search_router = \
+            export.router, stats.router, search.router
+    application.include_router(trainers_router,
+                               prefix="/trainers")
+    application.include_router(items_router,
+                               prefix="/items")
+    application.include_router(pokemons_router,
+                               prefix="/pokemons")
+    application.include_router(pokemons.pokeapi_router,
+                               prefix="/pokemons")
+    application.include_router(export_router,
+                               prefix="/export")
+    application.include_router(stats_router,
+                               prefix="/stats")
+    application.include_router(search_router,
+                               prefix="/search")
+    application.include_router(metrics.router,
+                               prefix="/metrics")
+    application.include_router(debug.router,
+                               prefix="/debug")
 
 
-app.include_router(trainers.router,
-                   prefix="/trainers")
-app.include_router(items.router,
-                   prefix="/items")
-app.include_router(pokemons.router,
-                   prefix="/pokemons")
+include_routers(app)
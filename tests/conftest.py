@@ -0,0 +1,21 @@
+"""
+ Configuration des tests : l'application utilise une base temporaire, jamais ./sqlite.db
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+TEST_DIRECTORY = tempfile.mkdtemp(prefix="pokemon-tests-")
+atexit.register(shutil.rmtree, TEST_DIRECTORY, ignore_errors=True)
+os.environ["SQLITE_URL"] = f"sqlite:///{os.path.join(TEST_DIRECTORY, 'sqlite.db')}"
+os.environ["POKEAPI_CACHE_PATH"] = os.path.join(TEST_DIRECTORY, "pokeapi_cache.db")
+
+# pylint: disable=wrong-import-position
+from app import models  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.sqlite import engine  # noqa: E402
+
+models.Base.metadata.create_all(bind=engine)
+migrate(engine)
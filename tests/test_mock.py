@@ -2,7 +2,18 @@
  Test unitaire mock
 """
 
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 from fastapi.testclient import TestClient
+from app.utils import pokeapi_async
+from app.utils.pokeapi_async import PokeApiClient
+from app.utils.cache import PokemonCache
+from app.utils.pokeapi import battle_compare_stats, get_pokemon_data
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
+from app.utils.species import SpeciesRecord
 from main import app
 
 client = TestClient(app)
@@ -87,3 +98,204 @@ def test_get_pokemon(mocker):
     response = client.get("/pokemons")
     assert response.status_code == 200
     assert len(response.json()) == 2
+
+
+def test_get_pokemon_data_is_cached(mocker):
+    mocker.patch("app.utils.pokeapi.pokemon_cache", PokemonCache())
+    fetch = mocker.patch("app.utils.pokeapi.fetch_pokemon_data",
+                         return_value={"id": 25, "name": "pikachu", "sprites": {},
+                                       "stats": [{"base_stat": 35, "stat": {"name": "hp"}}] * 6})
+    assert get_pokemon_data(25) == SpeciesRecord(25, "pikachu", (35,) * 6)
+    assert get_pokemon_data(25) == SpeciesRecord(25, "pikachu", (35,) * 6)
+    fetch.assert_called_once_with(25)
+
+
+def fake_pokeapi_transport(calls):
+    def handler(request):
+        calls.append(request.url.path)
+        api_id = int(request.url.path.rsplit("/", 1)[1])
+        if api_id == 999:
+            return httpx.Response(404)
+        if api_id == 4 and calls.count(request.url.path) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"name": f"pokemon{api_id}",
+                                         "stats": [{"base_stat": api_id}] * 6})
+    return httpx.MockTransport(handler)
+
+
+def test_async_battle_pokemon(mocker):
+    calls = []
+    mocker.patch("app.utils.pokeapi.pokemon_cache", PokemonCache())
+    mocker.patch("app.utils.pokeapi_async.client",
+                 PokeApiClient(transport=fake_pokeapi_transport(calls), backoff=0))
+
+    response = client.get("/pokemons/battle/4/7")
+    assert response.status_code == 200
+    assert response.json() == {"Result": 7}
+    # 4 est réessayé après une 503
+    assert sorted(calls) == ["/api/v2/pokemon/4", "/api/v2/pokemon/4", "/api/v2/pokemon/7"]
+
+    assert asyncio.run(pokeapi_async.get_pokemon_data(999)) is None
+
+
+def test_async_pokemon_payload_caches_record(mocker):
+    calls = []
+    cache = mocker.patch("app.utils.pokeapi.pokemon_cache", PokemonCache())
+    mocker.patch("app.utils.pokeapi_async.client",
+                 PokeApiClient(transport=fake_pokeapi_transport(calls), backoff=0))
+
+    payload = asyncio.run(pokeapi_async.get_pokemon_payload(7))
+    assert payload == {"name": "pokemon7", "stats": [{"base_stat": 7}] * 6}
+    assert cache.get(7) == SpeciesRecord(None, "pokemon7", (7,) * 6)
+    assert asyncio.run(pokeapi_async.get_pokemon_payload(999)) is None
+
+
+def test_async_client_closed_when_loop_changes():
+    calls = []
+    pokeapi_client = PokeApiClient(transport=fake_pokeapi_transport(calls), backoff=0)
+
+    async def get_and_return_http():
+        await pokeapi_client.get_json("/pokemon/7")
+        return pokeapi_client._client  # pylint: disable=protected-access
+
+    first_http = asyncio.run(get_and_return_http())
+    second_http = asyncio.run(get_and_return_http())
+    assert first_http is not second_http
+    assert first_http.is_closed and not second_http.is_closed
+    asyncio.run(pokeapi_client.aclose())
+    assert second_http.is_closed
+
+
+def test_pokemons_random(mocker):
+    async def fake_get_pokemons_data(api_ids, return_exceptions=False):
+        assert return_exceptions
+        return [SpeciesRecord(api_id, f"pokemon{api_id}", (api_id,) * 6) if api_id % 2
+                else httpx.ConnectError("down") for api_id in api_ids]
+
+    async def fake_get_pokemons_payloads(api_ids, return_exceptions=False):
+        return [dict(SpeciesRecord(api_id, f"pokemon{api_id}", (api_id,) * 6).to_pokeapi(),
+                     sprites={"front_default": f"{api_id}.png"})
+                if isinstance(record, SpeciesRecord) else record
+                for api_id, record in zip(api_ids, await fake_get_pokemons_data(
+                    api_ids, return_exceptions))]
+    mocker.patch("app.routers.pokemons.get_pokemons_data", fake_get_pokemons_data)
+    mocker.patch("app.routers.pokemons.get_pokemons_payloads", fake_get_pokemons_payloads)
+    mocker.patch("app.routers.pokemons.RANDOM_ATTEMPTS", 100)
+
+    # Par défaut, les réponses complètes de PokeAPI
+    response = client.get("/pokemons/random/?count=5")
+    assert response.status_code == 200
+    api_ids = [pokemon["id"] for pokemon in response.json()]
+    assert len(set(api_ids)) == 5
+    assert all(api_id % 2 for api_id in api_ids)
+    assert response.json()[0]["stats"][5] == {"base_stat": api_ids[0],
+                                              "stat": {"name": "speed"}}
+    assert response.json()[0]["sprites"] == {"front_default": f"{api_ids[0]}.png"}
+
+    slim = client.get("/pokemons/random/?count=1&slim=true").json()[0]
+    assert slim == {"id": slim["id"], "name": f"pokemon{slim['id']}", "stats": [slim["id"]] * 6}
+
+    mocker.patch("app.routers.pokemons.RANDOM_ATTEMPTS", 0)
+    assert client.get("/pokemons/random/").status_code == 503
+
+
+def test_pokemons_battles(mocker):
+    stats = {1: [45, 49, 49, 65, 65, 45], 4: [39, 52, 43, 60, 50, 65],
+             7: [44, 48, 65, 50, 64, 43]}
+
+    async def fake_get_pokemons_data(api_ids, return_exceptions=False):
+        assert return_exceptions
+        return [SpeciesRecord(api_id, f"pokemon{api_id}", tuple(stats[api_id]))
+                if api_id in stats else httpx.ConnectError("down") if api_id == 25 else None
+                for api_id in api_ids]
+    mocker.patch("app.routers.pokemons.get_pokemons_data", fake_get_pokemons_data)
+
+    response = client.post("/pokemons/battles",
+                           json={"pairs": [[1, 4], [4, 4], [1, 150], [25, 1]],
+                                 "tournament": [1, 4, 7]})
+    assert response.status_code == 200
+    assert response.json() == [{"Result": 1}, {"Result": "Draw"}, None,
+                               {"Error": "Pokeapi unavailable for [25]"},
+                               {"Result": 1}, {"Result": 1}, {"Result": 7}]
+    for (first, second), result in zip([(1, 4), (1, 7), (4, 7)], response.json()[4:]):
+        score = battle_compare_stats(stats[first], stats[second])
+        assert result == {"Result": first if score > 0 else second}
+
+    assert client.post("/pokemons/battles", json={"pairs": [[1, 999]]}).status_code == 422
+    assert client.post("/pokemons/battles", json={"tournament": [0, 1]}).status_code == 422
+    too_many = [[api_id, api_id + 1] for api_id in range(1, 202, 2)]
+    assert client.post("/pokemons/battles", json={"pairs": too_many}).status_code == 422
+
+
+def test_bulk_endpoints(mocker):
+    create_trainers = mocker.patch("app.actions.create_trainers", return_value=[4, 5])
+    response = client.post("/trainers/bulk",
+                           data='{"name": "Tom", "birthdate": "1990-11-04"}\n'
+                                   '{"name": "Loan", "birthdate": "1991-01-01"}\n',
+                           headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json() == {"ids": [4, 5]}
+    assert [trainer.name for trainer in create_trainers.call_args.kwargs["trainers"]] == [
+        "Tom", "Loan"]
+
+    mocker.patch("app.actions.add_trainer_items", return_value=[1])
+    response = client.post("/trainers/1/items/bulk", json=[{"name": "Potion"}])
+    assert response.json() == {"ids": [1]}
+    assert client.post("/trainers/1/items/bulk", json=[{"description": "x"}]).status_code == 422
+
+    mocker.patch("app.actions.add_trainer_pokemons", side_effect=ValueError("Unknown"))
+    assert client.post("/trainers/1/pokemons/bulk", json=[{"api_id": 0}]).status_code == 404
+
+    def ndjson_chunks():
+        # Une ligne coupée entre deux morceaux, sans saut de ligne final
+        yield b'{"name": "Potion"}\n{"name": "Po'
+        yield b'keball"}\n\n{"name": "Baie"}'
+    add_items = mocker.patch("app.actions.add_trainer_items", return_value=[1, 2, 3])
+    assert client.post("/trainers/1/items/bulk", data=ndjson_chunks(),
+                       headers={"Content-Type": "application/x-ndjson"}).status_code == 200
+    assert [item.name for item in add_items.call_args.kwargs["items"]] == [
+        "Potion", "Pokeball", "Baie"]
+    mocker.patch("app.utils.utils.BULK_LIMIT", 2)
+    assert client.post("/trainers/1/items/bulk", data=ndjson_chunks(),
+                       headers={"Content-Type": "application/x-ndjson"}).status_code == 413
+
+
+def test_concurrent_lookups_share_one_fetch(mocker):
+    mocker.patch("app.utils.pokeapi.pokemon_cache", PokemonCache())
+    flight = mocker.patch("app.utils.pokeapi.pokemon_flight", SingleFlight())
+    release = threading.Event()
+
+    def slow_fetch(api_id):
+        release.wait(5)
+        return {"name": f"pokemon{api_id}", "stats": [api_id] * 6}
+    fetch = mocker.patch("app.utils.pokeapi.fetch_pokemon_data", side_effect=slow_fetch)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = [executor.submit(get_pokemon_data, 25) for _ in range(5)]
+        deadline = time.monotonic() + 5
+        while flight.coalesced < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        assert flight.coalesced == 4, "lookups were not coalesced before the deadline"
+    assert [result.result().name for result in results] == ["pokemon25"] * 5
+    fetch.assert_called_once_with(25)
+    assert flight.stats() == {"calls": 1, "coalesced": 4}
+    # Le Pokémon est ensuite servi par le cache
+    assert get_pokemon_data(25).name == "pokemon25" and flight.calls == 1
+
+
+def test_async_concurrent_lookups_share_one_fetch(mocker):
+    calls = []
+    mocker.patch("app.utils.pokeapi.pokemon_cache", PokemonCache())
+    mocker.patch("app.utils.pokeapi_async.client",
+                 PokeApiClient(transport=fake_pokeapi_transport(calls), backoff=0))
+    flight = mocker.patch("app.utils.pokeapi_async.pokemon_flight", AsyncSingleFlight())
+
+    async def lookups():
+        return await asyncio.gather(*(pokeapi_async.get_pokemon_data(api_id)
+                                      for api_id in (25, 6, 25, 25, 6)))
+    assert [data.name for data in asyncio.run(lookups())] == \
+        ["pokemon25", "pokemon6", "pokemon25", "pokemon25", "pokemon6"]
+    assert sorted(calls) == ["/api/v2/pokemon/25", "/api/v2/pokemon/6"]
+    assert flight.stats() == {"calls": 2, "coalesced": 3}
+    assert "pokeapi_singleflight_coalesced_total" in client.get("/metrics").text
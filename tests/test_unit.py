@@ -2,21 +2,44 @@
  Test unitaire
 """
 
+import asyncio
+import json
 from datetime import date
 from typing import Dict, Union
 
+from fastapi import FastAPI, HTTPException
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect as sqlalchemy_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, sessionmaker
 import pytest
 
-from app import models
+from app import actions, actions_async, models, schemas
 from app.actions import (get_trainer, get_trainer_by_name, get_trainers,
                          create_trainer, add_trainer_pokemon,
-                         add_trainer_item, get_items, get_pokemon, get_pokemons)
+                         add_trainer_item, get_items, get_pokemon, get_pokemons,
+                         get_all_species, replace_species, create_trainers,
+                         add_trainer_items, add_trainer_pokemons, recount)
+from app.manage import read_snapshot, write_snapshot
+from app.migrations import migrate
+from app.routers import export
 from app.models import Trainer
-from app.schemas import PokemonCreate, ItemCreate
-from main import app
+from app.sqlite import create_sqlite_engine, engine_profile
+from app.sqlite_async import create_async_sqlite_engine
+from app.schemas import PokemonCreate, ItemCreate, TrainerCreate
+from app.utils.battle import BattleTable, build_battle_table, stat_matrix
+from app.utils.cache import PokemonCache
+from app.utils.metrics import instrument_engine, metrics
+from app.utils.name_resolver import NameResolver
+from app.utils.response_cache import (CachedResponse, MemoryBackend, ResponseCache,
+                                      ResponseCacheMiddleware, response_cache)
+from app.utils.species import SpeciesRecord
+from app.utils.utils import decode_cursor, encode_cursor, get_async_db, get_db
+from app.utils.pokeapi import battle_pokemon, get_pokemon_name, get_pokemon_stats
+from app.utils.query_log import QueryLog
+from benchmarks.micro import compare, measure
+from loadtests.run import check_thresholds, read_stats
+from main import app, include_routers
 
 client = TestClient(app)
 
@@ -33,6 +56,25 @@ def init_test_database():
     return database
 
 
+@pytest.fixture
+def session_factory(tmp_path):
+    """
+        Session factory of a temporary database file, also used by the routes of app (get_db)
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}",
+                           connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        with factory() as database:
+            yield database
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+
+
 def test_get_trainer():
     database = init_test_database()
 
@@ -69,6 +111,8 @@ def test_get_trainer_by_name():
     assert len(result) == 1
     assert result[0].id == 2
     assert result[0].name == "Test Trainer 2"
+    # Collections chargées comme dans 'actions_async.get_trainer_by_name'
+    assert not {"inventory", "pokemons"} & sqlalchemy_inspect(result[0]).unloaded
 
     # Nettoyer la base de données après les tests
     database.close()
@@ -348,6 +392,11 @@ def test_get_pokemon_count():
     count = created_trainer.get_pokemon_count()
     assert count == len(pokemons_to_add)
 
+    # Un pokémon ajouté à la collection chargée est compté, sans écrire la session
+    created_trainer.pokemons.append(models.Pokemon(api_id=4, name="Pokemon 4"))
+    assert created_trainer.get_pokemon_count() == len(created_trainer.pokemons) == 4
+    assert created_trainer.pokemons[-1] in database.new
+
     # Nettoyer la base de données après les tests
     database.close()
 
@@ -502,3 +551,677 @@ def test_item_to_dict():
 
     # Nettoyer la base de données après les tests
     database.close()
+
+
+def test_pokemon_cache_memory_and_disk(tmp_path):
+    cache = PokemonCache(path=str(tmp_path / "cache.db"), max_memory_entries=1)
+
+    assert cache.get(1) is None
+    cache.set(1, {"name": "bulbasaur"})
+    cache.set(2, {"name": "ivysaur"})
+
+    # La 1ère entrée a été évincée de la mémoire mais reste sur le disque
+    assert cache.get(1) == {"name": "bulbasaur"}
+    assert cache.get(1) == {"name": "bulbasaur"}
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
+
+    # Les entrées survivent à un redémarrage
+    restarted = PokemonCache(path=str(tmp_path / "cache.db"))
+    assert restarted.warm_up() == 0
+    assert restarted.get(2) == {"name": "ivysaur"}
+    assert restarted.stats()["memory_hits"] == 1
+
+
+def test_pokemon_cache_ttl_and_eviction(tmp_path):
+    cache = PokemonCache(path=str(tmp_path / "cache.db"), max_disk_entries=2, ttl=-1)
+    cache.set(1, {"name": "bulbasaur"})
+    assert cache.get(1) is None
+
+    cache.ttl = 60
+    for api_id in range(1, 4):
+        cache.set(api_id, {"id": api_id})
+    assert cache.stats()["disk_entries"] == 2
+    assert cache.warm_up([4], loader=lambda api_id: {"id": api_id}) == 1
+    assert cache.get(4) == {"id": 4}
+
+
+def test_local_pokedex(mocker, tmp_path):
+    database = init_test_database()
+    snapshot = str(tmp_path / "pokedex.json")
+    write_snapshot(snapshot, [
+        {"id": 1, "name": "bulbasaur", "stats": [45, 49, 49, 65, 65, 45]},
+        {"id": 4, "name": "charmander", "stats": [39, 52, 43, 60, 50, 65]},
+    ])
+
+    assert replace_species(database, read_snapshot(snapshot)) == 2
+    assert [species.name for species in get_all_species(database)] == ["bulbasaur", "charmander"]
+
+    mocker.patch("app.utils.pokeapi.SessionLocal", sessionmaker(bind=database.get_bind()))
+    mocker.patch("app.utils.pokeapi.USE_LOCAL_POKEDEX", True)
+    fetch = mocker.patch("app.utils.pokeapi.fetch_pokemon_data")
+
+    assert get_pokemon_name(4) == "charmander"
+    assert get_pokemon_stats(1) == (45, 49, 49, 65, 65, 45)
+    assert battle_pokemon(1, 4) == {"Result": 1}
+    fetch.assert_not_called()
+
+    database.close()
+
+
+def test_battle_table(tmp_path):
+    species = [
+        models.Species.mapping({"id": 1, "name": "bulbasaur", "stats": [45, 49, 49, 65, 65, 45]}),
+        models.Species.mapping({"id": 3, "name": "venusaur", "stats": [80, 82, 83, 100, 100, 80]}),
+        models.Species.mapping({"id": 4, "name": "charmander", "stats": [39, 52, 43, 60, 50, 65]}),
+        models.Species.mapping({"id": 5, "name": "fake", "stats": [39, 52, 43, 60, 50, 65]}),
+    ]
+    path = str(tmp_path / "battle_table.npy")
+    assert build_battle_table([models.Species(**entry) for entry in species], path) == 4
+
+    table = BattleTable(path)
+    assert table.outcome(1, 4) == {"Result": 1}
+    assert table.outcome(4, 3) == {"Result": 3}
+    assert table.outcome(4, 5) == {"Result": "Draw"}
+    assert table.outcome(1, 2) is None
+    assert table.outcome(1, 898) is None
+    assert table.outcomes([(1, 4), (2, 4), (3, 1), (0, 1)]) == [
+        {"Result": 1}, None, {"Result": 3}, None]
+
+    assert table.beaten_by(4) == [3, 1]
+    assert table.beaten_by(4, limit=1) == [3]
+    assert table.beaten_by(3) == []
+    assert table.beaten_by(2) is None
+    assert table.best_counter(1) == {"api_id": 3, "margin": 207}
+    assert table.best_counter(3) is None
+
+    assert BattleTable(str(tmp_path / "missing.npy")).outcome(1, 4) is None
+
+    assert stat_matrix([SpeciesRecord(1, "bulbasaur", (45, 49, 49, 65, 65, 45))]).shape == (1, 6)
+    with pytest.raises(ValueError):
+        stat_matrix([SpeciesRecord(1, "bulbasaur", (45, 49, 49, 65, 65, 45, 1)),
+                     SpeciesRecord(2, "short", (1, 2, 3, 4, 5))])
+
+
+def count_statements(database, callback):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(database.get_bind(), "before_cursor_execute", before_cursor_execute)
+    try:
+        callback()
+    finally:
+        event.remove(database.get_bind(), "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+def test_get_trainers_statement_count():
+    database = init_test_database()
+
+    def serialize_page(limit):
+        database.expire_all()
+        for trainer in get_trainers(database, limit=limit):
+            schemas.Trainer.from_orm(trainer)
+
+    def summarize_page(limit):
+        database.expire_all()
+        for trainer in get_trainers(database, limit=limit, expand=False):
+            schemas.TrainerSummary.from_orm(trainer)
+
+    for trainer_id in range(1, 51):
+        database.add(models.Trainer(id=trainer_id, name=f"Trainer {trainer_id}",
+                                    birthdate=date(2000, 1, 1)))
+        database.add(models.Item(name="Potion", trainer_id=trainer_id))
+        database.add(models.Pokemon(api_id=25, name="pikachu", trainer_id=trainer_id))
+    database.commit()
+
+    assert count_statements(database, lambda: serialize_page(5)) == 3
+    assert count_statements(database, lambda: serialize_page(50)) == 3
+    assert count_statements(database, lambda: summarize_page(50)) == 1
+
+    trainer = get_trainer(database, trainer_id=7)
+    assert len(trainer.inventory) == 1 and len(trainer.pokemons) == 1
+
+    database.close()
+
+
+def test_cursor_pagination():
+    database = init_test_database()
+    database.add(models.Trainer(id=1, name="Test Trainer 1", birthdate=date(2000, 1, 1)))
+    database.add_all([models.Item(id=item_id, name=f"Item {item_id}", trainer_id=1)
+                      for item_id in range(1, 8)])
+    database.commit()
+
+    first_page = get_items(database, limit=3)
+    assert [item.id for item in first_page] == [1, 2, 3]
+    cursor = encode_cursor(first_page[-1].id)
+    assert decode_cursor(cursor) == 3
+    assert [item.id for item in get_items(database, limit=3, after_id=3)] == [4, 5, 6]
+    assert [item.id for item in get_items(database, limit=3, after_id=6)] == [7]
+    # skip reste compatible
+    assert [item.id for item in get_items(database, skip=5, limit=3)] == [6, 7]
+
+    with pytest.raises(HTTPException):
+        decode_cursor("not a cursor")
+
+    database.close()
+
+
+def test_cursor_pagination_headers(session_factory):
+    with session_factory() as database:
+        create_trainers(database, [TrainerCreate(name="Sacha", birthdate=date(2000, 1, 1))])
+        add_trainer_items(database, [create_item_create({"name": f"Item {index}"})
+                                     for index in range(3)], 1)
+    response = client.get("/items?limit=2")
+    assert [item["id"] for item in response.json()] == [1, 2]
+    cursor = response.headers["x-next-cursor"]
+    assert decode_cursor(cursor) == 2
+    next_url = response.headers["link"].split(";")[0].strip("<>")
+    assert response.headers["link"].endswith('; rel="next"')
+    assert f"cursor={cursor}" in next_url and "limit=2" in next_url
+
+    last_page = client.get(next_url)
+    assert [item["id"] for item in last_page.json()] == [3]
+    assert "link" not in last_page.headers and "x-next-cursor" not in last_page.headers
+
+
+def test_bulk_inserts(mocker):
+    database = init_test_database()
+    create_trainer(database, trainer=models.Trainer(name="Existing", birthdate=date(2000, 1, 1)))
+
+    trainer_ids = create_trainers(database, [TrainerCreate(name=f"Trainer {index}",
+                                                           birthdate=date(2000, 1, 1))
+                                             for index in range(3)])
+    assert trainer_ids == [2, 3, 4]
+    assert [trainer.name for trainer in get_trainers(database, after_id=1)] == [
+        "Trainer 0", "Trainer 1", "Trainer 2"]
+
+    item_ids = add_trainer_items(database, [create_item_create({"name": "Potion"}),
+                                            create_item_create({"name": "Pokeball"})], 3)
+    assert [(item.id, item.name, item.trainer_id) for item in get_items(database)] == [
+        (item_ids[0], "Potion", 3), (item_ids[1], "Pokeball", 3)]
+
+    get_names = mocker.patch("app.actions.get_pokemon_names",
+                             return_value={25: "pikachu", 6: "charizard"})
+    pokemon_ids = add_trainer_pokemons(database, [create_pokemon_create({"api_id": 25}),
+                                                  create_pokemon_create({"api_id": 6}),
+                                                  create_pokemon_create({"api_id": 25})], 2)
+    assert len(pokemon_ids) == 3
+    assert [get_pokemon(database, pokemon_id).name for pokemon_id in pokemon_ids] == [
+        "pikachu", "charizard", "pikachu"]
+    assert get_names.call_count == 1
+
+    mocker.patch("app.actions.get_pokemon_names", return_value={0: None})
+    with pytest.raises(ValueError):
+        add_trainer_pokemons(database, [create_pokemon_create({"api_id": 0})], 2)
+    assert add_trainer_items(database, [], 2) == []
+
+    database.close()
+
+
+def test_sqlite_engine_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_CACHE_SIZE", "-1000")
+    profile = engine_profile("tuned")
+    assert profile["cache_size"] == "-1000"
+
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile)
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == -1000
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+    engine.dispose()
+
+    monkeypatch.delenv("SQLITE_PROFILE", raising=False)
+    assert engine_profile() == engine_profile("legacy")
+    engine = create_sqlite_engine(f"sqlite:///{tmp_path / 'legacy.db'}", engine_profile())
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+    engine.dispose()
+
+
+def test_async_routes(tmp_path, mocker):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    models.Base.metadata.create_all(bind=create_engine(url))
+    async_engine = create_async_sqlite_engine(url, engine_profile("tuned"))
+    async_sessions = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_sessions() as database:
+            yield database
+
+    async_app = FastAPI()
+    include_routers(async_app, db_mode="async")
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    mocker.patch("app.utils.pokeapi_async.get_pokemon_names",
+                 side_effect=lambda api_ids: {api_id: f"pokemon{api_id}" for api_id in api_ids})
+
+    with TestClient(async_app) as async_client:
+        trainer = async_client.post("/trainers/", json={"name": "Tom", "birthdate": "1990-11-04"})
+        assert trainer.json() == {"name": "Tom", "birthdate": "1990-11-04", "id": 1,
+                                  "inventory": [], "pokemons": []}
+        async_client.post("/trainers/bulk", json=[{"name": "Loan", "birthdate": "1991-01-01"}])
+        async_client.post("/trainers/1/item/", json={"name": "Potion"})
+        assert async_client.post("/trainers/1/pokemons/bulk",
+                                 json=[{"api_id": 25}, {"api_id": 6}]).json() == {"ids": [1, 2]}
+
+        trainers = async_client.get("/trainers?limit=1")
+        assert [pokemon["name"] for pokemon in trainers.json()[0]["pokemons"]] == [
+            "pokemon25", "pokemon6"]
+        assert trainers.json()[0]["inventory"][0]["name"] == "Potion"
+        cursor = trainers.headers["x-next-cursor"]
+        next_page = async_client.get(f"/trainers?limit=1&cursor={cursor}")
+        assert next_page.json()[0]["name"] == "Loan"
+        assert async_client.get("/trainers/2?expand=false").json() == {
+            "name": "Loan", "birthdate": "1991-01-01", "id": 2}
+        assert async_client.get("/trainers/3").status_code == 404
+        assert len(async_client.get("/pokemons").json()) == 2
+        assert len(async_client.get("/items").json()) == 1
+
+        # Statistiques, recherche et export passent aussi par les sessions asynchrones
+        assert async_client.get("/stats/trainers/top?limit=1").json() == [
+            {"id": 1, "name": "Tom", "count": 2}]
+        assert async_client.get("/stats/species/popularity?limit=1").json()[0]["count"] == 1
+        assert async_client.get("/stats/trainers/2").json() == {"id": 2, "pokemons": 0,
+                                                                "items": 0}
+        assert async_client.get("/stats/trainers/3").status_code == 404
+        assert [(result["type"], result["id"]) for result in
+                async_client.get("/search?q=pokemon").json()] == [("pokemon", 1), ("pokemon", 2)]
+        mocker.patch("app.routers.export.BATCH_SIZE", 1)
+        exported = async_client.get("/export/trainers?format=csv")
+        assert exported.text.splitlines() == ["id,name,birthdate", "1,Tom,1990-11-04",
+                                              "2,Loan,1991-01-01"]
+        assert async_client.get("/export/species").status_code == 404
+
+    async def count_recount():
+        async with async_sessions() as database:
+            return await actions_async.recount(database)
+    assert asyncio.run(count_recount()) == 0
+
+
+def test_migrate_pokemon_name_status(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TABLE pokemons (id INTEGER PRIMARY KEY, api_id INTEGER,"
+                                   " name VARCHAR, custom_name VARCHAR, trainer_id INTEGER)")
+        connection.exec_driver_sql("CREATE TABLE trainers (id INTEGER PRIMARY KEY, name VARCHAR,"
+                                   " birthdate DATE)")
+        connection.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, name VARCHAR,"
+                                   " description VARCHAR, trainer_id INTEGER)")
+        connection.exec_driver_sql("INSERT INTO trainers (name) VALUES ('Sacha')")
+        connection.exec_driver_sql("INSERT INTO pokemons (api_id, name, trainer_id)"
+                                   " VALUES (25, 'pikachu', 1)")
+        connection.exec_driver_sql("CREATE INDEX ix_items_description ON items (description)")
+
+    assert migrate(engine) == ["add_pokemon_name_status", "add_trainer_counters",
+                               "rework_indexes", "add_search_tables"]
+    assert migrate(engine) == []
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("SELECT name_status FROM pokemons").scalar() == \
+            models.NAME_RESOLVED
+        assert connection.exec_driver_sql(
+            "SELECT pokemon_count, item_count FROM trainers").first() == (1, 0)
+        assert [index["name"] for index in sqlalchemy_inspect(connection).get_indexes("items")] \
+            == ["ix_items_trainer_id"]
+        assert connection.exec_driver_sql(
+            "SELECT rowid FROM pokemons_fts WHERE pokemons_fts MATCH 'pika*'").scalar() == 1
+
+
+def test_deferred_name_resolution(session_factory, mocker):
+    resolver = NameResolver(session_factory=session_factory)
+    mocker.patch("app.actions.name_resolver", resolver)
+    get_names = mocker.patch("app.utils.pokeapi.get_pokemon_names",
+                             return_value={25: "pikachu", 0: None})
+    get_name = mocker.patch("app.actions.get_pokemon_name")
+
+    with session_factory() as database:
+        create_trainer(database, trainer=TrainerCreate(name="Tom", birthdate=date(2000, 1, 1)))
+        pokemon = add_trainer_pokemon(database, create_pokemon_create({"api_id": 25}), 1,
+                                      defer_name=True)
+        assert (pokemon.name, pokemon.name_status) == (None, models.NAME_PENDING)
+        add_trainer_pokemons(database, [create_pokemon_create({"api_id": 25}),
+                                        create_pokemon_create({"api_id": 0})], 1,
+                             defer_name=True)
+    resolver.join()
+
+    get_name.assert_not_called()
+    assert sum(len(call.args[0]) for call in get_names.call_args_list) <= 2
+    with session_factory() as database:
+        assert [(pokemon.name, pokemon.name_status) for pokemon in get_pokemons(database)] == [
+            ("pikachu", models.NAME_RESOLVED), ("pikachu", models.NAME_RESOLVED),
+            (None, models.NAME_FAILED)]
+    assert resolver.stats() == {"queued": 0, "resolved": 2, "failed": 1, "retried": 0}
+    assert resolver.resume() == 0
+
+
+def test_deferred_name_resolution_retries(session_factory, mocker):
+    resolver = NameResolver(session_factory=session_factory, max_retries=2, retry_backoff=0)
+    mocker.patch("app.actions.name_resolver", resolver)
+    lookups = []
+
+    def get_pokemon_names(api_ids):
+        lookups.append(list(api_ids))
+        # 25 échoue une fois (recherche groupée puis seule), 7 échoue toujours
+        if 7 in api_ids or sum(25 in ids for ids in lookups) <= 2 and 25 in api_ids:
+            raise ConnectionError("pokeapi unavailable")
+        return {api_id: f"pokemon{api_id}" for api_id in api_ids}
+    mocker.patch("app.utils.pokeapi.get_pokemon_names", side_effect=get_pokemon_names)
+
+    with session_factory() as database:
+        create_trainer(database, trainer=TrainerCreate(name="Tom", birthdate=date(2000, 1, 1)))
+        add_trainer_pokemons(database, [create_pokemon_create({"api_id": api_id})
+                                        for api_id in (25, 6, 7)], 1, defer_name=True)
+    resolver.join()
+
+    assert lookups[0] == [25, 6, 7]
+    with session_factory() as database:
+        assert [(pokemon.name, pokemon.name_status) for pokemon in get_pokemons(database)] == [
+            ("pokemon25", models.NAME_RESOLVED), ("pokemon6", models.NAME_RESOLVED),
+            (None, models.NAME_FAILED)]
+    assert resolver.stats() == {"queued": 0, "resolved": 2, "failed": 1, "retried": 3}
+
+
+def test_response_cache(session_factory, mocker):
+    cached_app = FastAPI()
+    cached_app.add_middleware(ResponseCacheMiddleware)
+    include_routers(cached_app, db_mode="sync")
+    cached_app.dependency_overrides[get_db] = app.dependency_overrides[get_db]
+    cached_client = TestClient(cached_app)
+    response_cache.clear()
+    read = mocker.spy(actions, "get_trainer")
+
+    cached_client.post("/trainers/", json={"name": "Tom", "birthdate": "1990-11-04"})
+    first = cached_client.get("/trainers/1")
+    second = cached_client.get("/trainers/1")
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert first.json() == second.json() and read.call_count == 1
+    etag = first.headers["etag"]
+    not_modified = cached_client.get("/trainers/1", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    assert cached_client.get("/items/").json() == []
+    cached_client.post("/trainers/1/item/", json={"name": "Potion"})
+    refreshed = cached_client.get("/trainers/1", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200 and refreshed.headers["x-cache"] == "MISS"
+    assert refreshed.json()["inventory"][0]["name"] == "Potion"
+    assert len(cached_client.get("/items/").json()) == 1
+    assert cached_client.get("/trainers/2").status_code == 404
+    assert cached_client.get("/trainers/2").status_code == 404
+
+
+def test_response_cache_shared_backend():
+    """
+        Generations live in the backend: a write handled by one worker invalidates the others
+    """
+    backend = MemoryBackend()
+    first_worker, second_worker = ResponseCache(backend), ResponseCache(backend)
+    response = CachedResponse(("trainers",), [], b"[]", b'"etag"')
+    second_worker.set("/trainers?", response, second_worker.generations(response.tags))
+    assert second_worker.get("/trainers?") == response
+
+    first_worker.invalidate("trainers")
+    assert second_worker.get("/trainers?") is None
+    second_worker.clear()
+    assert backend.generations(["trainers"]) == (1,)
+
+
+def test_export_streams(session_factory, mocker):
+    mocker.patch("app.routers.export.BATCH_SIZE", 2)
+    with session_factory() as database:
+        create_trainers(database, [TrainerCreate(name=f"Trainer {index}",
+                                                 birthdate=date(2000, 1, 1))
+                                   for index in range(5)])
+        add_trainer_items(database, [create_item_create({"name": "Potion"})], 1)
+    trainers = client.get("/export/trainers")
+    assert trainers.headers["content-type"] == "application/x-ndjson"
+    lines = trainers.text.splitlines()
+    assert len(lines) == 5
+    assert json.loads(lines[4]) == {"id": 5, "name": "Trainer 4", "birthdate": "2000-01-01"}
+
+    items = client.get("/export/items?format=csv")
+    assert items.headers["content-type"].startswith("text/csv")
+    assert items.text.splitlines() == ["id,name,description,trainer_id", "1,Potion,,1"]
+    assert len(list(export.ndjson_lines(iter(json.loads(line) for line in lines)))) == 3
+    assert client.get("/export/species").status_code == 404
+    assert client.get("/export/items?format=xml").status_code == 422
+
+
+def test_fast_serialization_is_identical(session_factory):
+    with session_factory() as database:
+        create_trainers(database, [TrainerCreate(name=name, birthdate=date(2000, 1, 1))
+                                   for name in ("Sacha", 'Ondine "Misty"', "Pierre", "Flabébé")])
+        add_trainer_items(database, [create_item_create({"name": "Potion"}),
+                                     create_item_create({"name": "Baie", "description": "é\n"})], 3)
+        add_trainer_items(database, [create_item_create({"name": "Pokéball"})], 1)
+        database.add_all([models.Pokemon(api_id=25, name="pikachu", trainer_id=1),
+                          models.Pokemon(api_id=669, name=None, custom_name="Flabébé",
+                                         name_status=models.NAME_PENDING, trainer_id=3)])
+        database.commit()
+    for url in ("/trainers?limit=3", "/trainers?expand=false", "/items/?limit=2",
+                "/pokemons/"):
+        slow = client.get(url)
+        fast = client.get(f"{url}{'&' if '?' in url else '?'}fast=true")
+        assert fast.content == slow.content
+        assert fast.headers["etag"] == slow.headers["etag"]
+        assert fast.headers.get("x-next-cursor") == slow.headers.get("x-next-cursor")
+    assert client.get("/trainers?expand=false").json()[0] == {
+        "name": "Sacha", "birthdate": "2000-01-01", "id": 1}
+    trainers_schema = json.dumps(client.get("/openapi.json").json()["paths"]["/trainers"])
+    assert "TrainerSummary" in trainers_schema
+
+
+def test_stats(session_factory):
+    with session_factory() as database:
+        create_trainers(database, [TrainerCreate(name=name, birthdate=date(2000, 1, 1))
+                                   for name in ("Sacha", "Ondine", "Pierre")])
+        database.add_all([models.Pokemon(api_id=api_id, name=f"pokemon{api_id}",
+                                         trainer_id=trainer_id)
+                          for trainer_id, api_id in ((1, 25), (1, 6), (2, 25), (2, 25), (2, 7))])
+        database.add(models.Item(name="Potion", trainer_id=3))
+        database.commit()
+        assert recount(database) == 3
+        assert recount(database) == 0
+
+        trainer = get_trainer(database, 2, expand=False)
+        assert count_statements(database, trainer.get_pokemon_count) == 1
+        assert trainer.get_pokemon_count() == 3
+    assert client.get("/stats/trainers/top?limit=2").json() == [
+        {"id": 2, "name": "Ondine", "count": 3}, {"id": 1, "name": "Sacha", "count": 2}]
+    assert client.get("/stats/trainers/top?by=items").json()[0] == {
+        "id": 3, "name": "Pierre", "count": 1}
+    assert client.get("/stats/species/popularity?limit=1").json() == [
+        {"api_id": 25, "name": "pokemon25", "count": 3, "trainers": 2}]
+    assert client.get("/stats/trainers/3").json() == {"id": 3, "pokemons": 0, "items": 1}
+    assert client.get("/stats/trainers/4").status_code == 404
+
+
+def test_trainer_counters(mocker):
+    database = init_test_database()
+    trainer = create_trainer(database, trainer=TrainerCreate(name="Sacha",
+                                                             birthdate=date(2000, 1, 1)))
+    mocker.patch("app.actions.get_pokemon_name", return_value="pikachu")
+    mocker.patch("app.actions.get_pokemon_names", return_value={25: "pikachu"})
+    add_trainer_pokemon(database, create_pokemon_create({"api_id": 25}), trainer.id)
+    add_trainer_pokemons(database, [create_pokemon_create({"api_id": 25})] * 2, trainer.id)
+    add_trainer_item(database, create_item_create({"name": "Potion"}), trainer.id)
+    add_trainer_items(database, [], trainer.id)
+
+    database.refresh(trainer)
+    assert (trainer.pokemon_count, trainer.item_count) == (3, 1)
+    assert recount(database) == 0
+    database.close()
+
+
+def test_search(session_factory):
+    with session_factory() as database:
+        create_trainers(database, [TrainerCreate(name=name, birthdate=date(2000, 1, 1))
+                                   for name in ("Sacha Ketchum", "Ondine")])
+        add_trainer_items(database, [create_item_create({"name": "Potion",
+                                                         "description": "Soigne un Pokémon"})], 2)
+        database.add(models.Pokemon(api_id=25, name="pikachu", custom_name="Pika de Sacha",
+                                    trainer_id=1))
+        database.commit()
+    results = client.get("/search?q=sac").json()
+    assert sorted((result["type"], result["id"], result["trainer_id"], result["detail"])
+                  for result in results) == [("pokemon", 1, 1, "Pika de Sacha"),
+                                             ("trainer", 1, None, None)]
+    # Résultats groupés par type : dresseurs, puis pokémons, puis objets
+    assert [result["type"] for result in results] == ["trainer", "pokemon"]
+    assert [result["type"] for result in client.get("/search?q=sac&limit=1").json()] == [
+        "trainer"]
+    assert [result["type"] for result in client.get("/search?q=pokemon soi").json()] == [
+        "item"]
+    assert client.get("/search?q=pika sacha").json()[0]["name"] == "pikachu"
+    assert client.get('/search?q=" *').json() == []
+
+    with session_factory() as database:
+        database.query(models.Trainer).filter(models.Trainer.id == 2) \
+            .update({"name": "Misty"})
+        database.commit()
+    assert client.get("/search?q=ondine").json() == []
+    assert client.get("/search?q=mist").json()[0]["id"] == 2
+
+
+def test_load_test_thresholds(tmp_path):
+    """
+        Locust stats are summarised and checked against the thresholds
+    """
+    stats_path = tmp_path / "run_stats.csv"
+    stats_path.write_text(
+        "Type,Name,Request Count,Failure Count,Requests/s,50%,95%,99%\n"
+        "GET,/trainers,100,0,10.5,12,80,200\n"
+        "GET,/search,50,5,5.0,12,N/A,N/A\n"
+        "GET,/stats,0,0,0.0,N/A,N/A,N/A\n"
+        ",Aggregated,150,5,15.5,10,90,300\n", encoding="utf-8")
+    stats = read_stats(stats_path)
+    assert stats[1]["fail_ratio"] == 0.1 and stats[1]["p95"] is None
+    assert stats[2]["fail_ratio"] is None and stats[2]["p50"] is None
+
+    violations = check_thresholds(stats, {"/trainers": {"p95": 50}, "/search": {"min_rps": 1},
+                                          "/stats": {"p95": 100}, "/export": {"p95": 100},
+                                          "Aggregated": {"fail_ratio": 0.01, "p99": 500}})
+    assert violations == ["/export: no data (route not in the locust stats)",
+                          "/trainers: p95 = 80 (limit 50)",
+                          "/stats: p95 = no data (limit 100)",
+                          "Aggregated: fail_ratio = 0.0333333 (limit 0.01)"]
+    assert [row["status"] for row in stats] == ["fail", "pass", "fail", "fail"]
+
+
+def test_benchmark_measure_and_compare():
+    """
+        Benchmark timings are summarised and compared by median
+    """
+    result = measure(lambda: None, min_time=0)
+    assert result["rounds"] == 3 and result["min_ms"] <= result["median_ms"]
+
+    previous = [{"group": "battle", "name": "battle_compare_stats", "size": None,
+                 "median_ms": 2.0},
+                {"group": "actions", "name": "actions.get_trainer", "size": 1000,
+                 "median_ms": 1.0}]
+    results = [{"group": "battle", "name": "battle_compare_stats", "size": None,
+                "median_ms": 1.0},
+               {"group": "actions", "name": "actions.get_trainer", "size": 100000,
+                "median_ms": 3.0}]
+    assert compare(results, previous) == [("battle", "battle_compare_stats", None, 2.0, 1.0, 0.5)]
+
+
+def test_request_metrics(session_factory):
+    instrument_engine(session_factory.kw["bind"])
+    metrics.clear()
+    assert client.post("/trainers/", json={"name": "Sacha",
+                                           "birthdate": "2000-01-01"}).status_code == 200
+    response = client.get("/stats/trainers/1")
+    timing = response.headers["server-timing"]
+    assert timing.startswith("total;dur=")
+    assert 'db;dur=' in timing and 'desc="1 queries"' in timing
+    assert 'desc="0 calls"' in timing
+    client.get("/stats/trainers/2")
+
+    text = client.get("/metrics").text
+    assert ('http_requests_total{method="GET",route="/stats/trainers/{trainer_id}",'
+            'status="200"} 1') in text
+    assert ('http_requests_total{method="GET",route="/stats/trainers/{trainer_id}",'
+            'status="404"} 1') in text
+    assert ('http_request_duration_seconds_count{method="GET",'
+            'route="/stats/trainers/{trainer_id}"} 2') in text
+    assert 'db_queries_total{method="GET",route="/stats/trainers/{trainer_id}"} 2' in text
+
+
+def test_slow_query_log(session_factory, mocker):
+    log = QueryLog(threshold_ms=0)
+    log.listen(session_factory.kw["bind"])
+    with session_factory() as database:
+        trainer_ids = create_trainers(database, [TrainerCreate(name=f"Trainer {index}",
+                                                               birthdate=date(2000, 1, 1))
+                                                 for index in range(3)])
+        log.clear()
+        for trainer_id in trainer_ids:
+            get_trainer(database, trainer_id)
+            database.expunge_all()
+        database.query(models.Item).filter(models.Item.description == "Soigne").all()
+
+    report = log.report()
+    by_statement = {stats["statement"]: stats for stats in report}
+    pokemons_load = next(stats for statement, stats in by_statement.items()
+                         if "FROM pokemons WHERE pokemons.trainer_id IN (?" in statement)
+    assert pokemons_load["calls"] == 3 and pokemons_load["full_scans"] == []
+    assert any(plan.startswith("SEARCH pokemons USING") for plan in pokemons_load["plan"])
+    scan = next(stats for statement, stats in by_statement.items()
+                if "WHERE items.description = ?" in statement)
+    assert scan["full_scans"] == ["items"]
+    assert [stats["total_ms"] for stats in report] == sorted(
+        (stats["total_ms"] for stats in report), reverse=True)
+
+    # Au-delà de max_statements, une requête lente est journalisée sans être cumulée
+    full_log = QueryLog(threshold_ms=0, max_statements=0)
+    full_log.listen(session_factory.kw["bind"])
+    warning = mocker.patch("app.utils.query_log.logger.warning")
+    with session_factory() as database:
+        database.query(models.Item).filter(models.Item.description == "Soigne").all()
+    assert full_log.report() == []
+    assert any(call.args[0].startswith("Slow query") for call in warning.call_args_list)
+    assert any(call.args[0].startswith("Full table scan") and call.args[1] == "items"
+               for call in warning.call_args_list)
+
+    assert client.get("/debug/queries").status_code == 404
+    mocker.patch("app.routers.debug.query_log", log)
+    response = client.get("/debug/queries?limit=2")
+    assert response.status_code == 200
+    assert len(response.json()) == 2 and "mean_ms" in response.json()[0]
+
+
+def test_species_record(tmp_path):
+    payload = {"id": 1, "name": "bulbasaur", "sprites": {"front_default": "bulbasaur.png"},
+               "moves": [{"move": {"name": "tackle"}}] * 50,
+               "stats": [{"base_stat": value, "stat": {"name": name}}
+                         for name, value in zip(models.Species.STAT_NAMES,
+                                                [45, 49, 49, 65, 65, 45])]}
+    record = SpeciesRecord.parse(payload)
+    assert record == SpeciesRecord(1, "bulbasaur", (45, 49, 49, 65, 65, 45))
+    assert record.to_pokeapi() == {"id": 1, "name": "bulbasaur", "stats": payload["stats"]}
+    assert SpeciesRecord.parse(record.to_dict()) == record
+    # Le modèle Species passe par le même format
+    assert models.Species(**models.Species.mapping(payload)).record() == record
+    assert SpeciesRecord.parse(None) is None
+    with pytest.raises(ValueError):
+        SpeciesRecord.parse({"id": 25, "name": "pikachu", "stats": [{"base_stat": 35}]})
+    with pytest.raises(ValueError):
+        SpeciesRecord.parse([25, "pikachu", []])
+
+    # Les entrées sont relues du disque sous forme d'enregistrement, anciennes réponses
+    # complètes comprises
+    path = str(tmp_path / "cache.db")
+    legacy = PokemonCache(path=path)
+    legacy.set(1, payload)
+    cache = PokemonCache(path=path, decode=SpeciesRecord.parse)
+    assert cache.get(1) == record
+    cache.set(4, SpeciesRecord(4, "charmander", (39, 52, 43, 60, 50, 65)))
+    restarted = PokemonCache(path=path, decode=SpeciesRecord.parse)
+    restarted.warm_up()
+    assert restarted.get(4) == SpeciesRecord(4, "charmander", (39, 52, 43, 60, 50, 65))
+    assert restarted.get(1) == record
+    # Une entrée sans six statistiques est ignorée et supprimée
+    legacy.set(7, {"id": 7, "name": "squirtle", "stats": [{"base_stat": 44}]})
+    assert restarted.get(7) is None and restarted.stats()["disk_entries"] == 2